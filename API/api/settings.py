@@ -214,6 +214,63 @@ SIMPLE_JWT = {
 LOG_DIR = Path(BASE_DIR) / "logs"
 LOG_DIR.mkdir(parents=True, exist_ok=True)
 
+# How long a worker holds the claimed tasks, after that they can be claimed by other workers
+TASK_LEASE_SECONDS = int(os.environ.get("TASK_LEASE_SECONDS", 600))
+# The maximum number of tasks a worker can lease within one request
+TASK_LEASE_MAX_LIMIT = int(os.environ.get("TASK_LEASE_MAX_LIMIT", 32))
+# The longest lease a worker can ask for, so its tasks are not kept out of the recovery for ever
+TASK_LEASE_MAX_SECONDS = int(os.environ.get("TASK_LEASE_MAX_SECONDS", 3600))
+# Long poll: the maximum time to hold a worker or responder request,
+# and how often to recheck the database for records created by other processes
+LONG_POLL_MAX_WAIT_SECONDS = int(os.environ.get("LONG_POLL_MAX_WAIT_SECONDS", 30))
+LONG_POLL_RECHECK_SECONDS = float(os.environ.get("LONG_POLL_RECHECK_SECONDS", 1))
+# How often the running API checks the ClusterDefinition records for changed clusters
+CLUSTER_RELOAD_SECONDS = int(os.environ.get("CLUSTER_RELOAD_SECONDS", 5))
+# The chain step of a completed task runs in background threads, after the result is saved,
+# set CHAIN_DISPATCH_ASYNC=0 to run it within the request instead
+CHAIN_DISPATCH_ASYNC = bool(int(os.environ.get("CHAIN_DISPATCH_ASYNC", 1)))
+CHAIN_DISPATCH_WORKERS = int(os.environ.get("CHAIN_DISPATCH_WORKERS", 2))
+# How often the idle dispatcher threads check for chain events recorded by other processes
+CHAIN_EVENT_POLL_SECONDS = float(os.environ.get("CHAIN_EVENT_POLL_SECONDS", 1))
+# A failing chain event is retried with an exponential backoff, up to the maximum attempts
+CHAIN_EVENT_MAX_ATTEMPTS = int(os.environ.get("CHAIN_EVENT_MAX_ATTEMPTS", 5))
+CHAIN_EVENT_MAX_BACKOFF_SECONDS = int(
+    os.environ.get("CHAIN_EVENT_MAX_BACKOFF_SECONDS", 60)
+)
+# A worker which has not reported for this long is not counted as alive in the metrics
+WORKER_ALIVE_SECONDS = int(os.environ.get("WORKER_ALIVE_SECONDS", 300))
+# Export the tracing spans of the tracks as JSON lines to this file, like logs/traces.jsonl, empty to disable
+TRACE_EXPORT_PATH = os.environ.get("TRACE_EXPORT_PATH", "")
+# Send the tracing spans to this OTLP/HTTP collector, like http://localhost:4318, empty to disable
+TRACE_OTLP_ENDPOINT = os.environ.get("TRACE_OTLP_ENDPOINT", "")
+# The latency benchmark page describes the latest tracks of each cluster, not all the history
+LATENCY_BENCHMARK_MAX_TRACKS = int(
+    os.environ.get("LATENCY_BENCHMARK_MAX_TRACKS", 10000)
+)
+# The latency percentiles are kept as one quantile sketch per window, merged when queried
+LATENCY_SKETCH_WINDOW_MINUTES = int(os.environ.get("LATENCY_SKETCH_WINDOW_MINUTES", 60))
+# The relative error of the latency percentiles, 0.01 is 1%
+LATENCY_SKETCH_RELATIVE_ACCURACY = float(
+    os.environ.get("LATENCY_SKETCH_RELATIVE_ACCURACY", 0.01)
+)
+# Tasks wait for the Agent storage to report their media files present,
+# this is how long to wait at most before dispatching them anyway, per task name
+TASK_MEDIA_FALLBACK_SECONDS_DEFAULT = int(
+    os.environ.get("TASK_MEDIA_FALLBACK_SECONDS_DEFAULT", 10)
+)
+TASK_MEDIA_FALLBACK_SECONDS = {
+    "speech2text": int(os.environ.get("SPEECH2TEXT_MEDIA_FALLBACK_SECONDS", 10)),
+    "openai_speech2text": int(
+        os.environ.get("OPENAI_SPEECH2TEXT_MEDIA_FALLBACK_SECONDS", 5)
+    ),
+    "emotion_detection": int(
+        os.environ.get("EMOTION_DETECTION_MEDIA_FALLBACK_SECONDS", 10)
+    ),
+    "openai_gpt_4o_text_and_image": int(
+        os.environ.get("OPENAI_GPT_4O_TEXT_AND_IMAGE_MEDIA_FALLBACK_SECONDS", 5)
+    ),
+}
+
 # Option will be: volume,local,s3,api
 # api means use our api server to do the test
 
@@ -22,6 +22,8 @@ from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
 from rest_framework import permissions
 
+from orchestrator.views import MetricsView
+
 admin.site.site_header = "UWA NLP TLP"
 admin.site.site_title = "UWA NLP TLP Data & LLM Platform Admin Portal"
 admin.site.index_title = "UWA NLP TLP"
@@ -41,6 +43,7 @@ urlpatterns = [
     path("hardware/", include("hardware.urls")),
     path("queue_task/", include("orchestrator.urls")),
     path("llm/", include("llm.urls")),
+    path("metrics/", MetricsView.as_view(), name="metrics"),
     path(
         "swagger/",
         login_required(schema_view.with_ui("swagger", cache_timeout=0)),
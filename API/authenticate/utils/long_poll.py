@@ -0,0 +1,83 @@
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, TypeVar
+
+from django.conf import settings
+
+T = TypeVar("T")
+
+
+class LongPollNotifier:
+    """
+    Wake up the requests waiting on a channel within this process
+
+    A channel is a plain string, like task:speech2text or speech.
+    Each notify bumps the version of the channel, waiters compare the version they saw before querying the database,
+    so a notification sent between the query and the wait is never missed.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.versions = defaultdict(int)
+
+    def snapshot(self, channels: List[str]) -> Dict[str, int]:
+        with self.condition:
+            return {channel: self.versions[channel] for channel in channels}
+
+    def notify(self, *channels: str):
+        with self.condition:
+            for channel in channels:
+                self.versions[channel] += 1
+            self.condition.notify_all()
+
+    def wait(self, snapshot: Dict[str, int], timeout: float) -> bool:
+        """
+        Wait until any of the channels in the snapshot is notified
+        Args:
+            snapshot (Dict[str, int]): The channel versions seen before querying
+            timeout (float): The maximum time to wait in seconds
+
+        Returns:
+            bool: True if notified, False if timed out
+        """
+        with self.condition:
+            return self.condition.wait_for(
+                lambda: any(
+                    self.versions[channel] != version
+                    for channel, version in snapshot.items()
+                ),
+                timeout=timeout,
+            )
+
+
+long_poll_notifier = LongPollNotifier()
+
+
+def long_poll(fetch: Callable[[], T], channels: List[str], wait_seconds: float) -> T:
+    """
+    Call fetch until it returns something, or wait_seconds passed
+
+    It will wake up straight away when a channel is notified within this process,
+    and recheck the database every LONG_POLL_RECHECK_SECONDS,
+    to pick up the records created by other processes.
+
+    Args:
+        fetch (Callable): The function to query the database, return a falsy value when nothing is found
+        channels (List[str]): The channels to listen to
+        wait_seconds (float): The maximum time to hold the request
+
+    Returns:
+        The last result of fetch
+    """
+    wait_seconds = max(0.0, min(wait_seconds, settings.LONG_POLL_MAX_WAIT_SECONDS))
+    deadline = time.monotonic() + wait_seconds
+    while True:
+        snapshot = long_poll_notifier.snapshot(channels)
+        result = fetch()
+        remaining = deadline - time.monotonic()
+        if result or remaining <= 0:
+            return result
+        long_poll_notifier.wait(
+            snapshot, timeout=min(remaining, settings.LONG_POLL_RECHECK_SECONDS)
+        )
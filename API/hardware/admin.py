@@ -28,7 +28,7 @@ from hardware.models import (
     ResSpeech,
     ResText,
 )
-from orchestrator.chain.manager import CLUSTERS
+from orchestrator.chain.topology import get_topologies
 from orchestrator.metrics.accuracy_benchmark import AccuracyBenchmark
 
 
@@ -37,11 +37,11 @@ class ClusterFilter(admin.SimpleListFilter):
     parameter_name = "cluster"
 
     def lookups(self, request, model_admin):
-        return [(cluster, cluster) for cluster in CLUSTERS]
+        return [(cluster, cluster) for cluster in get_topologies()]
 
     def queryset(self, request, queryset):
         if self.value():
-            return queryset.filter(track_id__startswith=f"T-{self.value()}")
+            return queryset.filter(cluster_name=self.value())
         return queryset
 
 
@@ -399,7 +399,7 @@ class DataMultiModalConversationAdmin(ImportExportMixin, admin.ModelAdmin):
                     # for each cluster, the last one of the tag
                     DataMultiModalConversation.objects.filter(
                         tags__name=tag.name,
-                        track_id__startswith=f"T-{obj.track_id.split('-')[1]}",
+                        cluster_name=obj.cluster_name,
                     )
                     .order_by("created_at")
                     .last()
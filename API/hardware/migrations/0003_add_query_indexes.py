@@ -0,0 +1,35 @@
+# Generated by Django 4.2.8 on 2026-10-18 15:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("hardware", "0002_add_rag"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="dataaudio",
+            index=models.Index(
+                fields=["track_id"],
+                name="dataaudio_track_id_pattern_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="datamultimodalconversation",
+            index=models.Index(
+                fields=["track_id"],
+                name="conversation_track_id_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="datavideo",
+            index=models.Index(
+                fields=["end_time", "start_time"], name="datavideo_time_range_idx"
+            ),
+        ),
+    ]
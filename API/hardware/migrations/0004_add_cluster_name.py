@@ -0,0 +1,43 @@
+# Generated by Django 4.2.8 on 2026-10-18 15:10
+
+from django.db import migrations, models
+
+from orchestrator.migrations._cluster_name import backfill_cluster_name
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("hardware", "0003_add_query_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dataaudio",
+            name="cluster_name",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                help_text="The cluster of the track, set from the track id when saved",
+                max_length=100,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="datamultimodalconversation",
+            name="cluster_name",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                help_text="The cluster of the track, set from the track id when saved",
+                max_length=100,
+                null=True,
+            ),
+        ),
+        migrations.RunPython(
+            backfill_cluster_name(
+                "hardware", ["DataAudio", "DataMultiModalConversation"]
+            ),
+            migrations.RunPython.noop,
+        ),
+    ]
@@ -4,6 +4,7 @@ from django.db import models
 from taggit.managers import TaggableManager
 
 from authenticate.models import User
+from orchestrator.chain.track import cluster_name_from_track_id
 
 
 class Home(models.Model):
@@ -104,6 +105,13 @@ class DataAudio(models.Model):
         null=True,
         blank=True,
     )
+    cluster_name = models.CharField(
+        max_length=100,
+        help_text="The cluster of the track, set from the track id when saved",
+        null=True,
+        blank=True,
+        db_index=True,
+    )
 
     @classmethod
     def create_obj(
@@ -142,9 +150,20 @@ class DataAudio(models.Model):
         """
         return f"/hardware/client_audio/{self.id}"
 
+    def save(self, *args, **kwargs):
+        self.cluster_name = cluster_name_from_track_id(self.track_id)
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Data Audio"
         verbose_name_plural = "Data Audios"
+        indexes = [
+            models.Index(
+                fields=["track_id"],
+                opclasses=["varchar_pattern_ops"],
+                name="dataaudio_track_id_pattern_idx",
+            ),
+        ]
 
 
 class DataVideo(models.Model):
@@ -187,6 +206,13 @@ class DataVideo(models.Model):
     class Meta:
         verbose_name = "Data Video"
         verbose_name_plural = "Data Videos"
+        indexes = [
+            # the videos overlapping an utterance, start_time < end and end_time > start,
+            # end_time first as it is the selective side once the history grows
+            models.Index(
+                fields=["end_time", "start_time"], name="datavideo_time_range_idx"
+            ),
+        ]
 
 
 class DataText(models.Model):
@@ -326,6 +352,13 @@ class DataMultiModalConversation(models.Model):
         null=True,
         blank=True,
     )
+    cluster_name = models.CharField(
+        max_length=100,
+        help_text="The cluster of the track, set from the track id when saved",
+        null=True,
+        blank=True,
+        db_index=True,
+    )
     annotations = models.JSONField(
         help_text="The annotations of the emotion detection",
         null=True,
@@ -349,9 +382,20 @@ class DataMultiModalConversation(models.Model):
             return "No Video"
         return f"/hardware/client_video/{self.id}"
 
+    def save(self, *args, **kwargs):
+        self.cluster_name = cluster_name_from_track_id(self.track_id)
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Conversation"
         verbose_name_plural = "Conversations"
+        indexes = [
+            models.Index(
+                fields=["track_id"],
+                opclasses=["varchar_pattern_ops"],
+                name="conversation_track_id_idx",
+            ),
+        ]
 
 
 class ContextEmotionDetection(models.Model):
@@ -1,7 +1,9 @@
+from django.db import transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
-from hardware.models import DataAudio, DataMultiModalConversation
+from authenticate.utils.long_poll import long_poll_notifier
+from hardware.models import DataAudio, DataMultiModalConversation, ResSpeech
 
 
 @receiver(post_save, sender=DataAudio)
@@ -13,3 +15,12 @@ def add_data_multimodal_conversation_entry(sender, instance, created, **kwargs):
         DataMultiModalConversation.objects.create(
             audio=instance, track_id=instance.track_id
         )
+
+
+@receiver(post_save, sender=ResSpeech)
+def notify_res_speech(sender, instance, created, **kwargs):
+    """
+    Wake up the responders long polling for the speech to play
+    """
+    if created:
+        transaction.on_commit(lambda: long_poll_notifier.notify("speech"))
@@ -12,6 +12,7 @@ from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from authenticate.utils.long_poll import long_poll
 from hardware.models import (
     DataAudio,
     DataMultiModalConversation,
@@ -187,7 +188,17 @@ class Text2SpeechViewSet(viewsets.ModelViewSet):
             return None
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
+        """
+        Get the next speech to play, with ?wait=N the request is held up to N seconds until one is created
+        """
+        try:
+            wait = float(request.query_params.get("wait", 0))
+        except ValueError as e:
+            return Response(
+                {"message": f"Invalid wait parameter: {e}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        queryset = long_poll(self.get_queryset, channels=["speech"], wait_seconds=wait)
         if queryset is None:
             return Response(
                 {"message": "No text to speech found."},
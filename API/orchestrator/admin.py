@@ -4,13 +4,21 @@ from django import forms
 from django.contrib import admin, messages
 from django.shortcuts import render
 from django.urls import path
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from import_export.admin import ImportExportMixin, ImportExportModelAdmin
 
-from orchestrator.chain.manager import CLUSTERS
-from orchestrator.chain.signals import completed_task
+from orchestrator.chain.topology import get_topologies
 from orchestrator.metrics.latency_benchmark import LatencyBenchmark
-from orchestrator.models import Task, TaskWorker
+from orchestrator.models import (
+    ChainEvent,
+    ChainJoin,
+    ClusterDefinition,
+    SyncedMedia,
+    Task,
+    TaskArchive,
+    TaskWorker,
+)
 
 
 class ClusterFilter(admin.SimpleListFilter):
@@ -18,11 +26,11 @@ class ClusterFilter(admin.SimpleListFilter):
     parameter_name = "cluster"
 
     def lookups(self, request, model_admin):
-        return [(cluster, cluster) for cluster in CLUSTERS]
+        return [(cluster, cluster) for cluster in get_topologies()]
 
     def queryset(self, request, queryset):
         if self.value():
-            return queryset.filter(track_id__startswith=f"T-{self.value()}")
+            return queryset.filter(cluster_name=self.value())
         return queryset
 
 
@@ -37,7 +45,7 @@ class TaskAdminForm(forms.ModelForm):
 @admin.action(description="Trigger Downstream Task")
 def trigger_downstream_task(modeladmin, request, queryset):
     for task in queryset:
-        completed_task.send(sender=task, data=task.__dict__)
+        ChainEvent.record(task)
         messages.add_message(
             request,
             messages.INFO,
@@ -119,3 +127,81 @@ class TaskWorkerAdmin(ImportExportModelAdmin):
     list_display = ("uuid", "created_at", "updated_at")
     search_fields = ("uuid",)
     readonly_fields = ("created_at", "updated_at")
+
+
+@admin.register(SyncedMedia)
+class SyncedMediaAdmin(ImportExportModelAdmin):
+    list_display = ("path", "created_at")
+    search_fields = ("path",)
+    readonly_fields = ("created_at",)
+
+
+@admin.register(ChainJoin)
+class ChainJoinAdmin(ImportExportModelAdmin):
+    list_display = (
+        "track_id",
+        "component",
+        "arrived",
+        "dispatched",
+        "stopped",
+        "created_at",
+    )
+    search_fields = ("track_id", "component")
+    list_filter = ("dispatched", "stopped")
+    readonly_fields = ("created_at", "updated_at")
+
+
+@admin.register(ClusterDefinition)
+class ClusterDefinitionAdmin(ImportExportModelAdmin):
+    list_display = ("name", "version", "active", "created_at", "updated_at")
+    search_fields = ("name", "description")
+    list_filter = ("active", "name")
+    readonly_fields = ("version", "created_at", "updated_at")
+
+    def save_model(self, request, obj, form, change):
+        # an edit is saved as a new version, the previous version is kept for the rollback
+        if change and "definition" in form.changed_data:
+            obj.pk = None
+            obj.version = None
+        super().save_model(request, obj, form, change)
+
+
+@admin.action(description="Retry Chain Event")
+def retry_chain_event(modeladmin, request, queryset):
+    updated = queryset.exclude(status="pending").update(
+        status="pending", available_at=timezone.now()
+    )
+    messages.add_message(request, messages.INFO, f"{updated} chain events queued")
+
+
+@admin.register(ChainEvent)
+class ChainEventAdmin(ImportExportModelAdmin):
+    list_display = (
+        "id",
+        "task",
+        "task_name",
+        "status",
+        "attempts",
+        "available_at",
+        "created_at",
+        "processed_at",
+    )
+    search_fields = ("track_id", "task_name", "last_error")
+    list_filter = ("status", "task_name")
+    readonly_fields = ("created_at", "processed_at")
+    actions = [retry_chain_event]
+
+
+@admin.register(TaskArchive)
+class TaskArchiveAdmin(ImportExportModelAdmin):
+    list_display = (
+        "original_id",
+        "name",
+        "task_name",
+        "result_status",
+        "created_at",
+        "archived_at",
+    )
+    search_fields = ("name", "task_name", "track_id")
+    list_filter = ("task_name", "result_status", ClusterFilter)
+    readonly_fields = ("archived_at",)
@@ -6,6 +6,16 @@ class WorkerConfig(AppConfig):
     name = "orchestrator"
 
     def ready(self):  # noqa
+        from django.conf import settings
+
+        from authenticate.utils.tracing import tracer
+
+        tracer.configure(
+            service_name="api",
+            export_path=settings.TRACE_EXPORT_PATH or None,
+            otlp_endpoint=settings.TRACE_OTLP_ENDPOINT or None,
+        )
+
         # Import signals
         import orchestrator.chain.completed_emotion_detection  # noqa
         import orchestrator.chain.completed_hf_llm  # noqa
@@ -20,3 +30,6 @@ class WorkerConfig(AppConfig):
         import orchestrator.chain.completed_task  # noqa
         import orchestrator.chain.completed_text2speech  # noqa
         import orchestrator.chain.created_data_text  # noqa
+        import orchestrator.metrics.latency_sketch  # noqa
+        import orchestrator.metrics.track_latency  # noqa
+        import orchestrator.signals  # noqa
@@ -10,7 +10,8 @@ CLUSTER_Q_ETE_CONVERSATION_NAME = "CLUSTER_Q_ETE_CONVERSATION"
 CLUSTER_Q_ETE_CONVERSATION = {
     "speech2text": {
         "order": 0,
-        "extra_params": {},
+        # emotion detection reuses the audio features computed while it is decoded
+        "extra_params": {"precompute_audio_features": True},
         "component_type": "task",
         "task_name": "speech2text",
     },
@@ -87,6 +88,60 @@ CLUSTER_Q_NO_EMOTION_ETE_CONVERSATION = {
     },
 }
 
+"""
+Same models as CLUSTER_Q_ETE_CONVERSATION, but as a DAG:
+the LLM does not wait for the emotion detection, both run in parallel after the text is created,
+and the emotion detection result is only logged to the conversation
+"""
+CLUSTER_Q_PARALLEL_ETE_CONVERSATION_NAME = "CLUSTER_Q_PARALLEL_ETE_CONVERSATION"
+
+CLUSTER_Q_PARALLEL_ETE_CONVERSATION = {
+    "speech2text": {
+        "order": 0,
+        "extra_params": {"precompute_audio_features": True},
+        "component_type": "task",
+        "task_name": "speech2text",
+        "depends_on": [],
+    },
+    "completed_speech2text": {
+        "order": 1,
+        "extra_params": {},
+        "component_type": "signal",
+        "task_name": None,
+        "depends_on": ["speech2text"],
+    },
+    "created_data_text": {
+        "order": 2,
+        "extra_params": {},
+        "component_type": "signal",
+        "task_name": None,
+        "depends_on": ["completed_speech2text"],
+    },
+    "completed_emotion_detection": {
+        "order": 3,
+        "extra_params": {},
+        "component_type": "task",
+        "task_name": "emotion_detection",
+        "depends_on": ["created_data_text"],
+    },
+    "completed_quantization_llm": {
+        "order": 4,
+        "extra_params": {
+            "llm_model_name": "SOLAR-10",
+        },
+        "component_type": "task",
+        "task_name": "quantization_llm",
+        "depends_on": ["created_data_text"],
+    },
+    "completed_text2speech": {
+        "order": 5,
+        "extra_params": {},
+        "component_type": "task",
+        "task_name": "text2speech",
+        "depends_on": ["completed_quantization_llm"],
+    },
+}
+
 """
 This is the pipeline using the HF LLM model for the ETE conversation
 """
@@ -96,7 +151,8 @@ CLUSTER_HF_ETE_CONVERSATION_NAME = "CLUSTER_HF_ETE_CONVERSATION"
 CLUSTER_HF_ETE_CONVERSATION = {
     "speech2text": {
         "order": 0,
-        "extra_params": {},
+        # emotion detection reuses the audio features computed while it is decoded
+        "extra_params": {"precompute_audio_features": True},
         "component_type": "task",
         "task_name": "speech2text",
     },
@@ -335,6 +391,7 @@ CLUSTERS = {
     CLUSTER_GPT_4O_ETE_CONVERSATION_NAME: CLUSTER_GPT_4O_ETE_CONVERSATION,
     CLUSTER_GPT_4O_TEXT_ETE_CONVERSATION_NAME: CLUSTER_GPT_4O_TEXT_ETE_CONVERSATION,
     CLUSTER_Q_NO_EMOTION_ETE_CONVERSATION_NAME: CLUSTER_Q_NO_EMOTION_ETE_CONVERSATION,
+    CLUSTER_Q_PARALLEL_ETE_CONVERSATION_NAME: CLUSTER_Q_PARALLEL_ETE_CONVERSATION,
     CLUSTER_GPT_35_ETE_CONVERSATION_NAME: CLUSTER_GPT_35_ETE_CONVERSATION,
     CLUSTER_GPT_35_RAG_ETE_CONVERSATION_NAME: CLUSTER_GPT_35_RAG_ETE_CONVERSATION,
 }
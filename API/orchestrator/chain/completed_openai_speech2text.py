@@ -33,6 +33,10 @@ def trigger_completed_openai_speech2text(sender, **kwargs):
     result_profile = result_json.get("result_profile", {})
     text = result_profile.get("text", "")
     logger.info(text)
+    if not text.strip():
+        # no speech in the audio, nothing for the rest of the cluster to answer
+        ClusterManager.stop_track(track_id, reason="no speech in the audio")
+        return
 
     # Currently GPT-4o can only take images, so we will try to locate the relevant images
     uid = params.get("uid")
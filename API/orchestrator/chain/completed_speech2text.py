@@ -45,6 +45,10 @@ def trigger_completed_speech2text(sender, **kwargs):
     result_json = task_data.result_json
     result_profile = result_json.get("result_profile", {})
     text = result_profile.get("text", "")
+    if not text.strip():
+        # no speech in the audio, nothing for the rest of the cluster to answer
+        ClusterManager.stop_track(track_id, reason="no speech in the audio")
+        return
     logger.debug(result_json)
     data_text_obj = DataText.objects.filter(audio=audio_obj).first()
     if data_text_obj:
@@ -0,0 +1,102 @@
+"""
+Run the chain step of a completed task off the request path
+
+Task.save records a ChainEvent in the same transaction as the completion,
+the worker reporting the result only waits for that, the completion handler (saving the data, creating the next task)
+runs later in the background threads of the API process, or in the process_chain_events command.
+"""
+
+import threading
+from typing import Optional
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from authenticate.utils.get_logger import get_logger
+from orchestrator.models import ChainEvent
+
+logger = get_logger(__name__)
+
+
+class ChainDispatcher:
+    """
+    The consumer of the ChainEvent outbox, with a few daemon threads started on the first event
+
+    The threads are woken up when an event is committed in this process,
+    and poll every poll_seconds for the events recorded by other processes or waiting for a retry.
+    """
+
+    def __init__(
+        self, workers: int = 2, run_async: bool = True, poll_seconds: float = 1
+    ):
+        """
+        Args:
+            workers (int): The number of threads processing the events
+            run_async (bool): Process the events in the threads, otherwise right away in the caller
+            poll_seconds (float): How often the idle threads check for events
+        """
+        self.workers = workers
+        self.run_async = run_async
+        self.poll_seconds = poll_seconds
+        self.wakeup = threading.Event()
+        self.threads = []
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(
+                    target=self.consume, name=f"chain-dispatcher-{index}", daemon=True
+                )
+                thread.start()
+                self.threads.append(thread)
+
+    def wake(self):
+        """
+        Called after an event is committed
+        """
+        if not self.run_async:
+            self.process_pending()
+            return
+        self.start()
+        self.wakeup.set()
+
+    @staticmethod
+    def process_pending(limit: Optional[int] = None) -> int:
+        """
+        Process the available events until there are none left
+
+        Args:
+            limit (int): The maximum number of events to process, no limit if None
+
+        Returns:
+            int: The number of events processed
+        """
+        processed = 0
+        while limit is None or processed < limit:
+            if not ChainEvent.process_next():
+                break
+            processed += 1
+        return processed
+
+    def consume(self):
+        while True:
+            # the thread keeps its own database connection, drop it when it is stale or broken
+            close_old_connections()
+            try:
+                self.process_pending()
+            except Exception as e:  # noqa
+                logger.exception(f"Chain dispatcher failed: {e}")
+            finally:
+                close_old_connections()
+            self.wakeup.wait(self.poll_seconds)
+            self.wakeup.clear()
+
+
+chain_dispatcher = ChainDispatcher(
+    workers=settings.CHAIN_DISPATCH_WORKERS,
+    run_async=settings.CHAIN_DISPATCH_ASYNC,
+    poll_seconds=settings.CHAIN_EVENT_POLL_SECONDS,
+)
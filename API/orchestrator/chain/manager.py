@@ -11,14 +11,24 @@ For example, end-to-end conversation chain will have the following components:
 - completed_emotion_detection
 - completed_quantization_llm
 - completed_text2speech
+
+A cluster can also be a DAG, when its components declare depends_on,
+independent components are then dispatched in parallel,
+and a component depending on several components waits for all of them (join).
+
+The clusters are compiled and validated once at import, see orchestrator.chain.topology.
 """
 
-from typing import Optional, Tuple
+from typing import Mapping, Optional, Tuple
+
+from django.db import transaction
 
 from authenticate.utils.get_logger import get_logger
-from orchestrator.chain.clusters import CLUSTERS
+from authenticate.utils.tracing import tracer
 from orchestrator.chain.signals import created_data_text
-from orchestrator.models import Task
+from orchestrator.chain.topology import get_topology, get_track_topology, thaw
+from orchestrator.chain.track import cluster_name_from_track_id
+from orchestrator.models import ChainJoin, ClusterTrackCount, Task
 
 logger = get_logger(__name__)
 
@@ -26,60 +36,134 @@ logger = get_logger(__name__)
 class ClusterManager:
 
     @staticmethod
-    def get_cluster(cluster_name: str):
+    def get_cluster(cluster_name: str) -> Optional[Mapping]:
         """
         Get the cluster
 
         Args:
             cluster_name (str): The cluster name
         """
-        if cluster_name in CLUSTERS:
-            return CLUSTERS[cluster_name]
-        return None
+        topology = get_topology(cluster_name)
+        if topology is None:
+            return None
+        return topology.components
 
     @staticmethod
     def get_next_chain_component(
-        cluster: dict, current_component: str
-    ) -> Tuple[Optional[str], Optional[dict]]:
+        cluster_name: str, current_component: str, track_id: Optional[str] = None
+    ) -> Tuple[Optional[str], Optional[Mapping]]:
         """
         Get the next chain
 
         Args:
-            cluster (dict): The cluster
+            cluster_name (str): The cluster name
             current_component (str): The current component
+            track_id (str): The track, to follow the version of the cluster it started on
 
         Return:
-            Tuple[Optional[str], Optional[dict]]: The next component and its parameters if exists, otherwise None
+            Tuple[Optional[str], Optional[Mapping]]: The next component and its parameters if exists, otherwise None
         """
-        chain = []
-        for key, value in cluster.items():
-            chain.append(key)
-        chain.sort(key=lambda x: cluster[x]["order"])
-        if current_component == "init":
-            """
-            If this is the start of the chain, then return the first component
-            """
-            return chain[0], cluster[chain[0]]
-        # index of the current component
-        current_component_index = chain.index(current_component)
-        next_index = current_component_index + 1
-        if next_index >= len(chain):
+        topology = (
+            get_track_topology(track_id) if track_id else get_topology(cluster_name)
+        )
+        if topology is None:
             return None, None
-        return chain[next_index], cluster[chain[next_index]]
+        next_components = topology.next_components(current_component)
+        if not next_components:
+            return None, None
+        return next_components[0]
+
+    @staticmethod
+    def join(
+        track_id: str,
+        component_name: str,
+        component: Mapping,
+        current_component: str,
+        params: dict,
+    ) -> Optional[dict]:
+        """
+        Record the arrival of the current component at the join component
+
+        The join row is locked, so when two dependencies complete at the same time,
+        exactly one of them sees all the dependencies arrived and dispatches the component.
+
+        Args:
+            track_id (str): The track ID
+            component_name (str): The join component
+            component (Mapping): The settings of the join component
+            current_component (str): The dependency which just completed
+            params (dict): The parameters passed by the dependency
+
+        Return:
+            Optional[dict]: The merged parameters if the component should be dispatched now, otherwise None
+        """
+        depends_on = component.get("depends_on", [])
+        if len(depends_on) <= 1:
+            return params
+        with transaction.atomic():
+            chain_join, _ = ChainJoin.objects.select_for_update().get_or_create(
+                track_id=track_id, component=component_name
+            )
+            if chain_join.dispatched or chain_join.stopped:
+                return None
+            if current_component not in chain_join.arrived:
+                chain_join.arrived.append(current_component)
+            chain_join.parameters.update(params)
+            chain_join.dispatched = set(depends_on).issubset(chain_join.arrived)
+            chain_join.save()
+            if not chain_join.dispatched:
+                logger.info(
+                    f"{component_name} waiting for "
+                    f"{set(depends_on) - set(chain_join.arrived)} on {track_id}"
+                )
+                return None
+            return chain_join.parameters
+
+    @staticmethod
+    def stop_track(track_id: str, reason: str):
+        """
+        Stop the track before the end of its cluster, like when there is no speech in the audio
+
+        The joins of the track are closed, so in a DAG cluster the other branches do not wait for this one,
+        and the track is counted as stopped, instead of staying not completed.
+
+        Args:
+            track_id (str): The track ID
+            reason (str): Why the track stops, for the logs
+        """
+        cluster_name = cluster_name_from_track_id(track_id)
+        topology = get_track_topology(track_id)
+        if topology is None:
+            logger.error(f"Cluster {cluster_name} not found")
+            return
+        with transaction.atomic():
+            for component_name, dependencies in topology.dependencies.items():
+                if len(dependencies) <= 1:
+                    continue
+                chain_join, _ = ChainJoin.objects.select_for_update().get_or_create(
+                    track_id=track_id, component=component_name
+                )
+                if not chain_join.dispatched:
+                    chain_join.stopped = True
+                    chain_join.save()
+            ClusterTrackCount.increment(topology.name, "stopped")
+        logger.info(f"Track {track_id} stopped: {reason}")
 
     @classmethod
-    def get_next(cls, cluster_name: str, current_component: str):
+    def get_next(
+        cls, cluster_name: str, current_component: str, track_id: Optional[str] = None
+    ):
         """
         Get the next component
 
         Args:
             cluster_name (str): The cluster name
             current_component (str): The current component
+            track_id (str): The track, to follow the version of the cluster it started on
         """
-        cluster = cls.get_cluster(cluster_name)
-        if cluster is None:
+        if get_topology(cluster_name) is None:
             return None
-        return ClusterManager.get_next_chain_component(cluster, current_component)
+        return cls.get_next_chain_component(cluster_name, current_component, track_id)
 
     @classmethod
     def chain_next(
@@ -102,19 +186,77 @@ class ClusterManager:
         """
         logger.info(f"Current component: {current_component}")
         logger.info(f"Next component params: {next_component_params}")
-        cluster_name = track_id.split("-")[1]
-        next_component_name, next_component = cls.get_next(
-            cluster_name, current_component
-        )
-        logger.info(f"Next component: {next_component_name}")
+        cluster_name = cluster_name_from_track_id(track_id)
+        # the version the track started on, not the latest edit of the cluster
+        topology = get_track_topology(track_id)
+        if topology is None:
+            logger.error(f"Cluster {cluster_name} not found")
+            return None
 
-        if next_component_name is None:
-            return
+        with tracer.span(
+            "api.chain_next",
+            track_id=track_id,
+            attributes={"cluster_name": cluster_name, "component": current_component},
+        ):
+            task_ids = []
+            for next_component_name, next_component in topology.next_components(
+                current_component
+            ):
+                logger.info(f"Next component: {next_component_name}")
+                params = cls.join(
+                    track_id=track_id,
+                    component_name=next_component_name,
+                    component=next_component,
+                    current_component=current_component,
+                    params=next_component_params,
+                )
+                if params is None:
+                    continue
+                task_id = cls.dispatch(
+                    track_id=track_id,
+                    next_component_name=next_component_name,
+                    next_component=next_component,
+                    next_component_params=params,
+                    name=name,
+                    user=user,
+                    cluster_version=topology.version,
+                )
+                if task_id is not None:
+                    task_ids.append(task_id)
+        # the first task, which is the only one for the chain clusters
+        return task_ids[0] if task_ids else None
+
+    @classmethod
+    def dispatch(
+        cls,
+        track_id: str,
+        next_component_name: str,
+        next_component: Mapping,
+        next_component_params: dict,
+        name: str = None,
+        user=None,
+        cluster_version: Optional[int] = None,
+    ) -> Optional[int]:
+        """
+        Create the task, or send the signal of the component
+
+        Args:
+            track_id (str): The track ID
+            next_component_name (str): The component to dispatch
+            next_component (Mapping): The settings of the component
+            next_component_params (dict): The parameters for the component
+            name (str): The task name, it will be used to aggregate the task
+            user (None): The user
+            cluster_version (int): The version of the cluster the track follows
+
+        Return:
+            Optional[int]: The task ID if a task is created
+        """
         # do something with the next component
         # It can be a task or a signal
         next_parameters = {
             **next_component_params,
-            **next_component.get("extra_params", {}),
+            **thaw(next_component.get("extra_params", {})),
         }
         logger.info(next_parameters)
         logger.info(next_component_name)
@@ -126,6 +268,7 @@ class ClusterManager:
                 task_name=next_component["task_name"],
                 parameters=next_parameters,
                 track_id=track_id,
+                cluster_version=cluster_version,
             )
             logger.info(f"Task {task.id} created for {next_component['task_name']}")
             return task.id
@@ -13,3 +13,18 @@ completed_openai_gpt_4o_text_only = Signal()  # task type
 completed_openai_text2speech = Signal()  # task type
 completed_rag = Signal()  # task type
 created_data_text = Signal()
+
+# task name => the signal sent when a task of that name completes
+COMPLETED_TASK_SIGNALS = {
+    "speech2text": completed_speech2text,
+    "emotion_detection": completed_emotion_detection,
+    "quantization_llm": completed_quantization_llm,
+    "text2speech": completed_text2speech,
+    "hf_llm": completed_hf_llm,
+    "openai_speech2text": completed_openai_speech2text,
+    "openai_gpt_4o_text_and_image": completed_openai_gpt_4o_text_and_image,
+    "openai_gpt_35": completed_openai_gpt_35,
+    "openai_gpt_4o_text_only": completed_openai_gpt_4o_text_only,
+    "rag": completed_rag,
+    "openai_text2speech": completed_openai_text2speech,
+}
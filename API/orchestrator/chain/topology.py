@@ -0,0 +1,492 @@
+"""
+Clusters are compiled once into an immutable topology
+
+So the chain, the metrics and the benchmarks do not sort the components of a cluster on every call,
+and a broken cluster definition fails when the API starts instead of in the middle of a conversation.
+
+The clusters can also be defined as ClusterDefinition records, which are reloaded while the API runs.
+A track keeps the version of the cluster it started on, see get_track_topology,
+so editing a cluster does not move the tracks in flight to the new graph.
+"""
+
+import copy
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import Count, Max, Q
+
+from authenticate.utils.get_logger import get_logger
+from orchestrator.chain.clusters import CLUSTERS
+from orchestrator.chain.track import cluster_name_from_track_id
+from orchestrator.models import ClusterDefinition, Task
+
+logger = get_logger(__name__)
+
+COMPONENT_TYPES = ("task", "signal")
+
+
+class ClusterDefinitionError(ValueError):
+    """
+    The cluster definition is not valid
+    """
+
+
+def freeze(value):
+    """
+    Make the nested dicts and lists read only
+
+    Args:
+        value: The value to freeze
+    """
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    """
+    Copy the frozen value back into plain dicts and lists, so it can be modified or stored as JSON
+
+    Args:
+        value: The frozen value
+    """
+    if isinstance(value, Mapping):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+@dataclass(frozen=True)
+class ClusterTopology:
+    """
+    The compiled cluster
+
+    Attributes:
+        name (str): The cluster name
+        components (Mapping[str, Mapping]): The read only component settings
+        ordered_components (Tuple[str, ...]): The component names sorted by order
+        successors (Mapping[str, Tuple[str, ...]]): The components to dispatch after each component,
+            "init" for the start of the track
+        dependencies (Mapping[str, Tuple[str, ...]]): The components each component waits for
+        task_names (Tuple[str, ...]): The task names of the task stages, sorted by order
+        required_tasks_count (int): How many tasks a complete track has
+        is_dag (bool): Whether the components declare depends_on
+        version (int): The version of the ClusterDefinition, 0 for the clusters defined in the code
+    """
+
+    name: str
+    components: Mapping[str, Mapping]
+    ordered_components: Tuple[str, ...]
+    successors: Mapping[str, Tuple[str, ...]]
+    dependencies: Mapping[str, Tuple[str, ...]]
+    task_names: Tuple[str, ...]
+    required_tasks_count: int
+    is_dag: bool
+    version: int = 0
+
+    def next_components(
+        self, current_component: str
+    ) -> Tuple[Tuple[str, Mapping], ...]:
+        """
+        Get the components to dispatch after the current component
+
+        Args:
+            current_component (str): The current component, "init" for the start of the track
+
+        Returns:
+            Tuple[Tuple[str, Mapping], ...]: The next components and their settings
+        """
+        return tuple(
+            (name, self.components[name])
+            for name in self.successors.get(current_component, ())
+        )
+
+    @classmethod
+    def compile(
+        cls,
+        name: str,
+        cluster: dict,
+        known_task_names: Optional[Set[str]] = None,
+        version: int = 0,
+    ) -> "ClusterTopology":
+        """
+        Validate the cluster definition and compile it
+
+        Args:
+            name (str): The cluster name
+            cluster (dict): The cluster definition
+            known_task_names (Set[str]): The task names the agent handles, not checked if None
+            version (int): The version of the definition
+
+        Returns:
+            ClusterTopology: The compiled cluster
+
+        Raises:
+            ClusterDefinitionError: If the cluster definition is not valid
+        """
+        # the name is parsed back from the track ID, T-{cluster_name}-{uid}
+        if not name or "-" in name:
+            raise ClusterDefinitionError(
+                f"Cluster name {name!r} should be non empty and without '-'"
+            )
+        if not isinstance(cluster, dict) or not cluster:
+            raise ClusterDefinitionError(
+                f"Cluster {name} should be a non empty dict of components"
+            )
+        for component_name, component in cluster.items():
+            if not isinstance(component, dict):
+                raise ClusterDefinitionError(
+                    f"Cluster {name}: {component_name} should be a dict"
+                )
+            if component_name == "init":
+                raise ClusterDefinitionError(
+                    f"Cluster {name}: 'init' is reserved for the start of the track"
+                )
+            if not isinstance(component.get("order"), int):
+                raise ClusterDefinitionError(
+                    f"Cluster {name}: {component_name} should have an integer order"
+                )
+            if component.get("component_type") not in COMPONENT_TYPES:
+                raise ClusterDefinitionError(
+                    f"Cluster {name}: {component_name} component_type should be one of {COMPONENT_TYPES}"
+                )
+            if component["component_type"] == "task" and not component.get("task_name"):
+                raise ClusterDefinitionError(
+                    f"Cluster {name}: task {component_name} should have a task_name"
+                )
+            if (
+                component["component_type"] == "task"
+                and known_task_names is not None
+                and component["task_name"] not in known_task_names
+            ):
+                raise ClusterDefinitionError(
+                    f"Cluster {name}: unknown task_name {component['task_name']} for {component_name}"
+                )
+            if not isinstance(component.get("extra_params", {}), dict):
+                raise ClusterDefinitionError(
+                    f"Cluster {name}: {component_name} extra_params should be a dict"
+                )
+
+        # sorted is stable, so components with the same order keep the definition order
+        ordered_components = tuple(
+            sorted(
+                cluster.keys(),
+                key=lambda component_name: cluster[component_name]["order"],
+            )
+        )
+        declared = ["depends_on" in component for component in cluster.values()]
+        is_dag = any(declared)
+        if is_dag and not all(declared):
+            raise ClusterDefinitionError(
+                f"Cluster {name}: either all or none of the components should declare depends_on"
+            )
+
+        if is_dag:
+            dependencies = {
+                component_name: tuple(cluster[component_name]["depends_on"])
+                for component_name in ordered_components
+            }
+        else:
+            # a chain, each component depends on the previous one
+            dependencies = {
+                component_name: (ordered_components[index - 1],) if index else ()
+                for index, component_name in enumerate(ordered_components)
+            }
+        cls.validate_dependencies(name, cluster, dependencies)
+
+        successors = {"init": []}
+        for component_name in ordered_components:
+            successors[component_name] = []
+        for component_name in ordered_components:
+            for dependency in dependencies[component_name] or ("init",):
+                successors[dependency].append(component_name)
+
+        task_names = tuple(
+            cluster[component_name]["task_name"]
+            for component_name in ordered_components
+            if cluster[component_name]["component_type"] == "task"
+        )
+        return cls(
+            name=name,
+            components=freeze(copy.deepcopy(cluster)),
+            ordered_components=ordered_components,
+            successors=MappingProxyType(
+                {key: tuple(value) for key, value in successors.items()}
+            ),
+            dependencies=MappingProxyType(dependencies),
+            task_names=task_names,
+            required_tasks_count=len(task_names),
+            is_dag=is_dag,
+            version=version,
+        )
+
+    @staticmethod
+    def validate_dependencies(
+        name: str, cluster: dict, dependencies: Dict[str, Tuple[str, ...]]
+    ):
+        """
+        Check the dependencies reference existing components, there is a start, and there is no cycle
+
+        Args:
+            name (str): The cluster name
+            cluster (dict): The cluster definition
+            dependencies (Dict[str, Tuple[str, ...]]): The dependencies of each component
+        """
+        for component_name, component_dependencies in dependencies.items():
+            for dependency in component_dependencies:
+                if dependency not in cluster:
+                    raise ClusterDefinitionError(
+                        f"Cluster {name}: {component_name} depends on unknown component {dependency}"
+                    )
+            if (
+                len(component_dependencies) > 1
+                and cluster[component_name]["component_type"] != "task"
+            ):
+                # the merged parameters of a join are stored as JSON, signals pass model objects
+                raise ClusterDefinitionError(
+                    f"Cluster {name}: join {component_name} should be a task"
+                )
+        if not any(not deps for deps in dependencies.values()):
+            raise ClusterDefinitionError(f"Cluster {name} has no start component")
+
+        # depth first search for cycles
+        visiting, visited = set(), set()
+
+        def visit(component_name: str):
+            if component_name in visited:
+                return
+            if component_name in visiting:
+                raise ClusterDefinitionError(
+                    f"Cluster {name}: dependency cycle through {component_name}"
+                )
+            visiting.add(component_name)
+            for dependency in dependencies[component_name]:
+                visit(dependency)
+            visiting.remove(component_name)
+            visited.add(component_name)
+
+        for component_name in dependencies:
+            visit(component_name)
+
+
+def known_task_names() -> Set[str]:
+    return {task_name for task_name, _ in Task.get_task_name_choices()}
+
+
+def compile_clusters(clusters: dict, version: int = 0) -> Dict[str, ClusterTopology]:
+    """
+    Compile all the clusters
+
+    Args:
+        clusters (dict): The cluster definitions by name
+        version (int): The version of the definitions
+
+    Returns:
+        Dict[str, ClusterTopology]: The compiled clusters by name
+    """
+    task_names = known_task_names()
+    return {
+        name: ClusterTopology.compile(name, cluster, task_names, version)
+        for name, cluster in clusters.items()
+    }
+
+
+class ClusterRegistry:
+    """
+    The compiled clusters, the ones defined in the code overridden by the ClusterDefinition records
+
+    The records are checked at most every reload_seconds, and only recompiled when they changed,
+    so a cluster added or edited in the admin is used by the running API without a restart.
+    An invalid record is logged and skipped, the previous valid version of that cluster is used.
+
+    The previous versions stay compiled for the tracks which started on them,
+    and a version this process never loaded is compiled from its record when a track asks for it.
+    """
+
+    def __init__(self, clusters: dict, reload_seconds: float):
+        """
+        Args:
+            clusters (dict): The clusters defined in the code
+            reload_seconds (float): How often to check the ClusterDefinition records
+        """
+        self.code_topologies = compile_clusters(clusters)
+        self.topologies: Dict[str, ClusterTopology] = dict(self.code_topologies)
+        # every version compiled so far, by name and version
+        self.versions: Dict[Tuple[str, int], ClusterTopology] = {}
+        self.reload_seconds = reload_seconds
+        self.checked_at: Optional[float] = None
+        self.signature = None
+        self.lock = threading.Lock()
+
+    def maybe_reload(self):
+        """
+        Reload the records if they changed since the last check
+        """
+        now = time.monotonic()
+        if self.checked_at is not None and now - self.checked_at < self.reload_seconds:
+            return
+        with self.lock:
+            if (
+                self.checked_at is not None
+                and now - self.checked_at < self.reload_seconds
+            ):
+                return
+            self.checked_at = now
+            try:
+                signature = ClusterDefinition.objects.aggregate(
+                    count=Count("id"),
+                    active=Count("id", filter=Q(active=True)),
+                    updated_at=Max("updated_at"),
+                )
+                if signature == self.signature:
+                    return
+                definitions = list(
+                    ClusterDefinition.objects.filter(active=True).order_by(
+                        "name", "-version"
+                    )
+                )
+            except DatabaseError as e:
+                # the table does not exist yet, before the migration
+                logger.warning(f"Can not load the cluster definitions: {e}")
+                return
+            self.signature = signature
+            self.topologies = self.compile_definitions(definitions)
+
+    def compile_definitions(
+        self, definitions: List[ClusterDefinition]
+    ) -> Dict[str, ClusterTopology]:
+        """
+        Compile the latest valid version of each cluster record on top of the code clusters
+
+        Args:
+            definitions (List[ClusterDefinition]): The active records, latest version first for each name
+
+        Returns:
+            Dict[str, ClusterTopology]: The compiled clusters by name
+        """
+        topologies = dict(self.code_topologies)
+        task_names = known_task_names()
+        loaded = set()
+        for definition in definitions:
+            if definition.name in loaded:
+                continue
+            try:
+                topology = ClusterTopology.compile(
+                    definition.name,
+                    definition.definition,
+                    task_names,
+                    definition.version,
+                )
+            except ClusterDefinitionError as e:
+                # fall back to the previous version
+                logger.error(f"Skip {definition}: {e}")
+                continue
+            loaded.add(definition.name)
+            if self.topologies.get(definition.name) != topology:
+                logger.info(f"Loaded cluster {definition}")
+            topologies[definition.name] = topology
+            self.versions[(definition.name, definition.version)] = topology
+        return topologies
+
+    def get(self, cluster_name: str) -> Optional[ClusterTopology]:
+        self.maybe_reload()
+        return self.topologies.get(cluster_name)
+
+    def all(self) -> Dict[str, ClusterTopology]:
+        self.maybe_reload()
+        return dict(self.topologies)
+
+    def get_version(self, cluster_name: str, version: int) -> Optional[ClusterTopology]:
+        """
+        Get one version of the cluster, even if it is not the latest one anymore
+
+        Args:
+            cluster_name (str): The cluster name
+            version (int): The version, 0 for the cluster defined in the code
+
+        Returns:
+            Optional[ClusterTopology]: The compiled cluster, None if that version can not be loaded
+        """
+        if version == 0:
+            return self.code_topologies.get(cluster_name)
+        topology = self.versions.get((cluster_name, version))
+        if topology is not None:
+            return topology
+        definition = ClusterDefinition.objects.filter(
+            name=cluster_name, version=version
+        ).first()
+        if definition is None:
+            return None
+        try:
+            topology = ClusterTopology.compile(
+                definition.name, definition.definition, known_task_names(), version
+            )
+        except ClusterDefinitionError as e:
+            logger.error(f"Can not load {definition}: {e}")
+            return None
+        with self.lock:
+            self.versions[(cluster_name, version)] = topology
+        return topology
+
+
+cluster_registry = ClusterRegistry(CLUSTERS, settings.CLUSTER_RELOAD_SECONDS)
+
+
+def get_topology(cluster_name: str) -> Optional[ClusterTopology]:
+    """
+    Get the compiled cluster
+
+    Args:
+        cluster_name (str): The cluster name
+
+    Returns:
+        Optional[ClusterTopology]: The compiled cluster, None if not found
+    """
+    return cluster_registry.get(cluster_name)
+
+
+def get_track_topology(track_id: Optional[str]) -> Optional[ClusterTopology]:
+    """
+    Get the version of the cluster the track started on, recorded on its first task,
+    the latest version if the track has no task yet
+
+    Args:
+        track_id (str): The track ID, T-{cluster_name}-{uid}
+
+    Returns:
+        Optional[ClusterTopology]: The compiled cluster, None if not found
+    """
+    cluster_name = cluster_name_from_track_id(track_id)
+    version = (
+        Task.objects.filter(track_id=track_id, cluster_version__isnull=False)
+        .order_by("created_at", "id")
+        .values_list("cluster_version", flat=True)
+        .first()
+    )
+    if version is None:
+        return get_topology(cluster_name)
+    topology = cluster_registry.get_version(cluster_name, version)
+    if topology is None:
+        logger.warning(
+            f"Version {version} of {cluster_name} not found, {track_id} goes on with the latest one"
+        )
+        return get_topology(cluster_name)
+    return topology
+
+
+def get_topologies() -> Dict[str, ClusterTopology]:
+    """
+    Get all the compiled clusters
+
+    Returns:
+        Dict[str, ClusterTopology]: The compiled clusters by name
+    """
+    return cluster_registry.all()
@@ -0,0 +1,22 @@
+from typing import Optional
+
+
+def cluster_name_from_track_id(track_id: Optional[str]) -> Optional[str]:
+    """
+    Get the cluster name from the track ID, which is like T-{cluster_name}-{uid}
+
+    It is parsed once when a record is created, into its cluster_name column,
+    the queries per cluster then filter on that column.
+
+    Args:
+        track_id (str): The track ID
+
+    Returns:
+        Optional[str]: The cluster name, None if the track ID is not in that format
+    """
+    if not track_id:
+        return None
+    parts = track_id.split("-", 2)
+    if len(parts) < 3 or parts[0] != "T":
+        return None
+    return parts[1]
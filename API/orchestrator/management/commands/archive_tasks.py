@@ -0,0 +1,47 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from authenticate.utils.get_logger import get_logger
+from orchestrator.models import Task, TaskArchive
+
+logger = get_logger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Move the finished tasks older than the given days from Task to TaskArchive"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=30,
+            help="Archive the tasks last updated more than this many days ago",
+        )
+        parser.add_argument(
+            "--batch_size",
+            type=int,
+            default=1000,
+            help="The tasks moved per transaction",
+        )
+        parser.add_argument(
+            "--dry_run",
+            action="store_true",
+            help="Only count the tasks which would be archived",
+        )
+
+    def handle(self, *args, **options):
+        if options["days"] < 0:
+            raise CommandError("--days should not be negative")
+        older_than = timezone.now() - timedelta(days=options["days"])
+        if options["dry_run"]:
+            count = TaskArchive.archivable(older_than).count()
+            logger.critical(f"{count} tasks would be archived")
+            return
+        archived = TaskArchive.archive_tasks(
+            older_than=older_than, batch_size=options["batch_size"]
+        )
+        logger.critical(
+            f"Archived {archived} tasks, {Task.objects.count()} tasks left in the queue table"
+        )
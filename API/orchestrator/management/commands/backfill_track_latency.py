@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from authenticate.utils.get_logger import get_logger
+from orchestrator.chain.topology import get_topologies
+from orchestrator.metrics.track_latency import save_track_latency
+from orchestrator.metrics.utils import extract_task_group
+from orchestrator.models import ClusterTrackCount, Task, TaskArchive, TrackLatency
+
+logger = get_logger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Save the latency of the tracks completed before the latency rows were recorded, "
+        "and recount the tracks of the clusters"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--cluster",
+            type=str,
+            default="all",
+            help="The cluster to backfill, all the clusters by default",
+        )
+        parser.add_argument(
+            "--overwrite",
+            action="store_true",
+            help="Recompute the tracks which already have a latency row",
+        )
+
+    def handle(self, *args, **options):
+        topologies = get_topologies()
+        if options["cluster"] == "all":
+            cluster_names = list(topologies.keys())
+        elif options["cluster"] in topologies:
+            cluster_names = [options["cluster"]]
+        else:
+            raise CommandError(f"Cluster {options['cluster']} not found")
+
+        for cluster_name in cluster_names:
+            task_groups, _, _ = extract_task_group(cluster_name)
+            existing = set()
+            if not options["overwrite"]:
+                existing = set(
+                    TrackLatency.objects.filter(cluster_name=cluster_name).values_list(
+                        "track_id", flat=True
+                    )
+                )
+            saved = 0
+            for track_id, task_group in task_groups.items():
+                if track_id in existing:
+                    continue
+                if save_track_latency(track_id, task_group) is not None:
+                    saved += 1
+            # the tracks started before the counters were kept, counted once here
+            ClusterTrackCount.objects.update_or_create(
+                cluster_name=cluster_name,
+                defaults={
+                    "started": Task.objects.filter(cluster_name=cluster_name)
+                    .values("track_id")
+                    .union(
+                        TaskArchive.objects.filter(cluster_name=cluster_name).values(
+                            "track_id"
+                        )
+                    )
+                    .count(),
+                    "completed": TrackLatency.objects.filter(
+                        cluster_name=cluster_name
+                    ).count(),
+                },
+            )
+            logger.critical(
+                f"Cluster {cluster_name}: saved {saved} of {len(task_groups)} tracks"
+            )
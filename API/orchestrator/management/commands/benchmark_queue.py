@@ -0,0 +1,166 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from authenticate.utils.get_logger import get_logger
+from orchestrator.models import Task
+
+logger = get_logger(__name__)
+
+BENCHMARK_TASK_NAME = "benchmark_queue"
+BENCHMARK_CLUSTER = "BENCHMARKQUEUE"
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the queue pick latency while the completed task history grows, "
+        "run it against a scratch database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=str,
+            default="10000,100000,1000000",
+            help="The completed task history sizes to measure at, comma separated",
+        )
+        parser.add_argument(
+            "--pending",
+            type=int,
+            default=100,
+            help="The number of pending tasks in the queue",
+        )
+        parser.add_argument(
+            "--samples", type=int, default=50, help="The claims to time per size"
+        )
+        parser.add_argument("--batch_size", type=int, default=10000)
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Keep the benchmark tasks, otherwise they are deleted at the end",
+        )
+
+    def handle(self, *args, **options):
+        """
+        The benchmark tasks use their own task name and cluster,
+        so the claims never touch the real queue, and they are deleted at the end.
+        """
+        sizes = sorted(int(size) for size in options["sizes"].split(","))
+        try:
+            self.create_tasks(options["pending"], "pending", options["batch_size"])
+            history = 0
+            results = []
+            for size in sizes:
+                self.create_tasks(size - history, "completed", options["batch_size"])
+                history = size
+                timings = self.time_claims(options["samples"])
+                results.append(
+                    (
+                        size,
+                        statistics.median(timings),
+                        self.percentile(timings, 95),
+                        self.time_track_prefix(),
+                    )
+                )
+                self.stdout.write(
+                    f"history={size} claim p50={results[-1][1]:.2f}ms "
+                    f"p95={results[-1][2]:.2f}ms track_id prefix={results[-1][3]:.2f}ms"
+                )
+            if connection.vendor == "postgresql":
+                self.stdout.write(self.claim_queryset().explain(analyze=True))
+            if len(results) > 1:
+                self.stdout.write(
+                    f"history x{sizes[-1] / sizes[0]:.0f}: "
+                    f"claim p50 x{results[-1][1] / results[0][1]:.2f}"
+                )
+        finally:
+            if not options["keep"]:
+                deleted, _ = Task.objects.filter(task_name=BENCHMARK_TASK_NAME).delete()
+                logger.info(f"Deleted {deleted} benchmark tasks")
+
+    @staticmethod
+    def create_tasks(count: int, result_status: str, batch_size: int):
+        """
+        Bulk insert the tasks, bypassing Task.save so no chain event is recorded
+
+        Args:
+            count (int): The number of tasks
+            result_status (str): The status of the tasks
+            batch_size (int): The rows per insert
+        """
+        now = timezone.now()
+        created = 0
+        while created < count:
+            batch = min(batch_size, count - created)
+            Task.objects.bulk_create(
+                [
+                    Task(
+                        name=BENCHMARK_TASK_NAME,
+                        task_name=BENCHMARK_TASK_NAME,
+                        result_status=result_status,
+                        parameters={},
+                        track_id=f"T-{BENCHMARK_CLUSTER}-{created + index:032x}",
+                        cluster_name=BENCHMARK_CLUSTER,
+                    )
+                    for index in range(batch)
+                ],
+                batch_size=batch_size,
+            )
+            created += batch
+        # spread the history over the past, the pending tasks stay the newest
+        if result_status == "completed":
+            Task.objects.filter(
+                task_name=BENCHMARK_TASK_NAME,
+                result_status="completed",
+                created_at__gte=now,
+            ).update(created_at=now - timedelta(days=30))
+
+    @staticmethod
+    def claim_queryset():
+        return Task.objects.filter(
+            task_name=BENCHMARK_TASK_NAME, result_status="pending"
+        ).order_by("created_at", "id")[:1]
+
+    @staticmethod
+    def time_claims(samples: int):
+        """
+        Claim one benchmark task at a time, and put it back to pending after the timing
+
+        Returns:
+            List[float]: The claim latencies in milliseconds
+        """
+        timings = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            tasks = Task.claim_tasks(task_name=BENCHMARK_TASK_NAME, limit=1)
+            timings.append((time.perf_counter() - start) * 1000)
+            Task.objects.filter(id__in=[task.id for task in tasks]).update(
+                result_status="pending", claimed_by=None, lease_expires_at=None
+            )
+        return timings
+
+    @staticmethod
+    def time_track_prefix() -> float:
+        """
+        Time a track_id prefix lookup of one track, like the benchmarks do per cluster
+
+        Returns:
+            float: The latency in milliseconds
+        """
+        start = time.perf_counter()
+        list(
+            Task.objects.filter(
+                track_id__startswith=f"T-{BENCHMARK_CLUSTER}-{0:031x}"
+            ).values_list("id", flat=True)
+        )
+        return (time.perf_counter() - start) * 1000
+
+    @staticmethod
+    def percentile(values, percent: float) -> float:
+        values = sorted(values)
+        index = min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))
+        return values[index]
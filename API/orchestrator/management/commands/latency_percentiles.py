@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from authenticate.utils.get_logger import get_logger
+from orchestrator.metrics.latency_sketch import latency_percentiles
+
+logger = get_logger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Show the latency percentiles of each task name over the last minutes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--minutes",
+            type=int,
+            default=60,
+            help="The period, rounded to the sketch windows",
+        )
+        parser.add_argument(
+            "--cluster", type=str, default=None, help="All the clusters by default"
+        )
+        parser.add_argument(
+            "--percentiles",
+            type=str,
+            default="50,90,95,99",
+            help="Comma separated",
+        )
+        parser.add_argument(
+            "--latency_type",
+            type=str,
+            default="overall",
+            help="model, transfer or overall, all of them if empty",
+        )
+
+    def handle(self, *args, **options):
+        percentiles = [float(value) for value in options["percentiles"].split(",")]
+        rows = latency_percentiles(
+            since=timezone.now() - timedelta(minutes=options["minutes"]),
+            cluster_name=options["cluster"],
+            percentiles=percentiles,
+        )
+        if options["latency_type"]:
+            rows = [
+                row for row in rows if row["latency_type"] == options["latency_type"]
+            ]
+        if not rows:
+            logger.critical("No latency recorded in the period")
+            return
+        for row in rows:
+            values = " ".join(
+                f"p{percentile:g}={row[f'p{percentile:g}']:.3f}s"
+                for percentile in percentiles
+            )
+            logger.critical(
+                f"{row['cluster_name']} {row['task_name']} {row['latency_type']} "
+                f"count={row['count']} {values} max={row['max']:.3f}s"
+            )
@@ -0,0 +1,79 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from authenticate.utils.get_logger import get_logger
+from orchestrator.chain.topology import (
+    ClusterDefinitionError,
+    compile_clusters,
+    get_topologies,
+    thaw,
+)
+from orchestrator.models import ClusterDefinition
+
+logger = get_logger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Load the cluster definitions from a JSON file, or export the current clusters"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            type=str,
+            help="The JSON file, {cluster_name: {component_name: {...}}}",
+        )
+        parser.add_argument(
+            "--export",
+            action="store_true",
+            help="Write the current clusters to the file instead of loading it",
+        )
+        parser.add_argument(
+            "--description", type=str, default="", help="Saved with the new versions"
+        )
+
+    def handle(self, *args, **options):
+        """
+        All the clusters of the file are validated before any of them is saved,
+        a cluster is only saved as a new version when its definition changed.
+        """
+        path = options["path"]
+        if options["export"]:
+            clusters = {
+                name: thaw(topology.components)
+                for name, topology in get_topologies().items()
+            }
+            with open(path, "w") as f:
+                json.dump(clusters, f, indent=2)
+            logger.critical(f"Exported {len(clusters)} clusters to {path}")
+            return
+
+        try:
+            with open(path) as f:
+                clusters = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            raise CommandError(f"Can not read {path}: {e}")
+        if not isinstance(clusters, dict):
+            raise CommandError(f"{path} should contain a dict of clusters")
+        try:
+            compile_clusters(clusters)
+        except ClusterDefinitionError as e:
+            raise CommandError(str(e))
+
+        for name, definition in clusters.items():
+            latest = (
+                ClusterDefinition.objects.filter(name=name, active=True)
+                .order_by("-version")
+                .first()
+            )
+            if latest is not None and latest.definition == definition:
+                logger.critical(f"{latest} is unchanged")
+                continue
+            record = ClusterDefinition.objects.create(
+                name=name,
+                definition=definition,
+                description=options["description"],
+            )
+            logger.critical(f"Added {record}")
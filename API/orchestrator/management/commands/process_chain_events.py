@@ -0,0 +1,37 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from authenticate.utils.get_logger import get_logger
+from orchestrator.chain.dispatcher import ChainDispatcher
+
+logger = get_logger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Process the chain events, in a process of its own instead of the API threads"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process the available events and exit",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Several of these can run at the same time, each event is locked by the one processing it.
+        """
+        if options["once"]:
+            processed = ChainDispatcher.process_pending()
+            logger.critical(f"Processed {processed} chain events")
+            return
+        while True:
+            processed = ChainDispatcher.process_pending()
+            if processed:
+                logger.info(f"Processed {processed} chain events")
+            else:
+                time.sleep(settings.CHAIN_EVENT_POLL_SECONDS)
@@ -10,7 +10,8 @@ from hardware.forms import (
     MultiModalFKEmotionDetectionAnnotationForm,
 )
 from hardware.models import ContextEmotionDetection, DataMultiModalConversation
-from orchestrator.chain.clusters import CLUSTER_Q_ETE_CONVERSATION_NAME, CLUSTERS
+from orchestrator.chain.clusters import CLUSTER_Q_ETE_CONVERSATION_NAME
+from orchestrator.chain.topology import get_topologies, get_topology
 from orchestrator.metrics.utils import extract_task_group
 from orchestrator.models import Task
 
@@ -35,7 +36,7 @@ class AccuracyBenchmark:
         # run the benchmark
         html_content = ""
         if self.benchmark_cluster == "all":
-            for cluster_name in CLUSTERS.keys():
+            for cluster_name in get_topologies().keys():
                 html_content += "<hr>"
                 html_content += self.process_cluster_benchmark(
                     cluster_name, detailed=False
@@ -68,7 +69,7 @@ class AccuracyBenchmark:
             f"Cluster: {cluster_name}, Required annotation tasks: {required_annotation_task}"
         )
         conversations = DataMultiModalConversation.objects.filter(
-            track_id__startswith=f"T-{cluster_name}-"
+            cluster_name=cluster_name
         ).order_by("-created_at")
 
         html_content = f"<h2>Cluster: {cluster_name}</h2>"
@@ -400,19 +401,17 @@ class AccuracyBenchmark:
         Args:
             cluster_name (str): The cluster name
         """
-        cluster = CLUSTERS.get(cluster_name, None)
-        if cluster is None:
+        topology = get_topology(cluster_name)
+        if topology is None:
             raise ValueError(f"Cluster {cluster_name} not found")
 
         # candidate included: speech2text, text_generation, text2speech, this normally is required
         # other include emotion_detection now
         required_annotation_task = []
-        for item in cluster.values():
-            if item["component_type"] == "task":
-                task_name = item["task_name"]
-                required_annotation_task.append(
-                    Task.task_ml_task_mapping().get(task_name, None)
-                )
+        for task_name in topology.task_names:
+            required_annotation_task.append(
+                Task.task_ml_task_mapping().get(task_name, None)
+            )
 
         # filter out None
         required_annotation_task = list(filter(None, required_annotation_task))
@@ -520,7 +519,7 @@ class AccuracyBenchmark:
         # run the benchmark
         html_content = ""
         if self.benchmark_cluster == "all":
-            for cluster_name in CLUSTERS.keys():
+            for cluster_name in get_topologies().keys():
                 html_content += "<hr>"
                 html_content += self.process_cluster_benchmark(
                     cluster_name, detailed=True
@@ -543,7 +542,7 @@ class AccuracyBenchmark:
         # run the benchmark
         html_content = ""
         if self.benchmark_cluster == "all":
-            for cluster_name in CLUSTERS.keys():
+            for cluster_name in get_topologies().keys():
                 html_content += "<hr>"
                 html_content += self.process_multi_turn_benchmark(cluster_name)
         else:
@@ -561,7 +560,7 @@ class AccuracyBenchmark:
 
         """
         conversations = DataMultiModalConversation.objects.filter(
-            track_id__startswith=f"T-{cluster_name}-"
+            cluster_name=cluster_name
         )
 
         # grab all tags
@@ -1,17 +1,19 @@
-from typing import List
+from typing import Dict, List
 
 import pandas as pd
 import plotly.colors as pcolors
 import plotly.graph_objects as go
+from django.conf import settings
 
 from authenticate.utils.get_logger import get_logger
-from orchestrator.chain.clusters import CLUSTER_Q_ETE_CONVERSATION_NAME, CLUSTERS
+from orchestrator.chain.clusters import CLUSTER_Q_ETE_CONVERSATION_NAME
+from orchestrator.chain.topology import get_topologies, get_topology
 from orchestrator.metrics.utils import (
     extract_task_group,
     get_task_names_order,
     str_to_datetime,
 )
-from orchestrator.models import Task
+from orchestrator.models import ClusterTrackCount, Task, TrackLatency
 
 logger = get_logger(__name__)
 
@@ -46,12 +48,12 @@ class LatencyBenchmark:
         """
         html_content = ""
         if self.benchmark_cluster == "all":
-            for cluster_name in CLUSTERS.keys():
+            for cluster_name in get_topologies().keys():
                 # add a divider
                 html_content += "<hr>"
                 html_content += self.process_cluster(cluster_name)
         else:
-            if self.benchmark_cluster not in CLUSTERS:
+            if self.benchmark_cluster not in get_topologies():
                 raise ValueError(f"Cluster {self.benchmark_cluster} not found")
             html_content += "<hr>"
             html_content += self.process_cluster(self.benchmark_cluster)
@@ -60,12 +62,12 @@ class LatencyBenchmark:
     def run_detail(self) -> str:
         html_content = ""
         if self.benchmark_cluster == "all":
-            for cluster_name in CLUSTERS.keys():
+            for cluster_name in get_topologies().keys():
                 # add a divider
                 html_content += "<hr>"
                 html_content += self.process_cluster_detail(cluster_name)
         else:
-            if self.benchmark_cluster not in CLUSTERS:
+            if self.benchmark_cluster not in get_topologies():
                 raise ValueError(f"Cluster {self.benchmark_cluster} not found")
             html_content += "<hr>"
             html_content += self.process_cluster_detail(self.benchmark_cluster)
@@ -77,32 +79,44 @@ class LatencyBenchmark:
         Args:
             cluster_name (str): The cluster name
         """
-        task_groups, required_tasks_count, tasks = extract_task_group(cluster_name)
+        topology = get_topology(cluster_name)
+        required_tasks_count = topology.required_tasks_count
+        # the tracks are counted when they start and complete, see ClusterTrackCount
+        track_count = ClusterTrackCount.objects.filter(
+            cluster_name=cluster_name
+        ).first()
+        total_groups = track_count.started if track_count else 0
+        success_pipeline = track_count.completed if track_count else 0
+        stopped_groups = track_count.stopped if track_count else 0
+        # the latency of each completed track is saved when it completes, see track_latency.py,
+        # only the latest ones are described, read from the cluster_name, completed_at index
+        cluster_latency = list(
+            TrackLatency.objects.filter(cluster_name=cluster_name)
+            .order_by("-completed_at")
+            .values_list("latency", flat=True)[: settings.LATENCY_BENCHMARK_MAX_TRACKS]
+        )
         general_desc = f"<h2>Cluster: {cluster_name}</h2>"
-        general_desc += f"<p>Required tasks: {required_tasks_count} | Total tasks groups: {len(task_groups)}</p>"
-        # loop through the task groups, if the success task is not == required_tasks_count, then we will skip
-        success_pipeline = 0
-        cluster_latency = []
-        for track_id, task_group in task_groups.items():
-            success_tasks = [
-                task for task in task_group if task.result_status == "completed"
-            ]
-            if len(success_tasks) != required_tasks_count:
-                # the pipeline is not completed, so we will skip
-                continue
-            success_pipeline += 1
-            cluster_latency.append(self.process_task_group(task_group))
-
-        logger.info(
-            f"""
-                Cluster: {cluster_name}, Success Ratio: {success_pipeline}/{len(task_groups)}
-                Required Components: {required_tasks_count}, Total tasks: {len(tasks)}
-            """
+        general_desc += (
+            f"<p>Required tasks: {required_tasks_count} | Total tasks groups: {total_groups}"
+            f" | Stopped tracks: {stopped_groups}"
+            f" | Latest completed tracks described: {len(cluster_latency)}</p>"
         )
 
-        general_title = f"Cluster: <b>{cluster_name}</b>, Completed Ratio: {success_pipeline}/{len(task_groups)}"
+        logger.info(f"""
+                Cluster: {cluster_name}, Success Ratio: {success_pipeline}/{total_groups}
+                Required Components: {required_tasks_count}
+            """)
+
+        general_title = f"Cluster: <b>{cluster_name}</b>, Completed Ratio: {success_pipeline}/{total_groups}"
         # flatten the cluster_latency
         result_df = pd.DataFrame(cluster_latency)
+        # the JSON keys are not kept in order, put the columns back in the component order
+        columns = [
+            f"{task_name}_{latency_type}_latency"
+            for task_name in topology.task_names
+            for latency_type in ("model", "transfer", "overall")
+        ] + ["total_latency"]
+        result_df = result_df[[column for column in columns if column in result_df]]
         # get the column split with _ from right, and left element is the component name
 
         if len(result_df) != 0:
@@ -197,6 +211,50 @@ class LatencyBenchmark:
         )
         return general_desc + track_tasks_html + ts_stacked_html + ts_timepoint_html
 
+    @staticmethod
+    def process_task(task: Task) -> Dict[str, float]:
+        """
+        Extract the model, transfer and overall latency of the task from its latency_profile
+
+        Args:
+            task (Task): The completed task
+
+        Returns:
+            Dict[str, float]: The latency in seconds by latency type
+        """
+        latency_profile = task.result_json.get("latency_profile", {})
+        # NOTE: this will require client side do not log overlap durations
+        model_latency = 0
+        transfer_latency = 0
+        logger.debug(latency_profile)
+        task_start_time = None
+        task_end_time = None
+        for key, value in latency_profile.items():
+            if key.startswith("model"):
+                model_latency += float(value)
+            if key.startswith("transfer"):
+                transfer_latency += float(value)
+            if key.startswith("ts"):
+                if key == "ts_start_task":
+                    task_start_time = value
+                if key == "ts_end_task":
+                    task_end_time = value
+        # look for the ts_start_task and ts_end_task, and the overall_latency should be that value
+        # process time into datetime object
+        # ts_end_trigger_emotion_model 2024-07-01T14:58:36.419352
+        if task_start_time and task_end_time:
+            task_start_time_dt = str_to_datetime(task_start_time)
+            task_end_time_dt = str_to_datetime(task_end_time)
+            overall_latency = (task_end_time_dt - task_start_time_dt).total_seconds()
+        else:
+            logger.error(f"Task {task.task_name} does not have start and end time")
+            overall_latency = model_latency + transfer_latency
+        return {
+            "model": model_latency,
+            "transfer": transfer_latency,
+            "overall": overall_latency,
+        }
+
     @staticmethod
     def process_task_group(task_track: List[Task]):
         """
@@ -213,40 +271,8 @@ class LatencyBenchmark:
         }
         task_names = get_task_names_order(result["track_id"])
         for task in task_track:
-            latency_profile = task.result_json.get("latency_profile", {})
-            # NOTE: this will require client side do not log overlap durations
-            model_latency = 0
-            transfer_latency = 0
-            logger.debug(latency_profile)
-            task_start_time = None
-            task_end_time = None
-            for key, value in latency_profile.items():
-                if key.startswith("model"):
-                    model_latency += float(value)
-                if key.startswith("transfer"):
-                    transfer_latency += float(value)
-                if key.startswith("ts"):
-                    if key == "ts_start_task":
-                        task_start_time = value
-                    if key == "ts_end_task":
-                        task_end_time = value
-            result[f"{task.task_name}_model_latency"] = model_latency
-            result[f"{task.task_name}_transfer_latency"] = transfer_latency
-            # look for the ts_start_task and ts_end_task, and the overall_latency should be that value
-            # process time into datetime object
-            # ts_end_trigger_emotion_model 2024-07-01T14:58:36.419352
-            if task_start_time and task_end_time:
-                task_start_time_dt = str_to_datetime(task_start_time)
-                task_end_time_dt = str_to_datetime(task_end_time)
-                result[f"{task.task_name}_overall_latency"] = (  # noqa
-                    task_end_time_dt - task_start_time_dt
-                ).total_seconds()
-
-            else:
-                logger.error(f"Task {task.task_name} does not have start and end time")
-                result[f"{task.task_name}_overall_latency"] = (
-                    model_latency + transfer_latency
-                )
+            for latency_type, latency in LatencyBenchmark.process_task(task).items():
+                result[f"{task.task_name}_{latency_type}_latency"] = latency
         # total_latency should be the sum of all the overall_latency
         total_latency = 0
         for key, value in result.items():
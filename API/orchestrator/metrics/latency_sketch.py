@@ -0,0 +1,74 @@
+from datetime import datetime
+from typing import List, Optional, Sequence
+
+from django.db import transaction
+from django.dispatch import receiver
+
+from authenticate.utils.get_logger import get_logger
+from orchestrator.chain.signals import completed_task
+from orchestrator.metrics.latency_benchmark import LatencyBenchmark
+from orchestrator.models import LatencySketch, Task
+
+logger = get_logger(__name__)
+
+DEFAULT_PERCENTILES = (50, 90, 95, 99)
+
+
+@receiver(completed_task)
+def record_latency_sketch(sender, **kwargs):
+    """
+    Add the latencies of the completed task to the sketches of its cluster
+
+    It runs in the chain dispatcher with the other completed_task receivers,
+    a failure here is logged and does not fail the chain step.
+    """
+    task = sender
+    if not isinstance(task, Task) or not task.cluster_name:
+        return
+    if not (task.result_json or {}).get("latency_profile"):
+        return
+    try:
+        with transaction.atomic():
+            LatencySketch.record(
+                cluster_name=task.cluster_name,
+                task_name=task.task_name,
+                latencies=LatencyBenchmark.process_task(task),
+                at=task.updated_at,
+            )
+    except Exception as e:  # noqa
+        logger.exception(f"Can not record the latency of task {task.id}: {e}")
+
+
+def latency_percentiles(
+    since: datetime,
+    until: Optional[datetime] = None,
+    cluster_name: Optional[str] = None,
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+) -> List[dict]:
+    """
+    Get the latency percentiles of each task name over the period
+
+    Args:
+        since (datetime): The start of the period, rounded down to its window
+        until (datetime): The end of the period, now if None
+        cluster_name (str): Only this cluster, all the clusters if None
+        percentiles (Sequence[float]): The percentiles, 95 for p95
+
+    Returns:
+        List[dict]: One row per cluster, task name and latency type, the latencies in seconds
+    """
+    rows = []
+    sketches = LatencySketch.merged(since, until, cluster_name)
+    for (cluster, task_name, latency_type), sketch in sorted(sketches.items()):
+        row = {
+            "cluster_name": cluster,
+            "task_name": task_name,
+            "latency_type": latency_type,
+            "count": sketch.count,
+            "mean": sketch.mean,
+            "max": sketch.max,
+        }
+        for percentile in percentiles:
+            row[f"p{percentile:g}"] = sketch.quantile(percentile / 100)
+        rows.append(row)
+    return rows
@@ -0,0 +1,133 @@
+"""
+The Prometheus metrics of the API, served at /metrics
+
+The queue depth, the live workers and the chain events are read from the database on each scrape,
+so they are right whichever API process is scraped.
+The claimed and finished task counters are counted in the process serving the workers.
+"""
+
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    generate_latest,
+)
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+
+from authenticate.utils.get_logger import get_logger
+from orchestrator.models import ChainEvent, Task, TaskWorker
+
+logger = get_logger(__name__)
+
+TASKS_CLAIMED = Counter(
+    "orchestrator_tasks_claimed",
+    "The tasks claimed by the workers",
+    ["task_name"],
+)
+TASKS_FINISHED = Counter(
+    "orchestrator_tasks_finished",
+    "The task results reported by the workers",
+    ["task_name", "result_status"],
+)
+
+
+class QueueCollector:
+    """
+    Collect the queue depth, the oldest pending task, the live workers and the chain events
+    """
+
+    def describe(self):
+        # otherwise the registry calls collect when it is registered, at import, before the migrations
+        return []
+
+    def collect(self):
+        now = timezone.now()
+        depth = GaugeMetricFamily(
+            "orchestrator_queue_depth",
+            "The tasks waiting in or leased from the queue",
+            labels=["task_name", "status"],
+        )
+        oldest = GaugeMetricFamily(
+            "orchestrator_queue_oldest_pending_seconds",
+            "The age of the oldest pending task",
+            labels=["task_name"],
+        )
+        for row in (
+            Task.objects.filter(result_status__in=["pending", "started"])
+            .values("task_name", "result_status")
+            .annotate(count=Count("id"), oldest=Min("created_at"))
+        ):
+            depth.add_metric([row["task_name"], row["result_status"]], row["count"])
+            if row["result_status"] == "pending":
+                oldest.add_metric(
+                    [row["task_name"]], (now - row["oldest"]).total_seconds()
+                )
+        yield depth
+        yield oldest
+
+        workers = GaugeMetricFamily(
+            "orchestrator_workers_alive",
+            f"The workers seen in the last {settings.WORKER_ALIVE_SECONDS} seconds",
+            labels=["task_name"],
+        )
+        last_seen = GaugeMetricFamily(
+            "orchestrator_worker_last_seen_seconds",
+            "The seconds since the workers of the task name last reported",
+            labels=["task_name"],
+        )
+        for row in (
+            TaskWorker.objects.filter(
+                updated_at__gte=now - timedelta(seconds=settings.WORKER_ALIVE_SECONDS)
+            )
+            .values("task_name")
+            .annotate(count=Count("id"), last_seen=Max("updated_at"))
+        ):
+            task_name = row["task_name"] or "all"
+            workers.add_metric([task_name], row["count"])
+            last_seen.add_metric([task_name], (now - row["last_seen"]).total_seconds())
+        yield workers
+        yield last_seen
+
+        events = GaugeMetricFamily(
+            "orchestrator_chain_events",
+            "The chain events not processed yet, or given up",
+            labels=["status"],
+        )
+        for row in (
+            ChainEvent.objects.filter(status__in=["pending", "failed"])
+            .values("status")
+            .annotate(count=Count("id"))
+        ):
+            events.add_metric([row["status"]], row["count"])
+        yield events
+
+
+queue_collector = QueueCollector()
+REGISTRY.register(queue_collector)
+
+
+def render_metrics():
+    """
+    Render the metrics in the Prometheus text format
+
+    When the API runs several processes with PROMETHEUS_MULTIPROC_DIR set,
+    the counters of all the processes are merged.
+
+    Returns:
+        Tuple[bytes, str]: The metrics and the content type
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+        registry.register(queue_collector)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,169 @@
+"""
+A mergeable quantile sketch, in the style of DDSketch
+
+The values are counted in logarithmic buckets, so any quantile is within relative_accuracy of the exact value,
+the size only depends on the range of the values, not how many there are,
+and the sketches of two time windows or two processes merge by adding the bucket counts.
+"""
+
+import math
+from typing import Dict, Optional
+
+# the latencies below this are counted as zero
+MIN_INDEXABLE_VALUE = 1e-9
+
+
+class DDSketch:
+    """
+    The quantile sketch of a stream of non negative values, like latencies in seconds
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        """
+        Args:
+            relative_accuracy (float): The relative error of the quantiles, 0.01 is 1%
+            max_bins (int): The maximum number of buckets, the lowest buckets are merged beyond it
+        """
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy should be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def key(self, value: float) -> int:
+        return math.ceil(math.log(value) / self.log_gamma)
+
+    def value(self, key: int) -> float:
+        """
+        The value the bucket stands for, within relative_accuracy of all the values in it
+        """
+        return 2 * self.gamma**key / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1):
+        """
+        Add a value
+
+        Args:
+            value (float): The value, negative values are counted as zero
+            count (int): How many times to add it
+        """
+        value = float(value)
+        if value <= MIN_INDEXABLE_VALUE:
+            self.zero_count += count
+        else:
+            key = self.key(value)
+            self.bins[key] = self.bins.get(key, 0) + count
+            self.collapse()
+        self.count += count
+        self.sum += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: "DDSketch"):
+        """
+        Add the values of the other sketch
+
+        Args:
+            other (DDSketch): The sketch to merge, with the same relative accuracy
+        """
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError(
+                "Can not merge sketches with a different relative accuracy"
+            )
+        if other.count == 0:
+            return
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def collapse(self):
+        """
+        Merge the lowest buckets when there are too many, the high quantiles stay accurate
+        """
+        if len(self.bins) <= self.max_bins:
+            return
+        keys = sorted(self.bins)
+        overflow = keys[: len(keys) - self.max_bins + 1]
+        merged = sum(self.bins.pop(key) for key in overflow)
+        self.bins[overflow[-1]] = merged
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Get the approximate quantile
+
+        Args:
+            q (float): The quantile, between 0 and 1, 0.99 for p99
+
+        Returns:
+            Optional[float]: The value, None if the sketch is empty
+        """
+        if not 0 <= q <= 1:
+            raise ValueError("q should be between 0 and 1")
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        cumulative = self.zero_count
+        if cumulative > rank:
+            return 0.0
+        value = self.max
+        for key in sorted(self.bins):
+            cumulative += self.bins[key]
+            if cumulative > rank:
+                value = self.value(key)
+                break
+        return min(max(value, self.min), self.max)
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def to_dict(self) -> dict:
+        """
+        The JSON serialisable state of the sketch
+        """
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "max_bins": self.max_bins,
+            # JSON keys are strings
+            "bins": {str(key): count for key, count in self.bins.items()},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DDSketch":
+        """
+        Load the sketch saved with to_dict
+
+        Args:
+            data (dict): The state of the sketch
+
+        Returns:
+            DDSketch: The sketch
+        """
+        sketch = cls(
+            relative_accuracy=data.get("relative_accuracy", 0.01),
+            max_bins=data.get("max_bins", 2048),
+        )
+        sketch.bins = {int(key): count for key, count in data.get("bins", {}).items()}
+        sketch.zero_count = data.get("zero_count", 0)
+        sketch.count = data.get("count", 0)
+        sketch.sum = data.get("sum", 0.0)
+        sketch.min = data.get("min")
+        sketch.max = data.get("max")
+        return sketch
@@ -0,0 +1,74 @@
+from typing import List, Optional, Union
+
+from django.db import transaction
+from django.dispatch import receiver
+
+from authenticate.utils.get_logger import get_logger
+from orchestrator.chain.signals import completed_task
+from orchestrator.chain.topology import get_track_topology
+from orchestrator.metrics.latency_benchmark import LatencyBenchmark
+from orchestrator.models import ClusterTrackCount, Task, TaskArchive, TrackLatency
+
+logger = get_logger(__name__)
+
+
+def save_track_latency(
+    track_id: str, tasks: List[Union[Task, TaskArchive]]
+) -> Optional[TrackLatency]:
+    """
+    Compute and save the latency of the track, if all its tasks are completed
+
+    Args:
+        track_id (str): The track ID
+        tasks (List[Union[Task, TaskArchive]]): The tasks of the track
+
+    Returns:
+        Optional[TrackLatency]: The latency row, None if the track is not completed
+    """
+    topology = get_track_topology(track_id)
+    if topology is None:
+        return None
+    completed_tasks = [task for task in tasks if task.result_status == "completed"]
+    if sorted(task.task_name for task in completed_tasks) != sorted(
+        topology.task_names
+    ):
+        return None
+    latency = LatencyBenchmark.process_task_group(completed_tasks)
+    latency.pop("track_id")
+    track_latency, created = TrackLatency.objects.update_or_create(
+        track_id=track_id,
+        defaults={
+            "cluster_name": topology.name,
+            "latency": latency,
+            "total_latency": latency["total_latency"],
+            "completed_at": max(task.updated_at for task in completed_tasks),
+        },
+    )
+    if created:
+        ClusterTrackCount.increment(topology.name, "completed")
+    return track_latency
+
+
+@receiver(completed_task)
+def record_track_latency(sender, **kwargs):
+    """
+    When the last task of a track completes, save the latency of the track
+
+    It runs in the chain dispatcher with the other completed_task receivers,
+    a failure here is logged and does not fail the chain step.
+    """
+    task_data = kwargs.get("data", {})
+    track_id = task_data.get("track_id")
+    if not track_id:
+        return
+    try:
+        with transaction.atomic():
+            track_latency = save_track_latency(
+                track_id,
+                list(Task.objects.filter(track_id=track_id).order_by("created_at")),
+            )
+    except Exception as e:  # noqa
+        logger.exception(f"Can not save the latency of {track_id}: {e}")
+        return
+    if track_latency is not None:
+        logger.info(f"Track {track_id} completed in {track_latency.total_latency}s")
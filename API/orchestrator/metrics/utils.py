@@ -1,35 +1,36 @@
 from datetime import datetime
-from typing import Dict, List, Tuple
+from typing import Dict, List, Tuple, Union
 
 from authenticate.utils.get_logger import get_logger
-from orchestrator.chain.manager import CLUSTERS
-from orchestrator.models import Task
+from orchestrator.chain.topology import get_topology, get_track_topology
+from orchestrator.models import Task, TaskArchive
 
 logger = get_logger(__name__)
 
 
 def extract_task_group(
     cluster_name: str,
-) -> Tuple[Dict[str, List[Task]], int, List[Task]]:
+) -> Tuple[
+    Dict[str, List[Union[Task, TaskArchive]]], int, List[Union[Task, TaskArchive]]
+]:
     """
-    Extract the task group
+    Extract the task group, from the live and the archived tasks
     Args:
         cluster_name (str): The cluster name
 
     Returns:
 
     """
-    cluster = CLUSTERS.get(cluster_name, None)
-    if cluster is None:
+    topology = get_topology(cluster_name)
+    if topology is None:
         raise ValueError(f"Cluster {cluster_name} not found")
 
-    required_tasks = [
-        item for item in cluster.values() if item["component_type"] == "task"
-    ]
-    required_tasks_count = len(required_tasks)
+    required_tasks_count = topology.required_tasks_count
     logger.info(f"Cluster: {cluster_name}, Required tasks: {required_tasks_count}")
-    # get all related tasks, the track_id is like T_{cluster_name}_XXX
-    tasks = Task.objects.filter(track_id__startswith=f"T-{cluster_name}-")
+    # get all related tasks, the cluster_name is set from the track_id T-{cluster_name}-XXX
+    tasks = list(Task.objects.filter(cluster_name=cluster_name))
+    tasks += list(TaskArchive.objects.filter(cluster_name=cluster_name))
+    tasks.sort(key=lambda task: task.created_at)
     logger.info(f"Cluster: {cluster_name}, Total tasks: {len(tasks)}")
     # group the tasks by the track_id
     task_groups = {}
@@ -59,14 +60,8 @@ def get_task_names_order(track_id: str) -> List[str]:
         str: The task names order
 
     """
-    cluster_name = track_id.split("-")[1]
-    cluster = CLUSTERS.get(cluster_name)
-    task_name_order = [
-        item for item in cluster.values() if item["component_type"] == "task"
-    ]
-    task_name_order = sorted(task_name_order, key=lambda x: x["order"])
-    task_names = [item["task_name"] for item in task_name_order]
-    return task_names
+    topology = get_track_topology(track_id)
+    return list(topology.task_names)
 
 
 def str_to_datetime(datetime_str: str) -> datetime:
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.8 on 2026-10-18 14:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orchestrator", "0001_init"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="task",
+            name="claimed_by",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="The worker which claimed the task",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="claimed_tasks",
+                to="orchestrator.taskworker",
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.8 on 2026-10-18 14:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orchestrator", "0002_add_task_claimed_by"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="task",
+            name="lease_expires_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="When the lease of the claiming worker expires, the task can be claimed again after that",
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.8 on 2026-10-18 14:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orchestrator", "0003_add_task_lease"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SyncedMedia",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "path",
+                    models.CharField(
+                        help_text="The path of the file, relative to the client data folder",
+                        max_length=255,
+                        unique=True,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="task",
+            name="dispatchable_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="The task can be claimed from this time, it is moved earlier when the Agent storage reports the media dependencies present",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="task",
+            name="media_dependencies",
+            field=models.JSONField(
+                blank=True,
+                default=list,
+                help_text="The media files or frame folders the task needs, relative to the client data folder",
+                null=True,
+            ),
+        ),
+    ]
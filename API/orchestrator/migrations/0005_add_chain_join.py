@@ -0,0 +1,68 @@
+# Generated by Django 4.2.8 on 2026-10-18 14:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orchestrator", "0004_add_task_media_readiness"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChainJoin",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "track_id",
+                    models.CharField(
+                        help_text="The tracking ID of the tasks", max_length=100
+                    ),
+                ),
+                (
+                    "component",
+                    models.CharField(
+                        help_text="The name of the join component in the cluster",
+                        max_length=100,
+                    ),
+                ),
+                (
+                    "arrived",
+                    models.JSONField(
+                        blank=True,
+                        default=list,
+                        help_text="The dependencies which have completed",
+                    ),
+                ),
+                (
+                    "parameters",
+                    models.JSONField(
+                        blank=True,
+                        default=dict,
+                        help_text="The parameters passed by the dependencies, merged in arrival order",
+                    ),
+                ),
+                (
+                    "dispatched",
+                    models.BooleanField(
+                        default=False,
+                        help_text="Whether the join component has been dispatched",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "unique_together": {("track_id", "component")},
+            },
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.8 on 2026-10-18 15:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orchestrator", "0005_add_chain_join"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ClusterDefinition",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        help_text="The cluster name, used in the track ID",
+                        max_length=100,
+                    ),
+                ),
+                (
+                    "version",
+                    models.PositiveIntegerField(
+                        blank=True,
+                        help_text="The version of the definition, set when saved",
+                    ),
+                ),
+                (
+                    "definition",
+                    models.JSONField(
+                        help_text="The components of the cluster, same format as orchestrator/chain/clusters.py"
+                    ),
+                ),
+                (
+                    "active",
+                    models.BooleanField(
+                        default=True, help_text="Only the latest active version is used"
+                    ),
+                ),
+                ("description", models.TextField(blank=True, default="")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["name", "-version"],
+                "unique_together": {("name", "version")},
+            },
+        ),
+    ]
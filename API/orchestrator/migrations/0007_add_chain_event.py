@@ -0,0 +1,71 @@
+# Generated by Django 4.2.8 on 2026-10-18 15:06
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orchestrator", "0006_add_cluster_definition"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChainEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("task_name", models.CharField(max_length=100)),
+                ("track_id", models.CharField(blank=True, max_length=100, null=True)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("done", "Done"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                    ),
+                ),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                (
+                    "available_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        help_text="The event is not processed before this time",
+                    ),
+                ),
+                ("last_error", models.TextField(blank=True, default="")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("processed_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "task",
+                    models.ForeignKey(
+                        help_text="The completed task",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="chain_events",
+                        to="orchestrator.task",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["status", "available_at"],
+                        name="orchestrato_status_69bb10_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.8 on 2026-10-18 15:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orchestrator", "0007_add_chain_event"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="syncedmedia",
+            index=models.Index(
+                fields=["path"],
+                name="syncedmedia_path_pattern_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                condition=models.Q(("result_status", "pending")),
+                fields=["task_name", "created_at", "id"],
+                name="task_pending_name_age_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                condition=models.Q(("result_status", "pending")),
+                fields=["created_at", "id"],
+                name="task_pending_age_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                condition=models.Q(("result_status", "started")),
+                fields=["lease_expires_at"],
+                name="task_started_lease_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                fields=["track_id"],
+                name="task_track_id_pattern_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ),
+    ]
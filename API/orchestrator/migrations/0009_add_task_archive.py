@@ -0,0 +1,72 @@
+# Generated by Django 4.2.8 on 2026-10-18 15:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("orchestrator", "0008_add_query_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskArchive",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "original_id",
+                    models.BigIntegerField(help_text="The ID of the task", unique=True),
+                ),
+                ("name", models.CharField(max_length=100)),
+                ("task_name", models.CharField(max_length=100)),
+                ("parameters", models.JSONField(blank=True, default=dict, null=True)),
+                ("result_status", models.CharField(max_length=100)),
+                ("result_json", models.JSONField(blank=True, default=dict, null=True)),
+                ("description", models.TextField(blank=True, null=True)),
+                ("track_id", models.CharField(blank=True, max_length=100, null=True)),
+                (
+                    "created_at",
+                    models.DateTimeField(help_text="When the task was created"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(help_text="When the task was last updated"),
+                ),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="archived_tasks",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["track_id"],
+                        name="taskarchive_track_id_idx",
+                        opclasses=["varchar_pattern_ops"],
+                    ),
+                    models.Index(
+                        fields=["created_at"], name="taskarchive_created_at_idx"
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.8 on 2026-10-18 15:10
+
+from django.db import migrations, models
+
+from orchestrator.migrations._cluster_name import backfill_cluster_name
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orchestrator", "0009_add_task_archive"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="task",
+            name="cluster_name",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                help_text="The cluster of the track, set from the track ID when saved",
+                max_length=100,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="taskarchive",
+            name="cluster_name",
+            field=models.CharField(
+                blank=True, db_index=True, max_length=100, null=True
+            ),
+        ),
+        migrations.RunPython(
+            backfill_cluster_name("orchestrator", ["Task", "TaskArchive"]),
+            migrations.RunPython.noop,
+        ),
+    ]
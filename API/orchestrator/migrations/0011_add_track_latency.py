@@ -0,0 +1,58 @@
+# Generated by Django 4.2.8 on 2026-10-18 15:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orchestrator", "0010_add_cluster_name"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrackLatency",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("track_id", models.CharField(max_length=100, unique=True)),
+                ("cluster_name", models.CharField(db_index=True, max_length=100)),
+                (
+                    "latency",
+                    models.JSONField(
+                        default=dict,
+                        help_text="The model, transfer and overall latency of each task, in seconds",
+                    ),
+                ),
+                (
+                    "total_latency",
+                    models.FloatField(
+                        help_text="The sum of the overall latency of the tasks"
+                    ),
+                ),
+                (
+                    "completed_at",
+                    models.DateTimeField(
+                        help_text="When the last task of the track was completed"
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["cluster_name", "completed_at"],
+                        name="tracklatency_cluster_time_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.8 on 2026-10-18 15:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orchestrator", "0011_add_track_latency"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LatencySketch",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("cluster_name", models.CharField(max_length=100)),
+                ("task_name", models.CharField(max_length=100)),
+                ("latency_type", models.CharField(max_length=20)),
+                ("window_start", models.DateTimeField()),
+                ("count", models.PositiveIntegerField(default=0)),
+                ("sketch", models.JSONField(default=dict)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["cluster_name", "window_start"],
+                        name="latencysketch_window_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="latencysketch",
+            constraint=models.UniqueConstraint(
+                fields=("cluster_name", "task_name", "latency_type", "window_start"),
+                name="latencysketch_unique_window",
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.8 on 2026-10-18 15:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orchestrator", "0012_add_latency_sketch"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chainevent",
+            name="traceparent",
+            field=models.CharField(
+                blank=True,
+                help_text="The span which completed the task, the parent of the chain step",
+                max_length=55,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="task",
+            name="traceparent",
+            field=models.CharField(
+                blank=True,
+                help_text="The W3C traceparent of the span which created the task",
+                max_length=55,
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.8 on 2026-10-18 15:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orchestrator", "0013_add_traceparent"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ClusterTrackCount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("cluster_name", models.CharField(max_length=100, unique=True)),
+                ("started", models.PositiveIntegerField(default=0)),
+                ("completed", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
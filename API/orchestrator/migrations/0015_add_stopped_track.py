@@ -0,0 +1,26 @@
+# Generated by Django 4.2.8 on 2026-10-18 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orchestrator", "0014_add_cluster_track_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chainjoin",
+            name="stopped",
+            field=models.BooleanField(
+                default=False,
+                help_text="Whether the track stopped before the join, then it is never dispatched",
+            ),
+        ),
+        migrations.AddField(
+            model_name="clustertrackcount",
+            name="stopped",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
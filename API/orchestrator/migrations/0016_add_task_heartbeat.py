@@ -0,0 +1,21 @@
+# Generated by Django 4.2.8 on 2026-10-18 15:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orchestrator", "0015_add_stopped_track"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="task",
+            name="heartbeat",
+            field=models.BooleanField(
+                default=False,
+                help_text="Whether the claiming worker renews the lease while the task runs, only then an expired lease means the worker is gone and the task can be claimed again",
+            ),
+        ),
+    ]
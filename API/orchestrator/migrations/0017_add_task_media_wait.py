@@ -0,0 +1,44 @@
+# Generated by Django 4.2.8 on 2026-10-18 15:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orchestrator", "0016_add_task_heartbeat"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskMediaWait",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "path",
+                    models.CharField(
+                        db_index=True,
+                        help_text="The path of the file or folder, relative to the client data folder",
+                        max_length=255,
+                    ),
+                ),
+                (
+                    "task",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="media_waits",
+                        to="orchestrator.task",
+                    ),
+                ),
+            ],
+        ),
+    ]
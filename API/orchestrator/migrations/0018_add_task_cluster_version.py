@@ -0,0 +1,22 @@
+# Generated by Django 4.2.8 on 2026-10-18 15:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orchestrator", "0017_add_task_media_wait"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="task",
+            name="cluster_version",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="The version of the cluster the task was chained by, the first task of a track pins the version the rest of the track follows",
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,55 @@
+"""
+The cluster_name backfill of orchestrator 0010 and hardware 0004
+
+The migration loader skips this module, as its name starts with an underscore.
+The track ID parsing is frozen here, rather than imported from orchestrator.chain.track,
+so a later change to the live code does not change what these migrations did.
+"""
+
+from typing import List, Optional
+
+BATCH_SIZE = 2000
+
+
+def cluster_name_from_track_id(track_id: Optional[str]) -> Optional[str]:
+    """
+    The cluster name of T-{cluster_name}-{uid}, None if the track ID is not in that format
+    """
+    if not track_id:
+        return None
+    parts = track_id.split("-", 2)
+    if len(parts) < 3 or parts[0] != "T":
+        return None
+    return parts[1]
+
+
+def backfill_cluster_name(app_label: str, model_names: List[str]):
+    """
+    Set the cluster_name of the existing rows from their track_id, in batches
+
+    Args:
+        app_label (str): The app of the models
+        model_names (List[str]): The models with a track_id and a cluster_name
+
+    Returns:
+        The RunPython function
+    """
+
+    def backfill(apps, schema_editor):
+        for model_name in model_names:
+            model = apps.get_model(app_label, model_name)
+            batch = []
+            for obj in (
+                model.objects.filter(track_id__isnull=False)
+                .only("id", "track_id")
+                .iterator(chunk_size=BATCH_SIZE)
+            ):
+                obj.cluster_name = cluster_name_from_track_id(obj.track_id)
+                batch.append(obj)
+                if len(batch) >= BATCH_SIZE:
+                    model.objects.bulk_update(batch, ["cluster_name"])
+                    batch = []
+            if batch:
+                model.objects.bulk_update(batch, ["cluster_name"])
+
+    return backfill
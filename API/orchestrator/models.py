@@ -1,10 +1,20 @@
-from typing import Optional
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
 from uuid import uuid4
 
-from django.db import models
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.db.models import F, Q
+from django.utils import timezone
 
 from authenticate.models import User
+from authenticate.utils.get_logger import get_logger
+from authenticate.utils.tracing import tracer
 from orchestrator.chain.signals import completed_task
+from orchestrator.chain.track import cluster_name_from_track_id
+from orchestrator.metrics.sketch import DDSketch
+
+logger = get_logger(__name__)
 
 
 # Create your models here.
@@ -55,9 +65,96 @@ class Task(models.Model):
         null=True,
         help_text="The tracking ID of the task, will start with T-{cluster_name}-{id}",
     )
+    cluster_name = models.CharField(
+        max_length=100,
+        blank=True,
+        null=True,
+        db_index=True,
+        help_text="The cluster of the track, set from the track ID when saved",
+    )
+    traceparent = models.CharField(
+        max_length=55,
+        blank=True,
+        null=True,
+        help_text="The W3C traceparent of the span which created the task",
+    )
+    claimed_by = models.ForeignKey(
+        "TaskWorker",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="claimed_tasks",
+        help_text="The worker which claimed the task",
+    )
+    lease_expires_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When the lease of the claiming worker expires, the task can be claimed again after that",
+    )
+    cluster_version = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="The version of the cluster the task was chained by, "
+        "the first task of a track pins the version the rest of the track follows",
+    )
+    heartbeat = models.BooleanField(
+        default=False,
+        help_text="Whether the claiming worker renews the lease while the task runs, "
+        "only then an expired lease means the worker is gone and the task can be claimed again",
+    )
+    media_dependencies = models.JSONField(
+        default=list,
+        blank=True,
+        null=True,
+        help_text="The media files or frame folders the task needs, relative to the client data folder",
+    )
+    dispatchable_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="The task can be claimed from this time, "
+        "it is moved earlier when the Agent storage reports the media dependencies present",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # how many extra candidates to try when the database can not skip locked rows
+    CLAIM_RETRIES = 5
+    # the parameters holding the media files each task name reads, a file path or a list of them,
+    # the other tasks also get these parameters down the chain, but never read them
+    MEDIA_PARAMETERS = {
+        "emotion_detection": ["audio_file", "images_path_list"],
+        "openai_gpt_4o_text_and_image": ["images_path_list"],
+    }
+
+    class Meta:
+        indexes = [
+            # claim_tasks: the oldest pending tasks, of one task name or of any,
+            # partial so the completed history does not grow the index
+            models.Index(
+                fields=["task_name", "created_at", "id"],
+                condition=Q(result_status="pending"),
+                name="task_pending_name_age_idx",
+            ),
+            models.Index(
+                fields=["created_at", "id"],
+                condition=Q(result_status="pending"),
+                name="task_pending_age_idx",
+            ),
+            # claim_tasks: the started tasks whose lease expired
+            models.Index(
+                fields=["lease_expires_at"],
+                condition=Q(result_status="started"),
+                name="task_started_lease_idx",
+            ),
+            # track_id equality, and the T-{cluster_name}- prefix of the benchmarks and admin filters,
+            # PostgreSQL only uses an index for LIKE 'prefix%' with the pattern operator class
+            models.Index(
+                fields=["track_id"],
+                opclasses=["varchar_pattern_ops"],
+                name="task_track_id_pattern_idx",
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -70,6 +167,8 @@ class Task(models.Model):
         parameters: dict,
         description: str = "",
         track_id: Optional[str] = None,
+        traceparent: Optional[str] = None,
+        cluster_version: Optional[int] = None,
     ):
         """
         Create a task
@@ -80,10 +179,14 @@ class Task(models.Model):
             parameters (dict): The parameters for the task
             description (str): The description of the task
             track_id (str): The tracking ID of the task, will start with T-{cluster_name}-{id}
+            traceparent (str): The span which created the task, the current span if None
+            cluster_version (int): The version of the cluster the task was chained by
 
         Returns:
 
         """
+        media_dependencies = cls.resolve_media_dependencies(task_name, parameters)
+        missing_media = cls.missing_media(media_dependencies)
         task = cls(
             user=user,
             name=name,
@@ -91,10 +194,131 @@ class Task(models.Model):
             parameters=parameters,
             description=description,
             track_id=track_id,
+            traceparent=traceparent or tracer.current_traceparent(),
+            media_dependencies=media_dependencies,
+            dispatchable_at=cls.get_dispatchable_at(task_name, missing_media),
+            cluster_version=cluster_version,
         )
         task.save()
+        task.wait_for_media(missing_media)
         return task
 
+    @staticmethod
+    def resolve_media_dependencies(task_name: str, parameters: dict) -> List[str]:
+        """
+        Work out which media files the task reads from the client data folder
+
+        Args:
+            task_name (str): The name of the task
+            parameters (dict): The parameters for the task
+
+        Returns:
+            List[str]: The paths of the files or frame folders, relative to the client data folder
+        """
+        parameters = parameters or {}
+        media_dependencies = []
+        # a streamed utterance is queued on its first chunk, the chunks arrive while it is decoded
+        if task_name in ["speech2text", "openai_speech2text"] and not parameters.get(
+            "streaming"
+        ):
+            # same naming as the Listener, {audio_index}-{end_time}.wav
+            try:
+                end_time = datetime.fromisoformat(parameters["end_time"])
+                media_dependencies.append(
+                    f"audio/{parameters['uid']}/"
+                    f"{parameters['audio_index']}-{end_time.strftime('%Y%m%d%H%M%S')}.wav"
+                )
+            except (KeyError, TypeError, ValueError):
+                logger.warning(f"Can not locate the audio for {task_name} {parameters}")
+        for parameter in Task.MEDIA_PARAMETERS.get(task_name, []):
+            value = parameters.get(parameter) or []
+            media_dependencies.extend([value] if isinstance(value, str) else value)
+        return media_dependencies
+
+    @staticmethod
+    def missing_media(media_dependencies: List[str]) -> List[str]:
+        """
+        The media dependencies not reported present yet, none with the volume solution, the files are shared
+
+        Args:
+            media_dependencies (List[str]): The media dependencies of the task
+
+        Returns:
+            List[str]: The missing ones
+        """
+        if settings.STORAGE_SOLUTION == settings.STORAGE_SOLUTION_VOLUME:
+            return []
+        return SyncedMedia.missing(media_dependencies)
+
+    @staticmethod
+    def get_dispatchable_at(task_name: str, missing_media: List[str]) -> datetime:
+        """
+        Tasks without missing media are dispatchable now.
+        Otherwise wait for the Agent storage report,
+        but no longer than the fallback delay configured for the task name.
+
+        Args:
+            task_name (str): The name of the task
+            missing_media (List[str]): The media dependencies not reported present yet
+
+        Returns:
+            datetime: When the task becomes dispatchable
+        """
+        now = timezone.now()
+        if not missing_media:
+            return now
+        fallback_seconds = settings.TASK_MEDIA_FALLBACK_SECONDS.get(
+            task_name, settings.TASK_MEDIA_FALLBACK_SECONDS_DEFAULT
+        )
+        return now + timedelta(seconds=fallback_seconds)
+
+    def wait_for_media(self, missing_media: List[str]):
+        """
+        Record the missing media of the task, the storage reports look them up to release it
+
+        Args:
+            missing_media (List[str]): The media dependencies not reported present yet
+        """
+        self.media_waits.all().delete()
+        TaskMediaWait.objects.bulk_create(
+            [TaskMediaWait(task=self, path=path.rstrip("/")) for path in missing_media]
+        )
+
+    @classmethod
+    def release_media_ready(cls, files: List[str]) -> List["Task"]:
+        """
+        Make the waiting tasks dispatchable once all their media dependencies are reported present
+
+        Only the waits on the reported files, or on the folders holding them, the frames of a video,
+        are looked up, whatever the number of waiting tasks.
+
+        Args:
+            files (List[str]): The files just reported, relative to the client data folder
+
+        Returns:
+            List[Task]: The tasks released
+        """
+        now = timezone.now()
+        paths = set()
+        for file in files:
+            parts = file.strip("/").split("/")
+            paths.update("/".join(parts[:index]) for index in range(1, len(parts) + 1))
+        media_waits = TaskMediaWait.objects.filter(path__in=paths)
+        task_ids = set(media_waits.values_list("task_id", flat=True))
+        if not task_ids:
+            return []
+        media_waits.delete()
+        released_tasks = list(
+            cls.objects.filter(
+                id__in=task_ids, result_status="pending", dispatchable_at__gt=now
+            ).exclude(media_waits__isnull=False)
+        )
+        if released_tasks:
+            cls.objects.filter(id__in=[task.id for task in released_tasks]).update(
+                dispatchable_at=now
+            )
+        return released_tasks
+
     @staticmethod
     def init_track_id(name: str) -> str:
         """
@@ -110,12 +334,194 @@ class Task(models.Model):
         uid = uid.replace("-", "")
         return f"T-{name}-{uid}"
 
+    @classmethod
+    def claim_tasks(
+        cls,
+        task_name: str = "all",
+        worker: Optional["TaskWorker"] = None,
+        limit: int = 1,
+        lease_seconds: Optional[int] = None,
+        heartbeat: bool = False,
+    ) -> List["Task"]:
+        """
+        Select the oldest claimable tasks and lease them to the worker in one step,
+        so concurrent workers polling the same task name never get the same task.
+
+        A task is claimable when it is pending and dispatchable, see get_dispatchable_at,
+        or when it was started by a worker which renews its lease, see renew_lease, but the lease has expired,
+        which means the worker holding it died.
+        The tasks of a worker which does not renew its lease are never claimed again,
+        a long task would otherwise run twice.
+
+        On PostgreSQL, the rows are locked with SELECT ... FOR UPDATE SKIP LOCKED,
+        other pollers skip them and move on to the next tasks instead of waiting.
+        Databases without SKIP LOCKED (SQLite) fall back to a compare-and-swap on the status.
+
+        Args:
+            task_name (str): The name of the task, "all" means any task
+            worker (TaskWorker): The worker which claims the tasks
+            limit (int): The maximum number of tasks to claim
+            lease_seconds (int): How long the worker holds the tasks, default to settings.TASK_LEASE_SECONDS
+            heartbeat (bool): Whether the worker renews the lease while the tasks run
+
+        Returns:
+            List[Task]: The claimed tasks, empty if no task is available
+        """
+        now = timezone.now()
+        if lease_seconds is None:
+            lease_seconds = settings.TASK_LEASE_SECONDS
+        lease_expires_at = now + timedelta(seconds=lease_seconds)
+        claimable = Q(result_status="pending") & (
+            Q(dispatchable_at__isnull=True) | Q(dispatchable_at__lte=now)
+        ) | Q(result_status="started", heartbeat=True, lease_expires_at__lt=now)
+
+        queryset = cls.objects.filter(claimable)
+        if task_name != "all":
+            queryset = queryset.filter(task_name=task_name)
+        queryset = queryset.order_by("created_at", "id")
+
+        if connection.features.has_select_for_update_skip_locked:
+            with transaction.atomic():
+                tasks = list(queryset.select_for_update(skip_locked=True)[:limit])
+                if tasks:
+                    cls.objects.filter(id__in=[task.id for task in tasks]).update(
+                        result_status="started",
+                        claimed_by=worker,
+                        lease_expires_at=lease_expires_at,
+                        heartbeat=heartbeat,
+                        updated_at=now,
+                    )
+                for task in tasks:
+                    task.result_status = "started"
+                    task.claimed_by = worker
+                    task.lease_expires_at = lease_expires_at
+                    task.heartbeat = heartbeat
+                    task.updated_at = now
+                cls.clear_media_waits(tasks)
+                return tasks
+
+        tasks = []
+        tried_ids = []
+        for _ in range(limit + cls.CLAIM_RETRIES):
+            candidates = list(queryset.exclude(id__in=tried_ids)[: limit - len(tasks)])
+            if not candidates:
+                break
+            for task in candidates:
+                tried_ids.append(task.id)
+                claimed = cls.objects.filter(claimable, id=task.id).update(
+                    result_status="started",
+                    claimed_by=worker,
+                    lease_expires_at=lease_expires_at,
+                    heartbeat=heartbeat,
+                    updated_at=now,
+                )
+                # otherwise another worker won the race for this one
+                if claimed:
+                    task.refresh_from_db()
+                    tasks.append(task)
+            if len(tasks) >= limit:
+                break
+        cls.clear_media_waits(tasks)
+        return tasks
+
+    @staticmethod
+    def clear_media_waits(tasks: List["Task"]):
+        """
+        The claimed tasks do not wait for their media anymore, like after the fallback delay
+        """
+        task_ids = [task.id for task in tasks if task.media_dependencies]
+        if task_ids:
+            TaskMediaWait.objects.filter(task_id__in=task_ids).delete()
+
+    @classmethod
+    def claim_task(
+        cls,
+        task_name: str = "all",
+        worker: Optional["TaskWorker"] = None,
+        heartbeat: bool = False,
+    ) -> Optional["Task"]:
+        """
+        Claim the oldest claimable task, see claim_tasks
+
+        Args:
+            task_name (str): The name of the task, "all" means any task
+            worker (TaskWorker): The worker which claims the task
+            heartbeat (bool): Whether the worker renews the lease while the task runs
+
+        Returns:
+            Optional[Task]: The claimed task, None if no task is available
+        """
+        tasks = cls.claim_tasks(
+            task_name=task_name, worker=worker, limit=1, heartbeat=heartbeat
+        )
+        return tasks[0] if tasks else None
+
+    def held_by(self, worker_uuid: Optional[str]) -> bool:
+        """
+        Whether the worker still holds the claim of the task,
+        the tasks claimed without a registered worker, or reports without a uuid, can not be told apart
+
+        Args:
+            worker_uuid (str): The uuid of the worker
+
+        Returns:
+            bool: False if the task was claimed again by another worker
+        """
+        if not worker_uuid or self.claimed_by is None:
+            return True
+        return self.claimed_by.uuid == worker_uuid
+
+    @classmethod
+    def renew_lease(
+        cls, task_id: int, worker_uuid: str, lease_seconds: Optional[int] = None
+    ) -> Optional[datetime]:
+        """
+        Extend the lease of a started task, only if the worker still holds it
+
+        Args:
+            task_id (int): The task ID
+            worker_uuid (str): The uuid of the worker renewing the lease
+            lease_seconds (int): How long from now, default to settings.TASK_LEASE_SECONDS
+
+        Returns:
+            Optional[datetime]: The new lease expiry, None if the worker does not hold the task anymore
+        """
+        lease_expires_at = timezone.now() + timedelta(
+            seconds=lease_seconds or settings.TASK_LEASE_SECONDS
+        )
+        renewed = cls.objects.filter(
+            id=task_id, result_status="started", claimed_by__uuid=worker_uuid
+        ).update(lease_expires_at=lease_expires_at, heartbeat=True)
+        return lease_expires_at if renewed else None
+
     # override the save method, to call the chain
     def save(self, *args, **kwargs):
-        # if it is updated, then we need to call the chain
-        if self.result_status == "completed":
-            completed_task.send(sender=self, data=self.__dict__)
-        super().save(*args, **kwargs)
+        """
+        When the task becomes completed, record the ChainEvent in the same transaction,
+        the chain step runs after the commit, outside of the request saving the task.
+        """
+        self.cluster_name = cluster_name_from_track_id(self.track_id)
+        with transaction.atomic():
+            previous_status = None
+            if self.pk is not None:
+                # lock the row, so two concurrent completions record only one event
+                previous_status = (
+                    Task.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .values_list("result_status", flat=True)
+                    .first()
+                )
+            # the first task of a track starts it
+            new_track = (
+                self._state.adding
+                and bool(self.cluster_name)
+                and not Task.objects.filter(track_id=self.track_id).exists()
+            )
+            super().save(*args, **kwargs)
+            if new_track:
+                ClusterTrackCount.increment(self.cluster_name, "started")
+            if self.result_status == "completed" and previous_status != "completed":
+                ChainEvent.record(self)
 
     @staticmethod
     def get_task_name_choices():
@@ -170,3 +576,603 @@ class TaskWorker(models.Model):
 
     def __str__(self):
         return self.uuid
+
+
+class SyncedMedia(models.Model):
+    """
+    The media files the Agent side storage reports present in its client data folder
+    """
+
+    path = models.CharField(
+        max_length=255,
+        unique=True,
+        help_text="The path of the file, relative to the client data folder",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # all_present looks up the frames folders by prefix
+            models.Index(
+                fields=["path"],
+                opclasses=["varchar_pattern_ops"],
+                name="syncedmedia_path_pattern_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return self.path
+
+    @classmethod
+    def all_present(cls, media_dependencies: List[str]) -> bool:
+        """
+        Check whether all the media dependencies are reported present.
+        A dependency can be a file, or a folder (frames of a video), which is present
+        as soon as any file under it is reported.
+
+        Args:
+            media_dependencies (List[str]): The media dependencies of the task
+
+        Returns:
+            bool: True if all of them are present
+        """
+        return not cls.missing(media_dependencies)
+
+    @classmethod
+    def missing(cls, media_dependencies: List[str]) -> List[str]:
+        """
+        The media dependencies not reported present yet, see all_present
+
+        Args:
+            media_dependencies (List[str]): The media dependencies of the task
+
+        Returns:
+            List[str]: The missing ones
+        """
+        return [
+            media
+            for media in media_dependencies or []
+            if not cls.objects.filter(
+                Q(path=media) | Q(path__startswith=media.rstrip("/") + "/")
+            ).exists()
+        ]
+
+
+class TaskMediaWait(models.Model):
+    """
+    A media file or frames folder a waiting task needs, which was not reported present when the task was queued,
+    the storage reports look up these paths to release the tasks, see Task.release_media_ready
+    """
+
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="media_waits")
+    path = models.CharField(
+        max_length=255,
+        db_index=True,
+        help_text="The path of the file or folder, relative to the client data folder",
+    )
+
+    def __str__(self):
+        return f"{self.task_id} - {self.path}"
+
+
+class ChainJoin(models.Model):
+    """
+    The arrivals at a join component of a DAG cluster, which depends on more than one component.
+    One row per track and component, the component is dispatched once all its dependencies arrived.
+    """
+
+    track_id = models.CharField(
+        max_length=100, help_text="The tracking ID of the tasks"
+    )
+    component = models.CharField(
+        max_length=100, help_text="The name of the join component in the cluster"
+    )
+    arrived = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="The dependencies which have completed",
+    )
+    parameters = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="The parameters passed by the dependencies, merged in arrival order",
+    )
+    dispatched = models.BooleanField(
+        default=False, help_text="Whether the join component has been dispatched"
+    )
+    stopped = models.BooleanField(
+        default=False,
+        help_text="Whether the track stopped before the join, then it is never dispatched",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("track_id", "component")
+
+    def __str__(self):
+        return f"{self.track_id} - {self.component}"
+
+
+class ClusterDefinition(models.Model):
+    """
+    A cluster defined in the database instead of orchestrator/chain/clusters.py
+
+    Each change is saved as a new version, the latest active version of a name is used,
+    and overrides the cluster of the same name defined in the code.
+    The running API picks up the changes within CLUSTER_RELOAD_SECONDS, without a restart.
+    """
+
+    name = models.CharField(
+        max_length=100, help_text="The cluster name, used in the track ID"
+    )
+    version = models.PositiveIntegerField(
+        blank=True, help_text="The version of the definition, set when saved"
+    )
+    definition = models.JSONField(
+        help_text="The components of the cluster, same format as orchestrator/chain/clusters.py"
+    )
+    active = models.BooleanField(
+        default=True, help_text="Only the latest active version is used"
+    )
+    description = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("name", "version")
+        ordering = ["name", "-version"]
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+    def clean(self):
+        """
+        Compile the definition, so an invalid cluster can not be saved from the admin
+        """
+        from django.core.exceptions import ValidationError
+
+        from orchestrator.chain.topology import ClusterDefinitionError, compile_clusters
+
+        try:
+            compile_clusters({self.name: self.definition})
+        except ClusterDefinitionError as e:
+            raise ValidationError({"definition": str(e)})
+
+    def save(self, *args, **kwargs):
+        if self.version is None:
+            latest = (
+                ClusterDefinition.objects.filter(name=self.name)
+                .order_by("-version")
+                .first()
+            )
+            self.version = latest.version + 1 if latest else 1
+        super().save(*args, **kwargs)
+
+
+class ChainEvent(models.Model):
+    """
+    The outbox of the chain: one event per completed task, written in the same transaction as the completion.
+    The events are processed in the background by the chain dispatcher, retried with a backoff when they fail,
+    and marked done in the same transaction as the chain step, so a step is neither lost nor run twice.
+    """
+
+    task = models.ForeignKey(
+        Task,
+        on_delete=models.CASCADE,
+        related_name="chain_events",
+        help_text="The completed task",
+    )
+    task_name = models.CharField(max_length=100)
+    track_id = models.CharField(max_length=100, blank=True, null=True)
+    status = models.CharField(
+        max_length=20,
+        choices=[
+            ("pending", "Pending"),
+            ("done", "Done"),
+            ("failed", "Failed"),
+        ],
+        default="pending",
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(
+        default=timezone.now, help_text="The event is not processed before this time"
+    )
+    last_error = models.TextField(blank=True, default="")
+    traceparent = models.CharField(
+        max_length=55,
+        blank=True,
+        null=True,
+        help_text="The span which completed the task, the parent of the chain step",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    # how long a consumer holds an event when the database can not lock it
+    CLAIM_SECONDS = 60
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "available_at"])]
+
+    def __str__(self):
+        return f"{self.task_name} {self.task_id} - {self.status}"
+
+    @classmethod
+    def record(cls, task: Task) -> "ChainEvent":
+        """
+        Record the completion of the task, and wake up the dispatcher once it is committed
+
+        Args:
+            task (Task): The completed task
+
+        Returns:
+            ChainEvent: The event
+        """
+        from orchestrator.chain.dispatcher import chain_dispatcher
+
+        event = cls.objects.create(
+            task=task,
+            task_name=task.task_name,
+            track_id=task.track_id,
+            traceparent=tracer.current_traceparent() or task.traceparent,
+        )
+        transaction.on_commit(chain_dispatcher.wake)
+        return event
+
+    @classmethod
+    def process_next(cls) -> bool:
+        """
+        Lock the oldest available event and process it, within one transaction
+
+        On PostgreSQL, the event is locked with SELECT ... FOR UPDATE SKIP LOCKED,
+        so the consumers in other threads and processes move on to the next events,
+        and the chain step commits together with the event marked done.
+        Databases without SKIP LOCKED (SQLite) fall back to a compare-and-swap on available_at,
+        which holds the event for CLAIM_SECONDS before it can be processed again.
+
+        Returns:
+            bool: False if there is no event to process
+        """
+        now = timezone.now()
+        queryset = cls.objects.filter(status="pending", available_at__lte=now).order_by(
+            "available_at", "id"
+        )
+        if connection.features.has_select_for_update_skip_locked:
+            with transaction.atomic():
+                event = (
+                    queryset.select_for_update(skip_locked=True)
+                    .select_related("task")
+                    .first()
+                )
+                if event is None:
+                    return False
+                event.process()
+            return True
+
+        for event in queryset.select_related("task")[: Task.CLAIM_RETRIES]:
+            claimed = cls.objects.filter(
+                id=event.id, status="pending", available_at=event.available_at
+            ).update(available_at=now + timedelta(seconds=cls.CLAIM_SECONDS))
+            # otherwise another consumer won the race for this one
+            if claimed:
+                with transaction.atomic():
+                    event.process()
+                return True
+        return False
+
+    def process(self):
+        """
+        Send the completed_task signal for the task, a failure rolls back the chain step and schedules a retry
+        """
+        now = timezone.now()
+        self.attempts += 1
+        try:
+            with tracer.span(
+                "api.chain_step",
+                track_id=self.track_id,
+                parent=self.traceparent,
+                attributes={
+                    "task_id": self.task_id,
+                    "task_name": self.task_name,
+                    "attempt": self.attempts,
+                },
+            ), transaction.atomic():
+                completed_task.send(sender=self.task, data=self.task.__dict__)
+        except Exception as e:  # noqa
+            logger.exception(e)
+            self.last_error = f"{type(e).__name__}: {e}"
+            if self.attempts >= settings.CHAIN_EVENT_MAX_ATTEMPTS:
+                logger.error(f"Chain event {self.id} failed {self.attempts} times")
+                self.status = "failed"
+            else:
+                backoff = min(
+                    2**self.attempts, settings.CHAIN_EVENT_MAX_BACKOFF_SECONDS
+                )
+                self.available_at = now + timedelta(seconds=backoff)
+        else:
+            self.status = "done"
+            self.processed_at = now
+        self.save()
+
+
+class TaskArchive(models.Model):
+    """
+    The completed, failed and cancelled tasks moved out of the Task table by the archive_tasks command,
+    so the queue table only holds the recent tasks. The benchmarks read both tables.
+    """
+
+    ARCHIVED_STATUSES = ("completed", "failed", "cancelled")
+
+    original_id = models.BigIntegerField(unique=True, help_text="The ID of the task")
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="archived_tasks",
+    )
+    name = models.CharField(max_length=100)
+    task_name = models.CharField(max_length=100)
+    parameters = models.JSONField(default=dict, blank=True, null=True)
+    result_status = models.CharField(max_length=100)
+    result_json = models.JSONField(default=dict, blank=True, null=True)
+    description = models.TextField(blank=True, null=True)
+    track_id = models.CharField(max_length=100, blank=True, null=True)
+    cluster_name = models.CharField(
+        max_length=100, blank=True, null=True, db_index=True
+    )
+    created_at = models.DateTimeField(help_text="When the task was created")
+    updated_at = models.DateTimeField(help_text="When the task was last updated")
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["track_id"],
+                opclasses=["varchar_pattern_ops"],
+                name="taskarchive_track_id_idx",
+            ),
+            models.Index(fields=["created_at"], name="taskarchive_created_at_idx"),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def from_task(cls, task: Task) -> "TaskArchive":
+        return cls(
+            original_id=task.id,
+            user_id=task.user_id,
+            name=task.name,
+            task_name=task.task_name,
+            parameters=task.parameters,
+            result_status=task.result_status,
+            result_json=task.result_json,
+            description=task.description,
+            track_id=task.track_id,
+            cluster_name=task.cluster_name,
+            created_at=task.created_at,
+            updated_at=task.updated_at,
+        )
+
+    @classmethod
+    def archivable(cls, older_than: datetime) -> models.QuerySet:
+        """
+        The finished tasks last updated before older_than,
+        a task with a chain event still pending is kept, its chain step has not run yet.
+
+        Args:
+            older_than (datetime): The cut off time
+        """
+        return Task.objects.filter(
+            result_status__in=cls.ARCHIVED_STATUSES, updated_at__lt=older_than
+        ).exclude(chain_events__status="pending")
+
+    @classmethod
+    def archive_tasks(cls, older_than: datetime, batch_size: int = 1000) -> int:
+        """
+        Move the archivable tasks to the archive, one batch per transaction
+
+        Args:
+            older_than (datetime): Archive the tasks last updated before this time
+            batch_size (int): The tasks moved per transaction
+
+        Returns:
+            int: The number of tasks archived
+        """
+        queryset = cls.archivable(older_than).order_by("id")
+        archived = 0
+        while True:
+            with transaction.atomic():
+                batch = queryset
+                if connection.features.has_select_for_update_skip_locked:
+                    batch = batch.select_for_update(skip_locked=True, of=("self",))
+                tasks = list(batch[:batch_size])
+                if not tasks:
+                    break
+                cls.objects.bulk_create(
+                    [cls.from_task(task) for task in tasks], ignore_conflicts=True
+                )
+                Task.objects.filter(id__in=[task.id for task in tasks]).delete()
+            archived += len(tasks)
+            logger.info(f"Archived {archived} tasks")
+        return archived
+
+
+class TrackLatency(models.Model):
+    """
+    The latency of one completed track, computed once when its last task completes,
+    so the latency benchmark reads one row per track instead of regrouping all the tasks.
+    """
+
+    track_id = models.CharField(max_length=100, unique=True)
+    cluster_name = models.CharField(max_length=100, db_index=True)
+    latency = models.JSONField(
+        default=dict,
+        help_text="The model, transfer and overall latency of each task, in seconds",
+    )
+    total_latency = models.FloatField(
+        help_text="The sum of the overall latency of the tasks"
+    )
+    completed_at = models.DateTimeField(
+        help_text="When the last task of the track was completed"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["cluster_name", "completed_at"],
+                name="tracklatency_cluster_time_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return self.track_id
+
+
+class ClusterTrackCount(models.Model):
+    """
+    How many tracks of the cluster were started, completed and stopped, counted when it happens,
+    so the latency benchmark does not count the distinct track IDs of all the tasks on each render.
+    A stopped track ended before the end of its cluster on purpose, like an utterance without speech.
+    """
+
+    cluster_name = models.CharField(max_length=100, unique=True)
+    started = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+    stopped = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.cluster_name
+
+    @classmethod
+    def increment(cls, cluster_name: str, field: str):
+        """
+        Add one to the counter, in the database, so concurrent increments are not lost
+
+        Args:
+            cluster_name (str): The cluster name
+            field (str): started, completed or stopped
+        """
+        cls.objects.get_or_create(cluster_name=cluster_name)
+        cls.objects.filter(cluster_name=cluster_name).update(
+            **{field: F(field) + 1}, updated_at=timezone.now()
+        )
+
+
+class LatencySketch(models.Model):
+    """
+    The quantile sketch of one latency of one task name in one cluster, over one time window
+
+    Each completed task adds its latencies to the sketch of its window,
+    the percentiles of a longer period are computed by merging the sketches of its windows.
+    """
+
+    LATENCY_TYPES = ("model", "transfer", "overall")
+
+    cluster_name = models.CharField(max_length=100)
+    task_name = models.CharField(max_length=100)
+    latency_type = models.CharField(max_length=20)
+    window_start = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+    sketch = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["cluster_name", "task_name", "latency_type", "window_start"],
+                name="latencysketch_unique_window",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["cluster_name", "window_start"],
+                name="latencysketch_window_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.cluster_name} {self.task_name} {self.latency_type} {self.window_start}"
+
+    @staticmethod
+    def window_of(at: datetime) -> datetime:
+        """
+        The start of the window the time falls in
+        """
+        window = timedelta(minutes=settings.LATENCY_SKETCH_WINDOW_MINUTES)
+        epoch = datetime(1970, 1, 1, tzinfo=at.tzinfo)
+        return at - (at - epoch) % window
+
+    @classmethod
+    def record(
+        cls,
+        cluster_name: str,
+        task_name: str,
+        latencies: Dict[str, float],
+        at: datetime,
+    ):
+        """
+        Add the latencies of a completed task to the sketches of its window
+
+        Args:
+            cluster_name (str): The cluster of the track
+            task_name (str): The task name
+            latencies (Dict[str, float]): The latency in seconds by latency type
+            at (datetime): When the task completed
+        """
+        window_start = cls.window_of(at)
+        with transaction.atomic():
+            for latency_type, latency in latencies.items():
+                # the row is locked, so the concurrent completions of the window add up
+                row, _ = cls.objects.select_for_update().get_or_create(
+                    cluster_name=cluster_name,
+                    task_name=task_name,
+                    latency_type=latency_type,
+                    window_start=window_start,
+                )
+                if row.sketch:
+                    sketch = DDSketch.from_dict(row.sketch)
+                else:
+                    sketch = DDSketch(
+                        relative_accuracy=settings.LATENCY_SKETCH_RELATIVE_ACCURACY
+                    )
+                sketch.add(latency)
+                row.sketch = sketch.to_dict()
+                row.count = sketch.count
+                row.save(update_fields=["sketch", "count", "updated_at"])
+
+    @classmethod
+    def merged(
+        cls,
+        since: datetime,
+        until: Optional[datetime] = None,
+        cluster_name: Optional[str] = None,
+    ) -> Dict[Tuple[str, str, str], DDSketch]:
+        """
+        Merge the sketches of the windows starting in the period
+
+        Args:
+            since (datetime): The start of the period
+            until (datetime): The end of the period, now if None
+            cluster_name (str): Only this cluster, all the clusters if None
+
+        Returns:
+            Dict[Tuple[str, str, str], DDSketch]: The sketch by (cluster_name, task_name, latency_type)
+        """
+        rows = cls.objects.filter(window_start__gte=cls.window_of(since))
+        if until is not None:
+            rows = rows.filter(window_start__lt=until)
+        if cluster_name is not None:
+            rows = rows.filter(cluster_name=cluster_name)
+        sketches = {}
+        for row in rows.order_by("window_start").iterator():
+            key = (row.cluster_name, row.task_name, row.latency_type)
+            if key not in sketches:
+                sketches[key] = DDSketch.from_dict(row.sketch)
+            else:
+                sketches[key].merge(DDSketch.from_dict(row.sketch))
+        return sketches
@@ -0,0 +1,19 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from authenticate.utils.long_poll import long_poll_notifier
+from orchestrator.models import Task
+
+
+@receiver(post_save, sender=Task)
+def notify_pending_task(sender, instance, **kwargs):
+    """
+    Wake up the workers long polling for this task, once it is committed
+    It covers the tasks created by the chain, and the tasks set back to pending
+    """
+    if instance.result_status != "pending":
+        return
+    transaction.on_commit(
+        lambda: long_poll_notifier.notify(f"task:{instance.task_name}", "task:all")
+    )
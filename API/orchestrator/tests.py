@@ -0,0 +1,218 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from authenticate.models import User
+from orchestrator.chain.clusters import CLUSTER_Q_ETE_CONVERSATION_NAME
+from orchestrator.chain.manager import ClusterManager
+from orchestrator.chain.topology import cluster_registry, get_track_topology
+from orchestrator.models import ClusterDefinition, Task, TaskWorker
+
+
+class TaskLeaseTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="worker", email="worker@example.com", password="password"
+        )
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.user).key}"
+        )
+        self.first_worker = TaskWorker.objects.create(uuid="first", task_name="all")
+        self.second_worker = TaskWorker.objects.create(uuid="second", task_name="all")
+
+    def create_task(self, task_name: str = "quantization_llm") -> Task:
+        return Task.create_task(
+            user=self.user, name="test", task_name=task_name, parameters={}
+        )
+
+    def expire_lease(self, task: Task):
+        Task.objects.filter(id=task.id).update(
+            lease_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+    def test_expired_task_without_heartbeat_is_not_claimed_again(self):
+        task = self.create_task()
+        self.assertEqual(Task.claim_task(worker=self.first_worker), task)
+        self.expire_lease(task)
+        self.assertIsNone(Task.claim_task(worker=self.second_worker))
+
+    def test_expired_task_with_heartbeat_is_claimed_again(self):
+        task = self.create_task()
+        Task.claim_task(worker=self.first_worker, heartbeat=True)
+        self.expire_lease(task)
+        self.assertEqual(Task.claim_task(worker=self.second_worker), task)
+
+    def test_renew_lease_only_by_the_holder(self):
+        task = self.create_task()
+        Task.claim_task(worker=self.first_worker, heartbeat=True)
+        r = self.client.post(f"/queue_task/{task.id}/renew_lease/?uuid=first")
+        self.assertEqual(r.status_code, 200)
+        r = self.client.post(f"/queue_task/{task.id}/renew_lease/?uuid=second")
+        self.assertEqual(r.status_code, 409)
+
+    def test_result_of_the_previous_holder_is_rejected(self):
+        task = self.create_task()
+        Task.claim_task(worker=self.first_worker, heartbeat=True)
+        self.expire_lease(task)
+        Task.claim_task(worker=self.second_worker, heartbeat=True)
+        r = self.client.post(
+            f"/queue_task/{task.id}/update_result/?uuid=first",
+            {"result_status": "completed"},
+            format="json",
+        )
+        self.assertEqual(r.status_code, 409)
+        task.refresh_from_db()
+        self.assertEqual(task.result_status, "started")
+        self.assertEqual(task.claimed_by, self.second_worker)
+
+    def test_lease_seconds_is_clamped(self):
+        self.create_task()
+        self.create_task()
+        r = self.client.get("/queue_task/tasks/quantization_llm/?lease_seconds=-5")
+        self.assertEqual(r.json()["lease_seconds"], 1)
+        r = self.client.get(
+            f"/queue_task/tasks/quantization_llm/"
+            f"?lease_seconds={settings.TASK_LEASE_MAX_SECONDS * 10}"
+        )
+        self.assertEqual(r.json()["lease_seconds"], settings.TASK_LEASE_MAX_SECONDS)
+        task = Task.objects.get(id=r.json()["tasks"][0]["id"])
+        self.assertLessEqual(
+            task.lease_expires_at,
+            timezone.now() + timedelta(seconds=settings.TASK_LEASE_MAX_SECONDS),
+        )
+
+
+@override_settings(STORAGE_SOLUTION="s3")
+class TaskMediaDependenciesTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="worker", email="worker@example.com", password="password"
+        )
+        self.media_params = {
+            "text": "hello",
+            "audio_file": "audio/uid/0-20240701145836.wav",
+            "images_path_list": ["videos/uid/20240701145836"],
+        }
+
+    def test_llm_task_created_by_chain_next_is_dispatchable_now(self):
+        track_id = Task.init_track_id(CLUSTER_Q_ETE_CONVERSATION_NAME)
+        task_id = ClusterManager.chain_next(
+            track_id=track_id,
+            current_component="completed_emotion_detection",
+            next_component_params=self.media_params,
+            user=self.user,
+        )
+        task = Task.objects.get(id=task_id)
+        self.assertEqual(task.task_name, "quantization_llm")
+        self.assertEqual(task.media_dependencies, [])
+        self.assertEqual(Task.claim_task(task_name="quantization_llm"), task)
+
+    def test_emotion_detection_waits_for_its_media(self):
+        task = Task.create_task(
+            user=self.user,
+            name="test",
+            task_name="emotion_detection",
+            parameters=self.media_params,
+        )
+        self.assertEqual(
+            task.media_dependencies,
+            ["audio/uid/0-20240701145836.wav", "videos/uid/20240701145836"],
+        )
+        self.assertIsNone(Task.claim_task(task_name="emotion_detection"))
+
+    def test_media_report_releases_the_task_once_all_its_media_is_there(self):
+        task = Task.create_task(
+            user=self.user,
+            name="test",
+            task_name="emotion_detection",
+            parameters=self.media_params,
+        )
+        client = APIClient()
+        client.force_authenticate(self.user)
+        r = client.post(
+            "/queue_task/media_ready/",
+            {"files": ["audio/uid/0-20240701145836.wav"]},
+            format="json",
+        )
+        self.assertEqual(r.json()["released_tasks"], [])
+        r = client.post(
+            "/queue_task/media_ready/",
+            {"files": ["videos/uid/20240701145836/frames/0.jpg"]},
+            format="json",
+        )
+        self.assertEqual(r.json()["released_tasks"], [task.id])
+        self.assertEqual(Task.claim_task(task_name="emotion_detection"), task)
+
+
+class ClusterVersionTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="worker", email="worker@example.com", password="password"
+        )
+        cluster_registry.reload_seconds = 0
+
+    def tearDown(self):
+        cluster_registry.reload_seconds = settings.CLUSTER_RELOAD_SECONDS
+
+    @staticmethod
+    def define(next_component: str, next_task_name: str):
+        ClusterDefinition.objects.create(
+            name="CLUSTER_VERSION_TEST",
+            definition={
+                "completed_quantization_llm": {
+                    "order": 0,
+                    "extra_params": {},
+                    "component_type": "task",
+                    "task_name": "quantization_llm",
+                },
+                next_component: {
+                    "order": 1,
+                    "extra_params": {},
+                    "component_type": "task",
+                    "task_name": next_task_name,
+                },
+            },
+        )
+
+    def start_track(self) -> str:
+        track_id = Task.init_track_id("CLUSTER_VERSION_TEST")
+        ClusterManager.chain_next(
+            track_id=track_id,
+            current_component="init",
+            next_component_params={},
+            user=self.user,
+        )
+        return track_id
+
+    def next_task_name(self, track_id: str) -> str:
+        task_id = ClusterManager.chain_next(
+            track_id=track_id,
+            current_component="completed_quantization_llm",
+            next_component_params={},
+            user=self.user,
+        )
+        return Task.objects.get(id=task_id).task_name
+
+    def test_track_in_flight_keeps_the_version_it_started_on(self):
+        self.define("completed_text2speech", "text2speech")
+        old_track_id = self.start_track()
+        # the cluster is edited while the track is in flight
+        self.define("completed_openai_text2speech", "openai_text2speech")
+        new_track_id = self.start_track()
+        self.assertEqual(self.next_task_name(old_track_id), "text2speech")
+        self.assertEqual(self.next_task_name(new_track_id), "openai_text2speech")
+
+    def test_version_not_loaded_yet_is_compiled_from_its_record(self):
+        self.define("completed_text2speech", "text2speech")
+        track_id = self.start_track()
+        self.define("completed_openai_text2speech", "openai_text2speech")
+        cluster_registry.versions.clear()
+        self.assertEqual(
+            get_track_topology(track_id).ordered_components[-1],
+            "completed_text2speech",
+        )
@@ -1,20 +1,62 @@
-from datetime import datetime, timedelta
+import time
+from datetime import timedelta
+from typing import Optional
 
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
 from authenticate.utils.get_logger import get_logger
+from authenticate.utils.long_poll import long_poll, long_poll_notifier
+from authenticate.utils.tracing import TRACEPARENT_HEADER, tracer
 from orchestrator.chain.clusters import CLUSTER_Q_ETE_CONVERSATION_NAME
 from orchestrator.chain.manager import ClusterManager
-from orchestrator.models import Task, TaskWorker
+from orchestrator.chain.topology import get_topologies
+from orchestrator.metrics.latency_sketch import (
+    DEFAULT_PERCENTILES,
+    latency_percentiles,
+)
+from orchestrator.metrics.prometheus import (
+    TASKS_CLAIMED,
+    TASKS_FINISHED,
+    render_metrics,
+)
+from orchestrator.models import SyncedMedia, Task, TaskWorker
 from orchestrator.serializers import TaskSerializer, TaskWorkerSerializer
 
 logger = get_logger(__name__)
 
 
+def trace_queue_wait(task: Task, worker: Optional[TaskWorker]):
+    """
+    Record the time the task waited in the queue, from created to claimed
+
+    Args:
+        task (Task): The claimed task
+        worker (TaskWorker): The worker claiming it
+    """
+    tracer.record_span(
+        "api.queue_wait",
+        start_time=task.created_at.timestamp(),
+        end_time=time.time(),
+        track_id=task.track_id,
+        parent=task.traceparent,
+        attributes={
+            "task_id": task.id,
+            "task_name": task.task_name,
+            "worker": worker.uuid if worker else "",
+        },
+    )
+
+
 class QueueTaskViewSet(viewsets.ViewSet):
     """
     A ViewSet for queuing AI tasks generally
@@ -57,13 +99,18 @@ class QueueTaskViewSet(viewsets.ViewSet):
             serializer.validated_data["track_id"] = track_id
 
         # based on the track cluster name, determine what to do next
-        task_id = ClusterManager.chain_next(
+        with tracer.span(
+            "api.ai_task",
             track_id=track_id,
-            current_component="init",
-            next_component_params=serializer.validated_data["parameters"],
-            name=data.get("name", None),
-            user=request.user,
-        )
+            parent=request.headers.get(TRACEPARENT_HEADER),
+        ):
+            task_id = ClusterManager.chain_next(
+                track_id=track_id,
+                current_component="init",
+                next_component_params=serializer.validated_data["parameters"],
+                name=data.get("name", None),
+                user=request.user,
+            )
 
         return Response(
             {"message": "LLM task queued successfully", "task_id": task_id},
@@ -73,6 +120,27 @@ class QueueTaskViewSet(viewsets.ViewSet):
     @swagger_auto_schema(
         operation_summary="Worker: Get Task",
         operation_description="Get the task",
+        manual_parameters=[
+            openapi.Parameter(
+                "uuid",
+                openapi.IN_QUERY,
+                description="The uuid of the worker claiming the task",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                "heartbeat",
+                openapi.IN_QUERY,
+                description="Set to 1 if the worker renews the lease while the task runs, "
+                "only such tasks are claimed again when the lease expires",
+                type=openapi.TYPE_INTEGER,
+            ),
+            openapi.Parameter(
+                "wait",
+                openapi.IN_QUERY,
+                description="Hold the request up to this many seconds until a task is available",
+                type=openapi.TYPE_NUMBER,
+            ),
+        ],
         responses={200: "Task retrieved successfully"},
     )
     @action(
@@ -86,41 +154,187 @@ class QueueTaskViewSet(viewsets.ViewSet):
         """
         Endpoint to get the task for AI
         """
-        cool_down_task = 10  # 10 second
-        cool_down_time = datetime.now() - timedelta(seconds=cool_down_task)
         try:
-            if task_name == "all":
-                task = Task.objects.filter(
-                    result_status="pending", created_at__lte=cool_down_time
-                ).first()
-            else:
-                task = Task.objects.filter(
-                    task_name=task_name,
-                    result_status="pending",
-                    created_at__lte=cool_down_time,
-                ).first()
-            if task is None:
-                return Response(
-                    {"error": f"No pending {task_name} tasks found"},
-                    status=status.HTTP_404_NOT_FOUND,
-                )
-            task.result_status = "started"
-            task.save()
-            task_serializer = TaskSerializer(task)
-            logger.critical(f"Task {task.id} retrieved successfully")
-            return Response(data=task_serializer.data, status=status.HTTP_200_OK)
-        except Task.DoesNotExist:
+            wait = float(request.query_params.get("wait", 0))
+        except ValueError as e:
+            return Response(
+                {"error": f"Invalid wait parameter: {e}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        uuid = request.query_params.get("uuid", None)
+        worker = TaskWorker.objects.filter(uuid=uuid).first() if uuid else None
+        heartbeat = request.query_params.get("heartbeat") == "1"
+
+        def claim():
+            return Task.claim_task(
+                task_name=task_name, worker=worker, heartbeat=heartbeat
+            )
+
+        task = long_poll(claim, channels=[f"task:{task_name}"], wait_seconds=wait)
+        if task is None:
             return Response(
                 {"error": f"No pending {task_name} tasks found"},
                 status=status.HTTP_404_NOT_FOUND,
             )
+        TASKS_CLAIMED.labels(task.task_name).inc()
+        trace_queue_wait(task, worker)
+        task_serializer = TaskSerializer(task)
+        logger.critical(f"Task {task.id} retrieved successfully")
+        return Response(data=task_serializer.data, status=status.HTTP_200_OK)
+
+    @swagger_auto_schema(
+        operation_summary="Worker: Lease Tasks",
+        operation_description="Lease a batch of tasks, they will be claimable again after the lease expires",
+        manual_parameters=[
+            openapi.Parameter(
+                "limit",
+                openapi.IN_QUERY,
+                description="The maximum number of tasks to lease",
+                type=openapi.TYPE_INTEGER,
+            ),
+            openapi.Parameter(
+                "lease_seconds",
+                openapi.IN_QUERY,
+                description="How long the worker holds the tasks, "
+                "between 1 and TASK_LEASE_MAX_SECONDS",
+                type=openapi.TYPE_INTEGER,
+            ),
+            openapi.Parameter(
+                "uuid",
+                openapi.IN_QUERY,
+                description="The uuid of the worker leasing the tasks",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                "heartbeat",
+                openapi.IN_QUERY,
+                description="Set to 1 if the worker renews the lease while the task runs, "
+                "only such tasks are claimed again when the lease expires",
+                type=openapi.TYPE_INTEGER,
+            ),
+            openapi.Parameter(
+                "wait",
+                openapi.IN_QUERY,
+                description="Hold the request up to this many seconds until a task is available",
+                type=openapi.TYPE_NUMBER,
+            ),
+        ],
+        responses={200: "Tasks leased successfully"},
+    )
+    @action(
+        detail=False,
+        methods=["get"],
+        permission_classes=[IsAuthenticated],
+        url_path="tasks/(?P<task_name>.+)",
+        url_name="tasks",
+    )
+    def tasks(self, request, task_name="all"):
+        """
+        Endpoint to lease up to limit tasks for AI within one round trip
+        """
+        try:
+            limit = int(request.query_params.get("limit", 1))
+            lease_seconds = int(
+                request.query_params.get("lease_seconds", settings.TASK_LEASE_SECONDS)
+            )
+            wait = float(request.query_params.get("wait", 0))
+        except ValueError as e:
+            return Response(
+                {"error": f"Invalid lease parameters: {e}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        limit = max(1, min(limit, settings.TASK_LEASE_MAX_LIMIT))
+        lease_seconds = max(1, min(lease_seconds, settings.TASK_LEASE_MAX_SECONDS))
+
+        uuid = request.query_params.get("uuid", None)
+        worker = TaskWorker.objects.filter(uuid=uuid).first() if uuid else None
+        heartbeat = request.query_params.get("heartbeat") == "1"
+
+        def claim():
+            return Task.claim_tasks(
+                task_name=task_name,
+                worker=worker,
+                limit=limit,
+                lease_seconds=lease_seconds,
+                heartbeat=heartbeat,
+            )
+
+        tasks = long_poll(claim, channels=[f"task:{task_name}"], wait_seconds=wait)
+        logger.info(f"{len(tasks)} {task_name} tasks leased")
+        for task in tasks:
+            TASKS_CLAIMED.labels(task.task_name).inc()
+            trace_queue_wait(task, worker)
+        return Response(
+            {
+                "tasks": TaskSerializer(tasks, many=True).data,
+                "lease_seconds": lease_seconds,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    @swagger_auto_schema(
+        operation_summary="Worker: Renew Lease",
+        operation_description="The heartbeat of the worker running the task, extends its lease",
+        manual_parameters=[
+            openapi.Parameter(
+                "uuid",
+                openapi.IN_QUERY,
+                description="The uuid of the worker holding the task",
+                type=openapi.TYPE_STRING,
+            ),
+        ],
+        responses={
+            200: "Lease renewed successfully",
+            409: "The worker does not hold the task anymore",
+        },
+    )
+    @action(
+        detail=True,
+        methods=["post"],
+        permission_classes=[IsAuthenticated],
+        url_path="renew_lease",
+        url_name="renew_lease",
+    )
+    def renew_lease(self, request, pk=None):
+        """
+        Endpoint for the worker to keep the task while it runs
+        """
+        uuid = request.query_params.get("uuid", None)
+        if not uuid:
+            return Response(
+                {"error": "uuid is required"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        lease_expires_at = Task.renew_lease(pk, uuid)
+        if lease_expires_at is None:
+            return Response(
+                {"error": f"Task {pk} is not held by worker {uuid}"},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return Response(
+            {
+                "lease_expires_at": lease_expires_at,
+                "lease_seconds": settings.TASK_LEASE_SECONDS,
+            },
+            status=status.HTTP_200_OK,
+        )
 
     # add an endpoint to update the task result
     @swagger_auto_schema(
         operation_summary="Worker: Result Update",
         operation_description="Update the task result",
         request_body=TaskSerializer,
-        responses={200: "Task result updated successfully"},
+        manual_parameters=[
+            openapi.Parameter(
+                "uuid",
+                openapi.IN_QUERY,
+                description="The uuid of the worker posting the result",
+                type=openapi.TYPE_STRING,
+            ),
+        ],
+        responses={
+            200: "Task result updated successfully",
+            409: "The task was claimed again by another worker",
+        },
     )
     @action(
         detail=True,
@@ -141,10 +355,45 @@ class QueueTaskViewSet(viewsets.ViewSet):
                     {"error": f"Task with ID {pk} does not exist"},
                     status=status.HTTP_404_NOT_FOUND,
                 )
+            # the lease expired and another worker claimed the task, its result wins
+            uuid = request.query_params.get("uuid", None)
+            if not task.held_by(uuid):
+                logger.warning(
+                    f"Result of task {task.id} from worker {uuid} ignored, "
+                    f"it is claimed by {task.claimed_by.uuid}"
+                )
+                return Response(
+                    {"error": f"Task {task.id} is claimed by another worker"},
+                    status=status.HTTP_409_CONFLICT,
+                )
 
             serializer = TaskSerializer(data=data, instance=task, partial=True)
             serializer.is_valid(raise_exception=True)
-            serializer.save()
+            # the chain event recorded by the completion is the child of this span
+            with tracer.span(
+                "api.update_result",
+                track_id=task.track_id,
+                parent=request.headers.get(TRACEPARENT_HEADER),
+                attributes={"task_id": task.id, "task_name": task.task_name},
+            ):
+                serializer.save()
+            if task.result_status == "started":
+                # a progress report, like the partial transcripts of a streamed speech2text,
+                # the worker is alive, so it keeps the task
+                task.lease_expires_at = timezone.now() + timedelta(
+                    seconds=settings.TASK_LEASE_SECONDS
+                )
+                task.save(update_fields=["lease_expires_at"])
+            else:
+                TASKS_FINISHED.labels(task.task_name, task.result_status).inc()
+            # the worker gave the task back, most likely its media is not there yet
+            if task.result_status == "pending":
+                missing_media = Task.missing_media(task.media_dependencies)
+                task.dispatchable_at = Task.get_dispatchable_at(
+                    task.task_name, missing_media
+                )
+                task.save(update_fields=["dispatchable_at"])
+                task.wait_for_media(missing_media)
             return Response(
                 {"message": f"Task {task.id} updated successfully"},
                 status=status.HTTP_200_OK,
@@ -157,6 +406,139 @@ class QueueTaskViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+    @swagger_auto_schema(
+        operation_summary="Worker: Report Media",
+        operation_description="Report the media files present in the Agent storage, "
+        "tasks depending on them become dispatchable",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                "files": openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(type=openapi.TYPE_STRING),
+                    description="The paths relative to the client data folder",
+                )
+            },
+        ),
+        responses={200: "Media reported successfully"},
+    )
+    @action(
+        detail=False,
+        methods=["post"],
+        permission_classes=[IsAuthenticated],
+        url_path="media_ready",
+        url_name="media_ready",
+    )
+    def media_ready(self, request):
+        """
+        Endpoint for the Agent storage to report the media files it has synced
+        """
+        files = request.data.get("files", None)
+        if not isinstance(files, list):
+            return Response(
+                {"error": "files should be a list of paths"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        SyncedMedia.objects.bulk_create(
+            [SyncedMedia(path=path) for path in files], ignore_conflicts=True
+        )
+        released_tasks = Task.release_media_ready(files)
+        if released_tasks:
+            channels = {f"task:{task.task_name}" for task in released_tasks}
+            channels.add("task:all")
+            transaction.on_commit(lambda: long_poll_notifier.notify(*channels))
+        logger.info(
+            f"{len(files)} media reported, {len(released_tasks)} tasks released"
+        )
+        return Response(
+            {
+                "message": f"{len(files)} media reported",
+                "released_tasks": [task.id for task in released_tasks],
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    @swagger_auto_schema(
+        operation_summary="List the clusters",
+        operation_description="The clusters defined in the code and the active ClusterDefinition records",
+        responses={200: "The clusters"},
+    )
+    @action(detail=False, methods=["get"], permission_classes=[IsAuthenticated])
+    def clusters(self, request):
+        """
+        Endpoint for the clients to get the clusters they can use as track cluster
+        """
+        return Response(
+            [
+                {
+                    "name": topology.name,
+                    "version": topology.version,
+                    "components": list(topology.ordered_components),
+                    "task_names": list(topology.task_names),
+                    "is_dag": topology.is_dag,
+                }
+                for topology in get_topologies().values()
+            ],
+            status=status.HTTP_200_OK,
+        )
+
+    @swagger_auto_schema(
+        operation_summary="Latency percentiles",
+        operation_description="The latency percentiles of each task name, from the latency sketches",
+        manual_parameters=[
+            openapi.Parameter(
+                "minutes",
+                openapi.IN_QUERY,
+                description="The period, rounded to the sketch windows, 60 by default",
+                type=openapi.TYPE_INTEGER,
+            ),
+            openapi.Parameter(
+                "cluster_name",
+                openapi.IN_QUERY,
+                description="Only this cluster, all the clusters by default",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                "percentiles",
+                openapi.IN_QUERY,
+                description="Comma separated, 50,90,95,99 by default",
+                type=openapi.TYPE_STRING,
+            ),
+        ],
+        responses={200: "The latency percentiles in seconds"},
+    )
+    @action(detail=False, methods=["get"], permission_classes=[IsAuthenticated])
+    def latency_percentiles(self, request):
+        """
+        Endpoint for the monitoring to alert on the tail latency
+        """
+        try:
+            minutes = int(request.query_params.get("minutes", 60))
+            percentiles = [
+                float(value)
+                for value in request.query_params.get(
+                    "percentiles", ",".join(str(p) for p in DEFAULT_PERCENTILES)
+                ).split(",")
+            ]
+        except ValueError as e:
+            return Response(
+                {"error": f"Invalid parameter: {e}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if any(not 0 <= percentile <= 100 for percentile in percentiles):
+            return Response(
+                {"error": "The percentiles should be between 0 and 100"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(
+            latency_percentiles(
+                since=timezone.now() - timedelta(minutes=minutes),
+                cluster_name=request.query_params.get("cluster_name") or None,
+                percentiles=percentiles,
+            ),
+            status=status.HTTP_200_OK,
+        )
+
     @swagger_auto_schema(
         operation_summary="Worker: Register",
         operation_description="Register a worker",
@@ -194,3 +576,21 @@ class QueueTaskViewSet(viewsets.ViewSet):
             {"message": f"Worker {uuid} registered or updated successfully"},
             status=status.HTTP_200_OK,
         )
+
+
+class MetricsView(APIView):
+    """
+    The Prometheus metrics, scrape it with the token of a user
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="Prometheus metrics",
+        operation_description="The queue depth per task name, the live workers, the chain events "
+        "and the claimed and finished task counters, in the Prometheus text format",
+        responses={200: "The metrics"},
+    )
+    def get(self, request):
+        metrics, content_type = render_metrics()
+        return HttpResponse(metrics, content_type=content_type)
@@ -1,14 +1,12 @@
 import argparse
 import os
+import sys
 import time
 import uuid
-from concurrent.futures import ProcessPoolExecutor
-from multiprocessing import cpu_count
-from typing import Optional
+from typing import List, Optional
 
 # load env from file
 from dotenv import load_dotenv
-
 from models.task import ResultStatus, Task, TaskName
 from modules.emotion_detection.handler import EmotionDetectionHandler
 from modules.general_ml.handler import GeneralMLModel
@@ -18,14 +16,58 @@ from modules.quantization_llm.handler import QuantizationLLM
 from modules.rag.handler import RAGHandler
 from modules.speech_to_text.speech2text import Speech2Text
 from modules.text_to_speech.text2speech import Text2Speech
+
 from utils.api import API
-from utils.constants import API_DOMAIN
+from utils.constants import API_DOMAIN, STREAMING_STORAGE_SOLUTIONS
 from utils.get_logger import get_logger
+from utils.lease_heartbeat import LeaseHeartbeat
+from utils.metrics import (
+    LAST_HEARTBEAT,
+    TASK_DURATION,
+    TASKS_CLAIMED,
+    TASKS_COMPLETED,
+    TASKS_FAILED,
+    start_metrics_server,
+)
+from utils.task_prefetcher import TaskPrefetcher
 from utils.time_logger import TimeLogger
 from utils.timer import timer
+from utils.tracing import tracer
+from utils.worker_pool import (
+    CONFIG_ERROR_EXIT_CODE,
+    WorkerPool,
+    WorkerStats,
+    parse_worker_config,
+)
 
 logger = get_logger("AI-Worker")
 
+# the environment variables each task name needs, read from .env if not set
+TASK_ENV_VARS = {
+    TaskName.text2speech.value: ["OPENAI_API_KEY"],
+    TaskName.hf_llm.value: ["HF_TOKEN"],
+}
+
+
+def pre_env_check(task_name: str) -> bool:
+    """
+    Check the environment variables of the task name are set
+    Args:
+        task_name (str): The task name, all checks the ones of every task name
+
+    Returns:
+        bool: True if they are all set
+    """
+    load_dotenv()
+    for name, env_vars in TASK_ENV_VARS.items():
+        if task_name not in ["all", name]:
+            continue
+        for env_var in env_vars:
+            if os.getenv(env_var) is None:
+                logger.error(f"{env_var} is not set, {name} needs it")
+                return False
+    return True
+
 
 class AIOrchestrator:
     """
@@ -41,6 +83,15 @@ class AIOrchestrator:
         token: str,
         task_name: Optional[str] = "all",
         time_sleep: Optional[float] = 1.5,
+        prefetch: int = 0,
+        long_poll: float = 0,
+        stats: Optional[WorkerStats] = None,
+        metrics_port: Optional[int] = None,
+        stt_backend: str = "whisper",
+        stt_model_size: str = "small",
+        stt_compute_type: str = "int8",
+        batch_size: int = 1,
+        batch_max_wait: float = 0.2,
     ):
         """
         Initialize the AI Orchestrator
@@ -48,9 +99,22 @@ class AIOrchestrator:
             api_domain (str): The API Domain
             token (str): The API Token
             task_name (str): The task name. Default is "all"
-            time_sleep (float): The time to sleep. Default is 1.5 during each loop
+            time_sleep (float): The time to sleep when there is no task. Default is 1.5
+            prefetch (int): How many leased tasks to hold locally. Default is 0, fetch one task at a time
+            long_poll (float): Let the API hold the request up to this many seconds until a task is available.
+                Default is 0, poll every time_sleep seconds
+            stats (WorkerStats): The counters shared with the worker pool supervisor, if run in the pool
+            metrics_port (int): Serve the Prometheus metrics on this port. Default is None, not served
+            stt_backend (str): The speech2text engine, whisper or faster_whisper. Default is whisper
+            stt_model_size (str): The default whisper model size, the tasks can ask for another one.
+                Default is small
+            stt_compute_type (str): The quantization of the faster_whisper engine. Default is int8
+            batch_size (int): How many speech2text tasks to transcribe in one batch. Default is 1, no batching
+            batch_max_wait (float): How long the first task of a batch waits for the others, in seconds.
+                Default is 0.2
         """
         self.uuid = str(uuid.uuid4())
+        tracer.configure(service_name="agent")
         self.api_domain = api_domain
         self.token = token
         self.task_name = task_name
@@ -62,6 +126,17 @@ class AIOrchestrator:
         # controller
         self.counter = 0
         self.time_sleep = time_sleep
+        self.prefetch = prefetch
+        self.long_poll = long_poll
+        self.stats = stats
+        self.metrics_port = metrics_port
+        self.stt_backend = stt_backend
+        self.stt_model_size = stt_model_size
+        self.stt_compute_type = stt_compute_type
+        self.batch_size = batch_size
+        self.batch_max_wait = batch_max_wait
+        # created in run, so the thread lives in the process running the tasks
+        self.task_prefetcher = None
 
         # first check the authentication of the token valid or not
         if not self.authenticate_token():
@@ -103,48 +178,178 @@ class AIOrchestrator:
         return self.api.verify_token()
 
     def pre_env_check(self):
-        # if task is text 2 speech, check openai key
-        load_dotenv()
-        if self.task_name in ["all", "text2speech"]:
-            # check openai key
-            openai_key = os.getenv("OPENAI_API_KEY")
-            if openai_key is None:
-                # READ from .env, and set it
-                # if it not exists, then return False
-                logger.error("OpenAI API Key is not set")
-                return False
-        if self.task_name in ["all", "hf_llm"]:
-            # check openai key
-            openai_key = os.getenv("HF_TOKEN")
-            if openai_key is None:
-                logger.error("OpenAI HF TOKEN is not set")
-                return False
-        return True
+        return pre_env_check(self.task_name)
+
+    def load_models(self):
+        """
+        Load the handler of the task name before the first task arrives,
+        so the first task does not pay for it, and the models stay resident in this process
+        """
+        if self.task_name == "all":
+            return
+        if self.task_name == TaskName.speech2text.value:
+            self.speech2text = self.load_speech2text()
+        elif self.task_name == TaskName.text2speech.value:
+            self.text2speech = Text2Speech()
+        elif self.task_name == TaskName.emotion_detection.value:
+            self.emotion_detection = EmotionDetectionHandler()
+            self.emotion_detection.load_models()
+        elif self.task_name == TaskName.quantization_llm.value:
+            self.quantization_llm = QuantizationLLM(api=self.api)
+        elif self.task_name == TaskName.hf_llm.value:
+            self.hf_llm = HFLLM()
+        elif self.task_name == TaskName.general_ml.value:
+            self.general_ml = GeneralMLModel()
+        elif self.task_name == TaskName.rag.value:
+            self.rag_handler = RAGHandler()
+        elif "openai" in self.task_name:
+            self.openai_handler = OpenAIHandler()
+        logger.info(f"Models loaded for {self.task_name}")
 
     def run(self):
         logger.info(f"AI Worker Running UUID: {self.uuid}")
+        if self.metrics_port is not None:
+            start_metrics_server(self.metrics_port)
+        if self.prefetch > 0:
+            self.task_prefetcher = TaskPrefetcher(
+                api=self.api,
+                size=self.prefetch,
+                time_sleep=self.time_sleep,
+                long_poll=self.long_poll,
+            )
+            self.task_prefetcher.start()
         while True:
             self.counter += 1
+            LAST_HEARTBEAT.labels(self.task_name).set_to_current_time()
             if self.counter % 50 == 0:
                 # report to the cloud that we are still alive
                 logger.info(f"Still alive. Counter: {self.counter}")
                 self.api.register_or_update_worker()
             try:
                 with timer(logger=logger, message="get_task"):
-                    task = self.api.get_task()
+                    task = self.get_next_task()
                 # after get the task, then feed it to the model to evaluate the model params
                 if task is None:
                     logger.info("No task found")
-                    time.sleep(self.time_sleep)
+                    if self.task_prefetcher is None and not self.long_poll:
+                        time.sleep(self.time_sleep)
                     continue
-                self.handle_task(task)
+                if self.batch_size > 1 and self.task_name == TaskName.speech2text.value:
+                    self.handle_speech2text_batch(self.collect_batch(task))
+                else:
+                    self.handle_task(task)
             # allow it accepts keyboard interrupt
             except KeyboardInterrupt:
                 logger.info("Keyboard Interrupt")
                 break
             except Exception as e:
                 logger.exception(e)
-            time.sleep(self.time_sleep)
+                time.sleep(self.time_sleep)
+        if self.task_prefetcher is not None:
+            self.task_prefetcher.stop()
+
+    def get_next_task(self) -> Optional[dict]:
+        """
+        Get the next task, from the prefetch queue if enabled, otherwise from the API
+        Returns:
+            Optional[dict]: The task, None if there is no task
+        """
+        if self.task_prefetcher is not None:
+            task = self.task_prefetcher.get(timeout=self.time_sleep)
+        else:
+            task = self.api.get_task(wait=self.long_poll)
+        if task is not None:
+            TASKS_CLAIMED.labels(task["task_name"]).inc()
+        return task
+
+    def collect_batch(self, first_task: dict) -> List[dict]:
+        """
+        Lease more tasks to batch with the first one, until the batch is full or batch_max_wait has passed,
+        so the first task waits at most batch_max_wait for the others
+        Args:
+            first_task (dict): The task already leased
+
+        Returns:
+            List[dict]: The tasks of the batch
+        """
+        batch = [first_task]
+        deadline = time.monotonic() + self.batch_max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if self.task_prefetcher is not None:
+                task = self.task_prefetcher.get(timeout=remaining)
+                tasks = [task] if task is not None else []
+            else:
+                # the API holds the request until a task comes in, or the time is up
+                tasks, _ = self.api.get_tasks(
+                    limit=self.batch_size - len(batch), wait=remaining
+                )
+                if not tasks:
+                    break
+            for task in tasks:
+                TASKS_CLAIMED.labels(task["task_name"]).inc()
+            batch.extend(tasks)
+        return batch
+
+    def handle_speech2text_batch(self, tasks: List[dict]):
+        """
+        Transcribe the speech2text tasks in one batched decode, and post their results one by one,
+        the streamed ones are handled alone after the batch
+        Args:
+            tasks (List[dict]): The tasks
+        """
+        streamed = [task for task in tasks if task["parameters"].get("streaming")]
+        task_objs = [
+            Task(**task) for task in tasks if not task["parameters"].get("streaming")
+        ]
+        if task_objs:
+            logger.info(f"Transcribing a batch of {len(task_objs)} tasks")
+            if self.speech2text is None:
+                self.speech2text = self.load_speech2text()
+            start_time = time.monotonic()
+            start_timestamp = time.time()
+            with LeaseHeartbeat(
+                self.api, [task_obj.id for task_obj in task_objs]
+            ) as heartbeat:
+                # the leases which expired while the tasks waited locally
+                task_objs = [
+                    task_obj
+                    for task_obj in task_objs
+                    if task_obj.id not in heartbeat.lost
+                ]
+                for task_obj in task_objs:
+                    TimeLogger.log_task(task_obj, "start_task")
+                task_objs = self.speech2text.translate_batch(task_objs)
+            for task_obj in task_objs:
+                TimeLogger.log_task(task_obj, "end_task")
+                # the spans of the batch, one in the trace of each task
+                span = tracer.record_span(
+                    f"agent.{task_obj.task_name}",
+                    start_time=start_timestamp,
+                    end_time=time.time(),
+                    track_id=task_obj.track_id,
+                    parent=task_obj.traceparent,
+                    attributes={
+                        "task_id": task_obj.id,
+                        "worker": self.uuid,
+                        "batch_size": len(task_objs),
+                        "result_status": task_obj.result_status,
+                    },
+                )
+                with tracer.span("agent.post_task_result", parent=span.traceparent):
+                    self.api.post_task_result(task_obj)
+                duration = time.monotonic() - start_time
+                success = task_obj.result_status == ResultStatus.completed.value
+                (TASKS_COMPLETED if success else TASKS_FAILED).labels(
+                    task_obj.task_name
+                ).inc()
+                TASK_DURATION.labels(task_obj.task_name).observe(duration)
+                if self.stats is not None:
+                    self.stats.record(success=success, duration=duration)
+        for task in streamed:
+            self.handle_task(task)
 
     def handle_task(self, task: dict):
         """
@@ -153,18 +358,53 @@ class AIOrchestrator:
             task (dict): The task
         """
         task_obj = Task(**task)
-        TimeLogger.log_task(task_obj, "start_task")
-        if task_obj.task_name in self.task_name_router:
-            task_obj = self.task_name_router[task_obj.task_name](task_obj)
-        elif "openai" in task_obj.task_name:
-            task_obj = self.handle_openai_task(task_obj)
-        else:
-            logger.error(f"Unknown task type: {task_obj.task_name}")
-            task_obj.result_status = ResultStatus.failed.value
-            task_obj.description = f"Unknown task type: {task_obj.task_name}"
-        TimeLogger.log_task(task_obj, "end_task")
-        # then update the task status
-        self.api.post_task_result(task_obj)
+        start_time = time.monotonic()
+        # the child of the span which created the task, the model and transfer steps are its children
+        with tracer.span(
+            f"agent.{task_obj.task_name}",
+            track_id=task_obj.track_id,
+            parent=task_obj.traceparent,
+            attributes={"task_id": task_obj.id, "worker": self.uuid},
+        ) as span, LeaseHeartbeat(self.api, [task_obj.id]) as heartbeat:
+            if task_obj.id in heartbeat.lost:
+                # the lease expired before the task started, another worker runs it
+                span.set_attribute("result_status", "skipped")
+                return
+            TimeLogger.log_task(task_obj, "start_task")
+            if task_obj.task_name in self.task_name_router:
+                task_obj = self.task_name_router[task_obj.task_name](task_obj)
+            elif "openai" in task_obj.task_name:
+                task_obj = self.handle_openai_task(task_obj)
+            else:
+                logger.error(f"Unknown task type: {task_obj.task_name}")
+                task_obj.result_status = ResultStatus.failed.value
+                task_obj.description = f"Unknown task type: {task_obj.task_name}"
+            TimeLogger.log_task(task_obj, "end_task")
+            span.set_attribute("result_status", task_obj.result_status)
+            # then update the task status
+            with tracer.span("agent.post_task_result"):
+                self.api.post_task_result(task_obj)
+        duration = time.monotonic() - start_time
+        success = task_obj.result_status == ResultStatus.completed.value
+        (TASKS_COMPLETED if success else TASKS_FAILED).labels(task_obj.task_name).inc()
+        TASK_DURATION.labels(task_obj.task_name).observe(duration)
+        if self.stats is not None:
+            self.stats.record(success=success, duration=duration)
+
+    def load_speech2text(self) -> Speech2Text:
+        streaming = self.storage_solution in STREAMING_STORAGE_SOLUTIONS
+        if not streaming:
+            logger.warning(
+                f"The streamed speech2text tasks fail with the {self.storage_solution} storage solution, "
+                f"use {' or '.join(STREAMING_STORAGE_SOLUTIONS)} to stream the audio"
+            )
+        return Speech2Text(
+            model_name=self.stt_backend,
+            model_size=self.stt_model_size,
+            api=self.api,
+            compute_type=self.stt_compute_type,
+            streaming=streaming,
+        )
 
     def handle_speech2text_task(self, task: Task):
         """
@@ -173,7 +413,7 @@ class AIOrchestrator:
             task (Task): The task
         """
         if self.speech2text is None:
-            self.speech2text = Speech2Text()
+            self.speech2text = self.load_speech2text()
         task = self.speech2text.handle_task(task)
         return task
 
@@ -267,50 +507,152 @@ class AIOrchestrator:
         return task
 
 
+def run_worker(task_name: str, stats: WorkerStats, **kwargs):
+    """
+    The entry of each worker process in the worker pool,
+    the orchestrator and its models are created inside the process
+    Args:
+        task_name (str): The task name of the worker
+        stats (WorkerStats): The counters shared with the supervisor
+        **kwargs: The other arguments of the AIOrchestrator
+    """
+    if not pre_env_check(task_name):
+        # a restart would fail the same way
+        sys.exit(CONFIG_ERROR_EXIT_CODE)
+    ai_orchestrator = AIOrchestrator(task_name=task_name, stats=stats, **kwargs)
+    ai_orchestrator.load_models()
+    ai_orchestrator.run()
+
+
 if __name__ == "__main__":
     args = argparse.ArgumentParser()
     args.add_argument("--token", type=str, required=True)
     args.add_argument("--api_domain", type=str, required=False, default=API_DOMAIN)
     args.add_argument("--task_name", type=str, required=False, default="all")
     args.add_argument("--multi_processing", type=int, required=False, default=0)
+    args.add_argument(
+        "--prefetch",
+        type=int,
+        required=False,
+        default=0,
+        help="How many leased tasks to hold locally, 0 means fetch one task at a time",
+    )
+    args.add_argument(
+        "--long_poll",
+        type=float,
+        required=False,
+        default=0,
+        help="Let the API hold each request up to this many seconds until a task is available",
+    )
+    args.add_argument(
+        "--workers",
+        type=str,
+        required=False,
+        default=None,
+        help="Run a supervised worker pool, the number of workers per task name, "
+        "like speech2text=4,quantization_llm=1",
+    )
+    args.add_argument(
+        "--metrics_port",
+        type=int,
+        required=False,
+        default=None,
+        help="Serve the Prometheus metrics on this port, "
+        "with a worker pool the workers use the following ports, one each",
+    )
+    args.add_argument(
+        "--stt_backend",
+        type=str,
+        required=False,
+        default="whisper",
+        choices=["whisper", "faster_whisper"],
+        help="The speech2text engine, faster_whisper runs INT8 on CPU",
+    )
+    args.add_argument(
+        "--stt_model_size",
+        type=str,
+        required=False,
+        default="small",
+        help="The default whisper model size, the tasks can ask for another one",
+    )
+    args.add_argument(
+        "--stt_compute_type",
+        type=str,
+        required=False,
+        default="int8",
+        help="The quantization of the faster_whisper engine, int8, int8_float16, float16 or float32",
+    )
+    args.add_argument(
+        "--batch_size",
+        type=int,
+        required=False,
+        default=1,
+        help="Transcribe up to this many speech2text tasks in one batched decode, 1 disables the batching",
+    )
+    args.add_argument(
+        "--batch_max_wait",
+        type=float,
+        required=False,
+        default=0.2,
+        help="How long the first speech2text task of a batch waits for the others, in seconds",
+    )
     args = args.parse_args()
 
-    if args.multi_processing == 0:
+    if args.workers is None and args.multi_processing == 0:
         ai_orchestrator = AIOrchestrator(
-            api_domain=args.api_domain, token=args.token, task_name=args.task_name
+            api_domain=args.api_domain,
+            token=args.token,
+            task_name=args.task_name,
+            prefetch=args.prefetch,
+            long_poll=args.long_poll,
+            metrics_port=args.metrics_port,
+            stt_backend=args.stt_backend,
+            stt_model_size=args.stt_model_size,
+            stt_compute_type=args.stt_compute_type,
+            batch_size=args.batch_size,
+            batch_max_wait=args.batch_max_wait,
         )
         ai_orchestrator.run()
     else:
-        if "all" in args.task_name:
-            task_names = [
-                TaskName.quantization_llm.value,
-                TaskName.hf_llm.value,
-                TaskName.emotion_detection.value,
-                TaskName.general_ml.value,
-                TaskName.openai_gpt4o.value,
-                TaskName.openai_speech2text.value,
-                TaskName.openai_text2speech.value,
-                TaskName.speech2text.value,
-                TaskName.text2speech.value,
-                TaskName.openai_gpt4o_text_only.value,
-                TaskName.openai_gpt_4o_text_and_image.value,
-                TaskName.rag.value,
-            ]
+        if args.workers is not None:
+            workers = parse_worker_config(args.workers)
+        elif "all" in args.task_name:
+            # one worker per task name
+            workers = {
+                task_name: 1
+                for task_name in [
+                    TaskName.quantization_llm.value,
+                    TaskName.hf_llm.value,
+                    TaskName.emotion_detection.value,
+                    TaskName.general_ml.value,
+                    TaskName.openai_gpt4o.value,
+                    TaskName.openai_speech2text.value,
+                    TaskName.openai_text2speech.value,
+                    TaskName.speech2text.value,
+                    TaskName.text2speech.value,
+                    TaskName.openai_gpt4o_text_only.value,
+                    TaskName.openai_gpt_4o_text_and_image.value,
+                    TaskName.rag.value,
+                ]
+                if pre_env_check(task_name)
+            }
         else:
-            task_names = args.task_name.split(",")
-
-        # get multiple processes to run the ai_orchestrator
-        with ProcessPoolExecutor(max_workers=cpu_count()) as executor:
-            futures = []
-            for task_name in task_names:
-                futures.append(
-                    executor.submit(
-                        AIOrchestrator(
-                            api_domain=args.api_domain,
-                            token=args.token,
-                            task_name=task_name,
-                        ).run
-                    )
-                )
-            for future in futures:
-                future.result()
+            workers = parse_worker_config(args.task_name)
+
+        worker_pool = WorkerPool(
+            workers=workers,
+            worker_target=run_worker,
+            worker_kwargs={
+                "api_domain": args.api_domain,
+                "token": args.token,
+                "prefetch": args.prefetch,
+                "long_poll": args.long_poll,
+                "stt_backend": args.stt_backend,
+                "stt_model_size": args.stt_model_size,
+                "stt_compute_type": args.stt_compute_type,
+                "batch_size": args.batch_size,
+                "batch_max_wait": args.batch_max_wait,
+            },
+            metrics_port=args.metrics_port,
+        )
+        worker_pool.run()
@@ -1,6 +1,6 @@
-from typing import List
+from typing import List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import AliasChoices, BaseModel, Field
 
 
 class Text2SpeechParameters(BaseModel):
@@ -10,7 +10,27 @@ class Text2SpeechParameters(BaseModel):
 class Speech2TextParameters(BaseModel):
     uid: str = Field(..., description="The uid of the audio acquire session")
     audio_index: str = Field(..., description="The sequence index of the audio")
-    end_time: str = Field(..., description="The end time of the audio")
+    end_time: Optional[str] = Field(
+        None, description="The end time of the audio, unknown when it is streamed"
+    )
+    streaming: bool = Field(
+        default=False,
+        description="The audio arrives in chunks under audio/{uid}/stream/{audio_index}/ while it is recorded",
+    )
+    precompute_audio_features: bool = Field(
+        default=False,
+        description="Compute the audio features for the emotion detection from the decoded audio",
+    )
+    stt_model_size: Optional[str] = Field(
+        None,
+        description="The whisper model size, like tiny, base, small or large-v3, the worker default if None",
+        # model_size is the earlier name, renamed out of the protected model_ namespace of pydantic
+        validation_alias=AliasChoices("stt_model_size", "model_size"),
+    )
+    vad: bool = Field(
+        default=True,
+        description="Trim the silence before transcribing, and skip the audio without speech",
+    )
 
 
 class EmotionDetectionParameters(BaseModel):
@@ -20,6 +40,19 @@ class EmotionDetectionParameters(BaseModel):
         description="The images data to analyze for emotion"
     )
     data_text_id: int = Field(..., description="The id of the data text")
+    face_batch_size: int = Field(
+        default=32, description="How many faces to embed in one forward pass"
+    )
+    frame_sample_every: int = Field(
+        default=1, description="Only use every n-th frame of the images"
+    )
+    max_frames: Optional[int] = Field(
+        default=None,
+        description="The maximum number of frames to use, evenly spread over the images",
+    )
+    frame_reduce_factor: int = Field(
+        default=1, description="Decode the frames at 1/n resolution, 1, 2, 4 or 8"
+    )
 
 
 class QuantizationLLMParameters(BaseModel):
@@ -60,3 +60,9 @@ class Task(BaseModel):
     description: Optional[str] = Field(
         None, description="The description of the task result"
     )
+    track_id: Optional[str] = Field(
+        None, description="The track ID, T-{cluster_name}-{uid}"
+    )
+    traceparent: Optional[str] = Field(
+        None, description="The W3C traceparent of the span which created the task"
+    )
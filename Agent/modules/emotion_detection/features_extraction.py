@@ -1,7 +1,6 @@
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Dict, Hashable, List, Optional, Tuple, Union
 
 import cv2
-import librosa
 import numpy as np
 import torch
 from deepface.commons.logger import Logger
@@ -12,41 +11,135 @@ from deepface.modules import modeling, preprocessing
 from PIL import Image
 from tensorflow.keras.preprocessing import image
 
+from utils.audio_features import audio_feature_store
 from utils.get_logger import get_logger
+from utils.lru_cache import LRUCache
+from utils.model_registry import model_registry
 
 logger = get_logger(__name__)
 
+# face embeddings of the frames, keyed by model name and frame key (path, mtime, reduce factor)
+# None means no face was found in the frame
+embedding_cache = LRUCache(max_size=2048)
+
 
 class FeaturesExtractor:
     def __init__(self) -> None:
         self.padding_mode = "zeros"
         self.padding_location = "back"
 
+    @staticmethod
+    def get_face_model(model_name: str = "OpenFace") -> FacialRecognition:
+        """Get the face recognition model, built once per worker process."""
+        model, _ = model_registry.get(
+            f"deepface_{model_name}", lambda: modeling.build_model(model_name)
+        )
+        return model
+
+    @staticmethod
+    def face_model_loaded(model_name: str = "OpenFace") -> bool:
+        return model_registry.is_loaded(f"deepface_{model_name}")
+
     @staticmethod
     def get_audio_embedding(audios: List[str]) -> torch.Tensor:
-        """Extracts and returns average audio features from a list of audio files."""
-        features = []
-        for audio_path in audios:
-            y, sr = librosa.load(audio_path)
-            hop_length = 512
-            f0 = librosa.feature.zero_crossing_rate(y, hop_length=hop_length).T
-            mfcc = librosa.feature.mfcc(y=y, sr=sr, hop_length=hop_length, htk=True).T
-            cqt = librosa.feature.chroma_cqt(y=y, sr=sr, hop_length=hop_length).T
-            temp_feature = np.concatenate([f0, mfcc, cqt], axis=-1)
-            features.append(temp_feature)
+        """Extracts and returns average audio features from a list of audio files.
+
+        The features are shared with speech2text through the audio feature store,
+        so an utterance already featurised there is not decoded again.
+        """
+        features = [
+            audio_feature_store.get_features(audio_path) for audio_path in audios
+        ]
         feature = np.mean(np.concatenate(features), axis=0).reshape(1, -1)
         # get them into tensor
         feature = torch.tensor(feature).float()
         return feature
 
-    def get_images_tensor(self, images: List[np.ndarray]) -> torch.Tensor:
-        """Extracts features from a list of images using a specified model."""
+    @staticmethod
+    def sample_frames(
+        images: List[Any],
+        sample_every: int = 1,
+        max_frames: Optional[int] = None,
+    ) -> List[Any]:
+        """Keeps every n-th frame, then at most max_frames frames evenly spread over them."""
+        images = images[:: max(sample_every, 1)]
+        if max_frames is not None and 0 < max_frames < len(images):
+            indices = (
+                np.linspace(0, len(images) - 1, num=max_frames).round().astype(int)
+            )
+            images = [images[index] for index in indices]
+        return images
+
+    def get_images_tensor(
+        self,
+        images: List[np.ndarray],
+        batch_size: int = 32,
+        sample_every: int = 1,
+        max_frames: Optional[int] = None,
+        keys: Optional[List[Hashable]] = None,
+    ) -> torch.Tensor:
+        """
+        Extracts features from a list of images using a specified model.
+
+        Faces are detected and aligned frame by frame, then stacked and embedded
+        with one forward pass per batch_size faces, instead of one pass per frame.
+        When the frame keys are given, the embeddings are cached,
+        and frames seen by previous tasks are not embedded again.
+        """
         model_name = "OpenFace"
-        image_features = [
-            self.represent(image, model_name=model_name)[0]["embedding"]
-            for image in images
-        ]
-        return torch.tensor(image_features)
+        if keys is None:
+            keys = [None] * len(images)
+        indices = self.sample_frames(list(range(len(images))), sample_every, max_frames)
+        images = [images[index] for index in indices]
+        keys = [keys[index] for index in indices]
+        model: FacialRecognition = self.get_face_model(model_name)
+        target_size = model.input_shape
+
+        # the embedding of each frame, filled from the cache or the forward passes
+        embeddings: List[Optional[np.ndarray]] = [None] * len(images)
+        faces = []
+        face_positions = []
+        for position, (key, img) in enumerate(zip(keys, images)):
+            cache_key = (model_name, key) if key is not None else None
+            if cache_key is not None and cache_key in embedding_cache:
+                embeddings[position] = embedding_cache.get(cache_key)
+                continue
+            img_objs = self.extract_faces(
+                img,
+                target_size=(target_size[1], target_size[0]),
+                detector_backend="opencv",
+                grayscale=False,
+                enforce_detection=False,
+                align=True,
+                expand_percentage=0,
+            )
+            if not img_objs:
+                if cache_key is not None:
+                    embedding_cache.put(cache_key, None)
+                continue
+            # same as represent, only the first face of each frame is used
+            faces.append(
+                preprocessing.normalize_input(
+                    img=img_objs[0]["face"], normalization="base"
+                )
+            )
+            face_positions.append(position)
+
+        batch_size = max(batch_size, 1)
+        for start in range(0, len(faces), batch_size):
+            batch = np.concatenate(faces[start : start + batch_size], axis=0)
+            batch_embeddings = model.model(batch, training=False).numpy()
+            for position, embedding in zip(
+                face_positions[start : start + batch_size], batch_embeddings
+            ):
+                embeddings[position] = embedding
+                if keys[position] is not None:
+                    embedding_cache.put((model_name, keys[position]), embedding)
+
+        embeddings = [embedding for embedding in embeddings if embedding is not None]
+        if not embeddings:
+            return torch.tensor([])
+        return torch.tensor(np.stack(embeddings))
 
     def represent(
         self,
@@ -60,7 +153,7 @@ class FeaturesExtractor:
     ) -> List[Dict[str, Any]]:
         resp_objs = []
 
-        model: FacialRecognition = modeling.build_model(model_name)
+        model: FacialRecognition = self.get_face_model(model_name)
 
         # ---------------------------------
         # we have run pre-process in verification. so, this can be skipped if it is coming from verifying.
@@ -0,0 +1,125 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from utils.get_logger import get_logger
+from utils.lru_cache import LRUCache
+
+logger = get_logger(__name__)
+
+# cv2.imread flags to decode the JPEG at 1/n of its resolution, which is also faster to decode
+REDUCED_COLOR_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+class FrameLoader:
+    """
+    Decode the video frames of the emotion detection task
+
+    The frames are decoded in a thread pool (cv2 releases the GIL while decoding),
+    optionally at a reduced resolution, and the decoded frames are kept in an LRU cache
+    keyed by path and modification time, as consecutive conversation turns within the same minute
+    read the same frames folder again.
+    """
+
+    def __init__(self, max_workers: int = 4, cache_size: int = 512):
+        """
+        Args:
+            max_workers (int): The number of threads decoding the frames
+            cache_size (int): The maximum number of decoded frames to keep
+        """
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="frame-loader"
+        )
+        self.cache = LRUCache(max_size=cache_size)
+
+    @staticmethod
+    def list_frames(folders: List[Path]) -> List[Path]:
+        """
+        List the frame files of the folders, in the order they were recorded
+        Args:
+            folders (List[Path]): The frames folders
+
+        Returns:
+            List[Path]: The frame files
+        """
+        frames = []
+        for folder in folders:
+            if not folder.exists():
+                continue
+            frames.extend(sorted(path for path in folder.iterdir() if path.is_file()))
+        return frames
+
+    @staticmethod
+    def frame_key(path: Path, reduce_factor: int = 1) -> Tuple[str, int, int]:
+        """
+        The cache key of the frame, a rewritten frame gets a new key
+        Args:
+            path (Path): The frame file
+            reduce_factor (int): The resolution reduce factor
+
+        Returns:
+            Tuple[str, int, int]: The path, modification time in ns and the reduce factor
+        """
+        return path.as_posix(), path.stat().st_mtime_ns, reduce_factor
+
+    def decode(
+        self, path: Path, reduce_factor: int = 1
+    ) -> Tuple[Optional[Tuple], Optional[np.ndarray]]:
+        """
+        Decode the frame, or get it from the cache
+        Args:
+            path (Path): The frame file
+            reduce_factor (int): Decode at 1/n resolution, 1, 2, 4 or 8
+
+        Returns:
+            Tuple: The cache key and the frame, both None if the frame can not be read
+        """
+        try:
+            key = self.frame_key(path, reduce_factor)
+        except FileNotFoundError:
+            return None, None
+        image = self.cache.get(key)
+        if image is None:
+            image = cv2.imread(
+                path.as_posix(),
+                REDUCED_COLOR_FLAGS.get(reduce_factor, cv2.IMREAD_COLOR),
+            )
+            if image is None:
+                logger.warning(f"Can not read frame {path}")
+                return None, None
+            self.cache.put(key, image)
+        return key, image
+
+    def load(
+        self, frames: List[Path], reduce_factor: int = 1
+    ) -> Tuple[List[Tuple], List[np.ndarray]]:
+        """
+        Decode the frames in the thread pool, keep the order
+        Args:
+            frames (List[Path]): The frame files
+            reduce_factor (int): Decode at 1/n resolution, 1, 2, 4 or 8
+
+        Returns:
+            Tuple[List[Tuple], List[np.ndarray]]: The cache keys and the frames which can be read
+        """
+        keys = []
+        images = []
+        for key, image in self.executor.map(
+            lambda path: self.decode(path, reduce_factor), frames
+        ):
+            if image is None:
+                continue
+            keys.append(key)
+            images.append(image)
+        return keys, images
+
+
+frame_loader = FrameLoader()
@@ -2,16 +2,17 @@ import os
 from datetime import datetime
 from typing import List, Optional, Tuple
 
-import cv2
 import torch
 
 from models.parameters import EmotionDetectionParameters
 from models.task import ResultStatus, Task
 from models.track_type import TrackType
 from modules.emotion_detection.features_extraction import FeaturesExtractor
+from modules.emotion_detection.frame_loader import frame_loader
 from modules.emotion_detection.sentiment import SentimentAnalysis
 from utils.constants import CLIENT_DATA_FOLDER, EMOTION_DETECTION_MODEL_DIR
 from utils.get_logger import get_logger
+from utils.model_registry import model_registry
 from utils.time_logger import TimeLogger
 from utils.time_tracker import time_tracker
 
@@ -24,9 +25,42 @@ models_dir = EMOTION_DETECTION_MODEL_DIR / "model_data"
 
 logger = get_logger(__name__)
 
+FEATURES_EXTRACTOR_KEY = "emotion_detection_features_extractor"
+SENTIMENT_MODEL_KEY = "emotion_detection_sentiment"
+
+
+def load_sentiment_model() -> SentimentAnalysis:
+    """
+    Build the sentiment analysis model and load the trained weights
+    Returns:
+        SentimentAnalysis: The model in eval mode
+    """
+    device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
+    model = SentimentAnalysis().to(device)
+    model.load_state_dict(
+        {
+            k.replace("Model.", ""): v
+            for k, v in torch.load(models_dir / "sa_sims.pth").items()
+        },
+        strict=True,
+    )
+    model.eval()
+    return model
+
 
 class EmotionDetectionHandler:
 
+    @staticmethod
+    def load_models():
+        """
+        Load the models into the registry, so the first task does not pay for it
+        """
+        features_extractor, _ = model_registry.get(
+            FEATURES_EXTRACTOR_KEY, FeaturesExtractor
+        )
+        features_extractor.get_face_model()
+        model_registry.get(SENTIMENT_MODEL_KEY, load_sentiment_model)
+
     def handle_task(self, task: Task) -> Optional[Task]:
         """
         Handle the task
@@ -45,7 +79,13 @@ class EmotionDetectionHandler:
         logger.info(f"Images: {len(images_path_list)}")
         TimeLogger.log_task(task, "start_trigger_emotion_model")
         result_profile, latency_profile = self.trigger_model(
-            text, [audio_file], images_path_list
+            text,
+            [audio_file],
+            images_path_list,
+            face_batch_size=emotion_detection_parameters.face_batch_size,
+            frame_sample_every=emotion_detection_parameters.frame_sample_every,
+            max_frames=emotion_detection_parameters.max_frames,
+            frame_reduce_factor=emotion_detection_parameters.frame_reduce_factor,
         )
         TimeLogger.log_task(task, "end_trigger_emotion_model")
         task.result_status = ResultStatus.completed.value
@@ -55,7 +95,13 @@ class EmotionDetectionHandler:
 
     @staticmethod
     def trigger_model(
-        text: str, audio_paths: List[str], images_paths: List[str]
+        text: str,
+        audio_paths: List[str],
+        images_paths: List[str],
+        face_batch_size: int = 32,
+        frame_sample_every: int = 1,
+        max_frames: Optional[int] = None,
+        frame_reduce_factor: int = 1,
     ) -> Tuple[dict, dict]:
         """
 
@@ -63,6 +109,10 @@ class EmotionDetectionHandler:
             text (str): The text to analyze for emotion
             audio_paths (List[str]): The audio data to analyze for emotion
             images_paths (List[str]): The images data to analyze for emotion
+            face_batch_size (int): How many faces to embed in one forward pass
+            frame_sample_every (int): Only use every n-th frame
+            max_frames (int): The maximum number of frames to use
+            frame_reduce_factor (int): Decode the frames at 1/n resolution, 1, 2, 4 or 8
 
         Returns:
 
@@ -83,27 +133,38 @@ class EmotionDetectionHandler:
             audio.append((CLIENT_DATA_FOLDER / audio_path).as_posix())
 
         start_time = datetime.now()
-        # read the images
-        images = []
-        for images_path in images_paths:
-            folder = CLIENT_DATA_FOLDER / images_path
-            if not folder.exists():
-                continue
-            # Time Killer
-            for image_file in folder.iterdir():
-                image = cv2.imread(image_file.as_posix())
-                images.append(image)
+        # read the images, sample the frames before decoding them
+        frames = FeaturesExtractor.sample_frames(
+            frame_loader.list_frames(
+                [CLIENT_DATA_FOLDER / images_path for images_path in images_paths]
+            ),
+            sample_every=frame_sample_every,
+            max_frames=max_frames,
+        )
+        frame_keys, images = frame_loader.load(
+            frames, reduce_factor=frame_reduce_factor
+        )
         latency_profile["io_images_read"] = (
             datetime.now() - start_time
         ).total_seconds()
 
+        # whether all the models were loaded by previous tasks
+        warm = (
+            model_registry.is_loaded(FEATURES_EXTRACTOR_KEY)
+            and model_registry.is_loaded(SENTIMENT_MODEL_KEY)
+            and FeaturesExtractor.face_model_loaded()
+        )
         # 1. get the features with bert cn model
         with time_tracker(
             "feature_extraction", latency_profile, track_type=TrackType.MODEL.value
         ):
-            features_extractor = FeaturesExtractor()
+            features_extractor, _ = model_registry.get(
+                FEATURES_EXTRACTOR_KEY, FeaturesExtractor
+            )
             feature_video = (
-                features_extractor.get_images_tensor(images)
+                features_extractor.get_images_tensor(
+                    images, batch_size=face_batch_size, keys=frame_keys
+                )
                 if images is not None
                 else None
             )  # (n/5,709)
@@ -124,22 +185,13 @@ class EmotionDetectionHandler:
             else logger.info("feature_audio: there are no information about audio")
         )
 
-        # data is ready
-        device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
-        model = SentimentAnalysis().to(device)
-        # load the model
+        # data is ready, load the model, it is only loaded once per worker process
         with time_tracker(
             "load_model", latency_profile, track_type=TrackType.MODEL.value
         ):
-            model.load_state_dict(
-                {
-                    k.replace("Model.", ""): v
-                    for k, v in torch.load(models_dir / "sa_sims.pth").items()
-                },
-                strict=True,
-            )
-
-            model.eval()
+            model, _ = model_registry.get(SENTIMENT_MODEL_KEY, load_sentiment_model)
+        # not a model_ key, so it is not summed into the model latency
+        latency_profile["warm_models"] = warm
 
         # run model
         with time_tracker("infer", latency_profile, track_type=TrackType.MODEL.value):
@@ -0,0 +1,241 @@
+"""
+The speech to text engines, behind one interface
+
+- whisper: openai-whisper with PyTorch, FP16 on GPU and FP32 on CPU
+- faster_whisper: the same models converted to CTranslate2, INT8 by default, several times faster on CPU
+
+Both return the result in the openai-whisper format, text, segments and language,
+so the rest of the Agent does not depend on the engine.
+"""
+
+from typing import Dict, List, Optional, Type
+
+import numpy as np
+
+from utils.get_logger import get_logger
+from utils.timer import timer
+
+logger = get_logger(__name__)
+
+
+class STTBackend:
+    """
+    The interface of the speech to text engines
+    """
+
+    name = ""
+
+    def __init__(self, model_size: str = "small", multi_language: bool = True):
+        """
+        Args:
+            model_size (str): The whisper model size, like tiny, base, small, medium, large-v3
+            multi_language (bool): If the model is multi-language, otherwise the .en model is used
+        """
+        if not multi_language and "large" not in model_size:
+            model_size = f"{model_size}.en"
+        self.model_size = model_size
+
+    def transcribe(
+        self,
+        audio_np: np.ndarray,
+        initial_prompt: Optional[str] = None,
+        condition_on_previous_text: bool = True,
+    ) -> dict:
+        """
+        Transcribe the audio
+
+        Args:
+            audio_np (np.ndarray): The mono float32 waveform at 16 kHz
+            initial_prompt (str): The text before the audio, like the committed text of a stream
+            condition_on_previous_text (bool): Prompt each 30 seconds window with the text of the previous one
+
+        Returns:
+            dict: The text, the segments with their start, end and text, and the language
+        """
+        raise NotImplementedError
+
+    def transcribe_batch(self, audios: List[np.ndarray]) -> List[dict]:
+        """
+        Transcribe several utterances, one after the other unless the engine decodes them in one batch
+
+        Args:
+            audios (List[np.ndarray]): The mono float32 waveforms at 16 kHz
+
+        Returns:
+            List[dict]: The results, in the same order
+        """
+        return [self.transcribe(audio_np) for audio_np in audios]
+
+
+class WhisperBackend(STTBackend):
+    name = "whisper"
+
+    def __init__(self, model_size: str = "small", multi_language: bool = True):
+        super().__init__(model_size, multi_language)
+        import torch
+        import whisper
+
+        self.torch = torch
+        self.whisper = whisper
+        self.fp16 = torch.cuda.is_available()
+        with timer(logger, f"Loading whisper {self.model_size}"):
+            self.model = whisper.load_model(self.model_size)
+
+    def transcribe(
+        self,
+        audio_np: np.ndarray,
+        initial_prompt: Optional[str] = None,
+        condition_on_previous_text: bool = True,
+    ) -> dict:
+        return self.model.transcribe(
+            audio_np,
+            fp16=self.fp16,
+            initial_prompt=initial_prompt,
+            condition_on_previous_text=condition_on_previous_text,
+        )
+
+    def transcribe_batch(self, audios: List[np.ndarray]) -> List[dict]:
+        """
+        Pad each utterance to the 30 seconds window of whisper, stack their log-mel spectrograms,
+        and decode them in one forward pass of the encoder and one batched greedy decode,
+        the utterances longer than the window go through transcribe
+        """
+        sample_rate = self.whisper.audio.SAMPLE_RATE
+        results: List[Optional[dict]] = [None] * len(audios)
+        batch = [
+            index
+            for index, audio_np in enumerate(audios)
+            if len(audio_np) <= self.whisper.audio.N_SAMPLES
+        ]
+        if len(batch) > 1:
+            mel = self.torch.stack(
+                [
+                    self.whisper.log_mel_spectrogram(
+                        self.whisper.pad_or_trim(audios[index]),
+                        n_mels=self.model.dims.n_mels,
+                    )
+                    for index in batch
+                ]
+            ).to(self.model.device)
+            decoded = self.whisper.decode(
+                self.model, mel, self.whisper.DecodingOptions(fp16=self.fp16)
+            )
+            for index, result in zip(batch, decoded):
+                results[index] = {
+                    "text": result.text,
+                    # the batched decode has no timestamps, one segment per utterance
+                    "segments": [
+                        {
+                            "id": 0,
+                            "start": 0.0,
+                            "end": len(audios[index]) / sample_rate,
+                            "text": result.text,
+                            "avg_logprob": result.avg_logprob,
+                            "no_speech_prob": result.no_speech_prob,
+                        }
+                    ],
+                    "language": result.language,
+                }
+        return [
+            result if result is not None else self.transcribe(audio_np)
+            for result, audio_np in zip(results, audios)
+        ]
+
+
+class FasterWhisperBackend(STTBackend):
+    name = "faster_whisper"
+
+    def __init__(
+        self,
+        model_size: str = "small",
+        multi_language: bool = True,
+        compute_type: str = "int8",
+        cpu_threads: int = 0,
+        beam_size: int = 5,
+    ):
+        """
+        Args:
+            model_size (str): The whisper model size
+            multi_language (bool): If the model is multi-language
+            compute_type (str): The CTranslate2 quantization, int8, int8_float16, float16 or float32
+            cpu_threads (int): The threads of the CPU inference, 0 lets CTranslate2 decide
+            beam_size (int): The beam size, 5 like openai-whisper, 1 is greedy and faster
+        """
+        super().__init__(model_size, multi_language)
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise ImportError(
+                "The faster_whisper backend needs faster-whisper, pip install faster-whisper"
+            ) from e
+
+        self.compute_type = compute_type
+        self.beam_size = beam_size
+        with timer(logger, f"Loading faster-whisper {self.model_size} {compute_type}"):
+            # the weights are converted to compute_type when loaded
+            self.model = WhisperModel(
+                self.model_size,
+                device="auto",
+                compute_type=compute_type,
+                cpu_threads=cpu_threads,
+            )
+
+    def transcribe(
+        self,
+        audio_np: np.ndarray,
+        initial_prompt: Optional[str] = None,
+        condition_on_previous_text: bool = True,
+    ) -> dict:
+        segments, info = self.model.transcribe(
+            audio_np,
+            beam_size=self.beam_size,
+            initial_prompt=initial_prompt,
+            condition_on_previous_text=condition_on_previous_text,
+        )
+        # the segments are decoded lazily, while they are iterated
+        segments = [
+            {
+                "id": segment.id,
+                "start": segment.start,
+                "end": segment.end,
+                "text": segment.text,
+                "avg_logprob": segment.avg_logprob,
+                "no_speech_prob": segment.no_speech_prob,
+            }
+            for segment in segments
+        ]
+        return {
+            "text": "".join(segment["text"] for segment in segments),
+            "segments": segments,
+            "language": info.language,
+        }
+
+
+STT_BACKENDS: Dict[str, Type[STTBackend]] = {
+    WhisperBackend.name: WhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+
+def load_backend(
+    name: str, model_size: str = "small", multi_language: bool = True, **kwargs
+) -> STTBackend:
+    """
+    Load the speech to text engine
+
+    Args:
+        name (str): The engine, whisper or faster_whisper
+        model_size (str): The whisper model size
+        multi_language (bool): If the model is multi-language
+        **kwargs: The other arguments of the engine, like the compute_type of faster_whisper
+
+    Returns:
+        STTBackend: The engine
+    """
+    if name not in STT_BACKENDS:
+        raise ValueError(
+            f"Model {name} not supported, choose from {list(STT_BACKENDS)}"
+        )
+    return STT_BACKENDS[name](
+        model_size=model_size, multi_language=multi_language, **kwargs
+    )
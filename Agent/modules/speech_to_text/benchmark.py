@@ -0,0 +1,177 @@
+"""
+Compare the speech to text engines on a folder of recordings, for speed and accuracy
+
+The folder has the audio files, and next to each of them a .txt file with the reference transcript,
+like the utterances the Listener recorded, transcribed by hand.
+
+- RTF, real time factor: the transcription time divided by the audio duration, below 1 is faster than real time
+- WER, word error rate: the word level edit distance to the references divided by the reference words
+
+    python -m modules.speech_to_text.benchmark --dataset data/stt_benchmark \
+        --configs whisper:small,faster_whisper:small:int8,faster_whisper:base:int8
+"""
+
+import argparse
+import csv
+import re
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from modules.speech_to_text.backends import load_backend
+from utils.audio_features import AUDIO_SAMPLE_RATE, audio_feature_store
+from utils.get_logger import get_logger
+
+logger = get_logger(__name__)
+
+AUDIO_EXTENSIONS = [".wav", ".mp3", ".flac"]
+
+
+def normalise_text(text: str) -> List[str]:
+    """
+    Lower case the text and drop the punctuation, so only the words are compared
+    """
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_errors(reference: str, hypothesis: str) -> Tuple[int, int]:
+    """
+    The word level edit distance, substitutions, deletions and insertions
+
+    Args:
+        reference (str): The reference transcript
+        hypothesis (str): The transcript to score
+
+    Returns:
+        Tuple[int, int]: The errors and the number of reference words
+    """
+    ref = normalise_text(reference)
+    hyp = normalise_text(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_word != hyp_word),
+            )
+        previous = current
+    return previous[-1], len(ref)
+
+
+def load_dataset(dataset_dir: Path) -> List[Tuple[Path, str]]:
+    """
+    The audio files of the folder which have a reference transcript
+
+    Args:
+        dataset_dir (Path): The folder
+
+    Returns:
+        List[Tuple[Path, str]]: The audio files and their references
+    """
+    samples = []
+    for audio_file in sorted(dataset_dir.rglob("*")):
+        if audio_file.suffix.lower() not in AUDIO_EXTENSIONS:
+            continue
+        reference_file = audio_file.with_suffix(".txt")
+        if not reference_file.exists():
+            logger.warning(f"No reference for {audio_file}, skipped")
+            continue
+        samples.append((audio_file, reference_file.read_text().strip()))
+    return samples
+
+
+def benchmark_config(config: str, samples: List[Tuple[Path, str]]) -> dict:
+    """
+    Transcribe all the samples with one engine
+
+    Args:
+        config (str): {backend}:{model_size}[:{compute_type}], like faster_whisper:small:int8
+        samples (List[Tuple[Path, str]]): The audio files and their references
+
+    Returns:
+        dict: The load time, the real time factor and the word error rate
+    """
+    backend, model_size, *rest = config.split(":")
+    kwargs = {"compute_type": rest[0]} if rest else {}
+    load_start = time.perf_counter()
+    audio_model = load_backend(backend, model_size=model_size, **kwargs)
+    load_seconds = time.perf_counter() - load_start
+
+    # warm up, the first call pays for the lazy initialisations
+    audio_model.transcribe(audio_feature_store.load_waveform(samples[0][0]))
+
+    audio_seconds = transcribe_seconds = 0.0
+    errors = reference_words = 0
+    for audio_file, reference in samples:
+        audio_np = audio_feature_store.load_waveform(audio_file)
+        start = time.perf_counter()
+        result = audio_model.transcribe(audio_np)
+        elapsed = time.perf_counter() - start
+        sample_errors, sample_words = word_errors(reference, result["text"])
+        logger.info(
+            f"{config} {audio_file.name}: {elapsed:.2f}s, "
+            f"{sample_errors}/{sample_words} errors, {result['text']!r}"
+        )
+        audio_seconds += len(audio_np) / AUDIO_SAMPLE_RATE
+        transcribe_seconds += elapsed
+        errors += sample_errors
+        reference_words += sample_words
+    return {
+        "config": config,
+        "samples": len(samples),
+        "audio_seconds": round(audio_seconds, 2),
+        "load_seconds": round(load_seconds, 2),
+        "transcribe_seconds": round(transcribe_seconds, 2),
+        "rtf": round(transcribe_seconds / audio_seconds, 4) if audio_seconds else None,
+        "wer": round(errors / reference_words, 4) if reference_words else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the real time factor and the word error rate of the speech to text engines"
+    )
+    parser.add_argument(
+        "--dataset",
+        type=str,
+        required=True,
+        help="The folder of audio files, each with a .txt reference transcript",
+    )
+    parser.add_argument(
+        "--configs",
+        type=str,
+        default="whisper:small,faster_whisper:small:int8",
+        help="Comma separated {backend}:{model_size}[:{compute_type}]",
+    )
+    parser.add_argument(
+        "--output", type=str, default=None, help="Also write the results to this CSV"
+    )
+    args = parser.parse_args()
+
+    samples = load_dataset(Path(args.dataset))
+    if not samples:
+        logger.error(f"No audio file with a reference in {args.dataset}")
+        return
+
+    results = [
+        benchmark_config(config.strip(), samples)
+        for config in args.configs.split(",")
+        if config.strip()
+    ]
+    for result in results:
+        logger.critical(
+            f"{result['config']}: RTF {result['rtf']}, WER {result['wer']}, "
+            f"{result['transcribe_seconds']}s for {result['audio_seconds']}s of audio, "
+            f"loaded in {result['load_seconds']}s"
+        )
+    if args.output:
+        with open(args.output, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,20 @@
 from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
-import torch
-import whisper
+import numpy as np
 
 from models.parameters import Speech2TextParameters
 from models.task import ResultStatus, Task
 from models.track_type import TrackType
+from modules.speech_to_text.backends import STT_BACKENDS, STTBackend, load_backend
+from modules.speech_to_text.streaming import StreamingTranscriber, stream_chunks
+from modules.speech_to_text.vad import speech_bounds
+from utils.api import API
+from utils.audio_features import audio_feature_store
 from utils.constants import CLIENT_DATA_FOLDER
 from utils.get_logger import get_logger
+from utils.lru_cache import LRUCache
 from utils.time_logger import TimeLogger
 from utils.time_tracker import time_tracker
 from utils.timer import timer
@@ -16,28 +23,65 @@ logger = get_logger(__name__)
 
 
 class Speech2Text:
-    SUPPORTED_MODELS = ["whisper"]
+    SUPPORTED_MODELS = list(STT_BACKENDS)
 
     def __init__(
         self,
         model_name: str = "whisper",
         model_size: str = "small",
         multi_language: bool = True,
+        api: Optional[API] = None,
+        compute_type: str = "int8",
+        max_models: int = 2,
+        streaming: bool = True,
     ):
         """
         Initialize the translator
         Args:
-            model_name (str): The name of the model to use
-            model_size (str): The size of the model to use
+            model_name (str): The engine to use, whisper or faster_whisper
+            model_size (str): The default size of the model, the tasks can ask for another one
             multi_language (bool): If the model is multi-language
+            api (API): Post the partial transcripts of the streamed audio to the API, only logged if None
+            compute_type (str): The quantization of the faster_whisper engine, int8 by default
+            max_models (int): How many model sizes to keep loaded
+            streaming (bool): Accept the streamed tasks, False when the storage solution
+                can not land the audio chunks while they are recorded, they fail straight away
         """
-        self.model_name = model_name
-        if self.model_name == "whisper":
-            if not multi_language and "large" not in model_size:
-                model_size = f"{model_size}.en"
-            self.audio_model = whisper.load_model(model_size)
-        else:
+        if model_name not in self.SUPPORTED_MODELS:
             raise ValueError(f"Model {model_name} not supported")
+        self.api = api
+        self.model_name = model_name
+        self.model_size = model_size
+        self.streaming = streaming
+        self.multi_language = multi_language
+        self.backend_kwargs = (
+            {"compute_type": compute_type} if model_name == "faster_whisper" else {}
+        )
+        self.audio_models = LRUCache(max_size=max_models)
+        # the default model is loaded up front, the other sizes when a task asks for them
+        self.audio_model = self.get_audio_model()
+
+    def get_audio_model(self, model_size: Optional[str] = None) -> STTBackend:
+        """
+        Get the engine with the model size, loaded on first use
+
+        Args:
+            model_size (str): The model size, the default one if None
+
+        Returns:
+            STTBackend: The engine
+        """
+        model_size = model_size or self.model_size
+        audio_model = self.audio_models.get(model_size)
+        if audio_model is None:
+            audio_model = load_backend(
+                self.model_name,
+                model_size=model_size,
+                multi_language=self.multi_language,
+                **self.backend_kwargs,
+            )
+            self.audio_models.put(model_size, audio_model)
+        return audio_model
 
     @staticmethod
     def locate_audio_file(uid: str, sequence_index: str, end_time: str):
@@ -53,7 +97,8 @@ class Speech2Text:
         """
         audio_folder = CLIENT_DATA_FOLDER / "audio" / uid
         # audio file will be within this folder, and name like sequence_index-endtimetimestap.wav
-        end_time_obj = datetime.strptime(end_time, "%Y-%m-%dT%H:%M:%S.%f")
+        # the Listener writes it with isoformat, which drops the .%f when the microseconds are 0
+        end_time_obj = datetime.fromisoformat(end_time)
         audio_file = (
             audio_folder
             / f"{sequence_index}-{end_time_obj.strftime('%Y%m%d%H%M%S')}.wav"
@@ -76,13 +121,49 @@ class Speech2Text:
         """
 
         logger.info(f"Translating message {message}")
+        if message.streaming:
+            if not self.streaming:
+                raise ValueError(
+                    "Streamed audio is not supported with this storage solution"
+                )
+            return self.translate_stream(message, task)
+        speech = self.load_speech(message, task)
+        if speech is None:
+            return task
+        audio_file, audio_np = speech
+
+        audio_model = self.get_audio_model(message.stt_model_size)
+        with timer(logger, "Transcribing"):
+            with time_tracker(
+                "transcribe",
+                task.result_json.latency_profile,
+                track_type=TrackType.MODEL.value,
+            ):
+                result = audio_model.transcribe(audio_np)
+        self.save_result(message, task, audio_model, result, audio_file)
+        return task
+
+    def load_speech(
+        self, message: Speech2TextParameters, task: Task
+    ) -> Optional[Tuple[Path, np.ndarray]]:
+        """
+        Load the audio of the task, without the silence around the speech
+
+        Args:
+            message (Speech2TextParameters): The parameters of the task
+            task (Task): The task
+
+        Returns:
+            Optional[Tuple[Path, np.ndarray]]: The audio file and the speech,
+                None if there is no speech, then the empty transcript is already in the task
+        """
+        if message.end_time is None:
+            raise ValueError("end_time is required when the audio is not streamed")
         # read the data from the audio file in .wav file, then do the translation
         audio_file = self.locate_audio_file(
             message.uid, message.audio_index, message.end_time
         )
         logger.info(f"Audio file {audio_file}")
-        if audio_file is None:
-            return task
 
         with timer(logger, "Loading audio"):
             with time_tracker(
@@ -90,19 +171,182 @@ class Speech2Text:
                 task.result_json.latency_profile,
                 track_type=TrackType.MODEL.value,
             ):
-                audio_np = whisper.load_audio(audio_file.as_posix())
+                # decoded at 16 kHz, and kept for the emotion detection features
+                audio_np = audio_feature_store.load_waveform(audio_file)
 
-        with timer(logger, "Transcribing"):
+        if message.vad:
             with time_tracker(
-                "transcribe",
+                "vad",
                 task.result_json.latency_profile,
                 track_type=TrackType.MODEL.value,
             ):
-                result = self.audio_model.transcribe(
-                    audio_np, fp16=torch.cuda.is_available()
+                bounds = speech_bounds(audio_np)
+            if bounds is None:
+                # nothing to transcribe, the API does not chain the rest of the cluster on an empty text
+                logger.info(f"No speech in {audio_file}")
+                task.result_json.result_profile.update(
+                    {"text": "", "segments": [], "no_speech": True}
                 )
+                return None
+            audio_np = audio_np[bounds[0] : bounds[1]]
+            task.result_json.result_profile["speech_start"] = (
+                bounds[0] / audio_feature_store.sample_rate
+            )
+        return audio_file, audio_np
+
+    @staticmethod
+    def save_result(
+        message: Speech2TextParameters,
+        task: Task,
+        audio_model: STTBackend,
+        result: dict,
+        audio_file: Path,
+    ):
+        """
+        Put the transcript in the task, and featurise the audio if the cluster needs it next
+
+        Args:
+            message (Speech2TextParameters): The parameters of the task
+            task (Task): The task
+            audio_model (STTBackend): The engine which transcribed it
+            result (dict): The transcript
+            audio_file (Path): The audio file
+        """
         logger.critical(result)
         task.result_json.result_profile.update(result)
+        task.result_json.result_profile.update(
+            {"stt_backend": audio_model.name, "model_size": audio_model.model_size}
+        )
+
+        if message.precompute_audio_features:
+            # the cluster runs emotion detection on this audio later, featurise it while it is decoded
+            with time_tracker(
+                "audio_features",
+                task.result_json.latency_profile,
+                track_type=TrackType.MODEL.value,
+            ):
+                audio_feature_store.get_features(audio_file)
+
+    def translate_batch(self, tasks: List[Task]) -> List[Task]:
+        """
+        Transcribe several tasks in one batched decode for each model size,
+        the tasks failing or without speech do not hold the others back
+
+        Args:
+            tasks (List[Task]): The tasks, not streamed
+
+        Returns:
+            List[Task]: The processed tasks, in the same order
+        """
+        # model size => (message, task, audio file, speech)
+        batches: Dict[Optional[str], List[tuple]] = {}
+        for task in tasks:
+            try:
+                message = Speech2TextParameters(**task.parameters)
+                TimeLogger.log_task(task, "start_translate")
+                speech = self.load_speech(message, task)
+                if speech is None:
+                    self.complete(task)
+                    continue
+                batches.setdefault(message.stt_model_size, []).append(
+                    (message, task, *speech)
+                )
+            except Exception as e:
+                self.handle_error(task, e)
+
+        for model_size, batch in batches.items():
+            try:
+                audio_model = self.get_audio_model(model_size)
+                # every task of the batch waited for the whole decode
+                profile = {}
+                with timer(logger, f"Transcribing a batch of {len(batch)}"):
+                    with time_tracker(
+                        "transcribe", profile, track_type=TrackType.MODEL.value
+                    ):
+                        results = audio_model.transcribe_batch(
+                            [audio_np for _, _, _, audio_np in batch]
+                        )
+                for (message, task, audio_file, _), result in zip(batch, results):
+                    task.result_json.latency_profile.update(profile)
+                    result["batch_size"] = len(batch)
+                    self.save_result(message, task, audio_model, result, audio_file)
+                    self.complete(task)
+            except Exception as e:
+                for _, task, _, _ in batch:
+                    self.handle_error(task, e)
+        return tasks
+
+    def translate_stream(self, message: Speech2TextParameters, task: Task) -> Task:
+        """
+        Transcribe the streamed audio while its chunks arrive,
+        the partial transcripts are posted to the API with the task still started,
+        and only the tail is decoded after the end of the speech
+
+        Args:
+            message (Speech2TextParameters): The parameters of the task
+            task (Task): The task
+
+        Returns:
+            task (Task): The task
+        """
+        stream_dir = (
+            CLIENT_DATA_FOLDER / "audio" / message.uid / "stream" / message.audio_index
+        )
+        audio_model = self.get_audio_model(message.stt_model_size)
+        transcriber = StreamingTranscriber(
+            lambda audio_np, prompt: audio_model.transcribe(
+                audio_np,
+                initial_prompt=prompt or None,
+                # the prompt already carries the committed text
+                condition_on_previous_text=False,
+            )
+        )
+
+        def post_partial(text: str):
+            if self.api is None:
+                return
+            partial_task = task.copy(deep=True)
+            partial_task.result_status = ResultStatus.started.value
+            partial_task.result_json.result_profile.update(
+                {"text": text, "partial": True}
+            )
+            self.api.post_task_result(partial_task)
+
+        with timer(logger, "Transcribing the stream"):
+            end = stream_chunks(stream_dir, transcriber, on_partial=post_partial)
+        # the latency after the end of the speech, the rest overlapped the recording
+        with time_tracker(
+            "transcribe_tail",
+            task.result_json.latency_profile,
+            track_type=TrackType.MODEL.value,
+        ):
+            text = transcriber.finish()
+        logger.critical(text)
+        task.result_json.result_profile.update(
+            {
+                "text": text,
+                "end_time": end["end_time"],
+                "streaming": True,
+                "partials": transcriber.partials,
+                "stt_backend": audio_model.name,
+                "model_size": audio_model.model_size,
+            }
+        )
+
+        if message.precompute_audio_features:
+            try:
+                audio_file = self.locate_audio_file(
+                    message.uid, message.audio_index, end["end_time"]
+                )
+            except FileNotFoundError:
+                # the emotion detection decodes it itself then
+                return task
+            with time_tracker(
+                "audio_features",
+                task.result_json.latency_profile,
+                track_type=TrackType.MODEL.value,
+            ):
+                audio_feature_store.get_features(audio_file)
         return task
 
     def handle_task(self, task: Task) -> Task:
@@ -117,14 +361,23 @@ class Speech2Text:
             task_parameters = Speech2TextParameters(**task.parameters)
             TimeLogger.log_task(task, "start_translate")
             task = self.translate(task_parameters, task)
-            TimeLogger.log_task(task, "end_translate")
-            task.result_status = ResultStatus.completed.value
-        except FileNotFoundError:
+            self.complete(task)
+        except Exception as e:
+            self.handle_error(task, e)
+        return task
+
+    @staticmethod
+    def complete(task: Task):
+        TimeLogger.log_task(task, "end_translate")
+        task.result_status = ResultStatus.completed.value
+
+    @staticmethod
+    def handle_error(task: Task, error: Exception):
+        if isinstance(error, FileNotFoundError):
             # then we need to try later as the sync is not done yet
             logger.error("Audio file not found, will try later")
             task.result_status = ResultStatus.pending.value
-        except Exception as e:
-            logger.error(e)
+        else:
+            logger.error(error)
             task.result_status = ResultStatus.failed.value
-            task.description = str(e)
-        return task
+            task.description = str(error)
@@ -0,0 +1,202 @@
+import json
+import time
+import wave
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from utils.audio_features import AUDIO_SAMPLE_RATE, audio_feature_store
+from utils.get_logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class StreamingTranscriber:
+    """
+    Incremental whisper decoding of an utterance which arrives in chunks
+
+    The audio not committed yet is decoded again every partial_seconds of new audio.
+    A segment is committed when two decodes in a row agree on it, and it ends before the last holdback_seconds,
+    then its audio is dropped from the window and its text is the prompt of the next decodes.
+    So each decode only covers the last few seconds, and at the end of the speech only the tail is left to decode.
+    """
+
+    def __init__(
+        self,
+        transcribe: Callable[[np.ndarray, str], dict],
+        sample_rate: int = AUDIO_SAMPLE_RATE,
+        partial_seconds: float = 1.0,
+        holdback_seconds: float = 1.0,
+        max_window_seconds: float = 20.0,
+    ):
+        """
+        Args:
+            transcribe (Callable): Decode the audio with the prompt, returns the whisper result
+            sample_rate (int): The sample rate of the chunks
+            partial_seconds (float): How much new audio triggers a partial decode
+            holdback_seconds (float): The segments ending in the last seconds of the window are never committed,
+                the next chunk may still change them
+            max_window_seconds (float): Commit all the segments but the last one beyond this,
+                whisper decodes at most 30 seconds at once
+        """
+        self.transcribe = transcribe
+        self.sample_rate = sample_rate
+        self.partial_seconds = partial_seconds
+        self.holdback_seconds = holdback_seconds
+        self.max_window_seconds = max_window_seconds
+        # the audio not committed yet
+        self.window = np.zeros(0, dtype=np.float32)
+        self.committed: List[str] = []
+        self.previous_segments: List[str] = []
+        self.hypothesis = ""
+        self.decoded_samples = 0
+        self.partials = 0
+
+    @property
+    def committed_text(self) -> str:
+        return "".join(self.committed).strip()
+
+    @property
+    def text(self) -> str:
+        """
+        The committed text followed by the latest hypothesis of the rest
+        """
+        return f"{self.committed_text} {self.hypothesis}".strip()
+
+    def add_chunk(self, waveform: np.ndarray):
+        self.window = np.concatenate([self.window, waveform.astype(np.float32)])
+
+    def should_decode(self) -> bool:
+        return (
+            len(self.window) - self.decoded_samples
+            >= self.partial_seconds * self.sample_rate
+        )
+
+    def decode(self) -> dict:
+        result = self.transcribe(self.window, self.committed_text)
+        self.decoded_samples = len(self.window)
+        return result
+
+    def decode_partial(self) -> str:
+        """
+        Decode the window, and commit the segments the last two decodes agree on
+
+        Returns:
+            str: The partial transcript
+        """
+        segments = self.decode().get("segments", [])
+        self.partials += 1
+        window_seconds = len(self.window) / self.sample_rate
+        force = window_seconds > self.max_window_seconds
+        commit_until = 0.0
+        commit_count = 0
+        for index, segment in enumerate(segments):
+            agreed = (
+                index < len(self.previous_segments)
+                and self.previous_segments[index] == segment["text"]
+            )
+            stable = segment["end"] <= window_seconds - self.holdback_seconds
+            if not ((agreed and stable) or (force and index < len(segments) - 1)):
+                break
+            commit_until = segment["end"]
+            commit_count = index + 1
+        self.committed.extend(segment["text"] for segment in segments[:commit_count])
+        remaining = segments[commit_count:]
+        if commit_count:
+            cut = int(commit_until * self.sample_rate)
+            self.window = self.window[cut:]
+            self.decoded_samples = max(self.decoded_samples - cut, 0)
+        self.previous_segments = [segment["text"] for segment in remaining]
+        self.hypothesis = "".join(self.previous_segments).strip()
+        return self.text
+
+    def finish(self) -> str:
+        """
+        Decode the tail of the utterance
+
+        Returns:
+            str: The final transcript
+        """
+        if len(self.window):
+            result = self.decode()
+            self.committed.append(result.get("text", ""))
+        self.window = np.zeros(0, dtype=np.float32)
+        self.previous_segments = []
+        self.hypothesis = ""
+        return self.committed_text
+
+
+def read_chunk(chunk_file: Path) -> np.ndarray:
+    """
+    Read a streamed chunk, 16 bits PCM at 16 kHz, without going through ffmpeg
+
+    Args:
+        chunk_file (Path): The chunk wav file
+
+    Returns:
+        np.ndarray: The mono float32 waveform
+    """
+    with wave.open(chunk_file.as_posix(), "rb") as wav:
+        if (
+            wav.getframerate() != AUDIO_SAMPLE_RATE
+            or wav.getsampwidth() != 2
+            or wav.getnchannels() != 1
+        ):
+            return audio_feature_store.load_waveform(chunk_file)
+        frames = wav.readframes(wav.getnframes())
+    return np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def stream_chunks(
+    stream_dir: Path,
+    transcriber: StreamingTranscriber,
+    on_partial: Optional[Callable[[str], None]] = None,
+    idle_timeout: float = 30.0,
+    poll_seconds: float = 0.05,
+) -> dict:
+    """
+    Feed the chunks of the stream folder to the transcriber while they arrive,
+    until the end marker written by the Listener
+
+    Args:
+        stream_dir (Path): The audio/{uid}/stream/{audio_index} folder
+        transcriber (StreamingTranscriber): The transcriber
+        on_partial (Callable): Called with each partial transcript
+        idle_timeout (float): Give up when no chunk arrives for this long
+        poll_seconds (float): How often the folder is checked
+
+    Returns:
+        dict: The end marker, with the number of chunks and the end time
+    """
+    chunk_index = 0
+    end = None
+    last_chunk_at = time.monotonic()
+    while True:
+        chunk_file = stream_dir / f"{chunk_index:04d}.wav"
+        if chunk_file.exists():
+            try:
+                transcriber.add_chunk(read_chunk(chunk_file))
+            except (EOFError, wave.Error):
+                # the sync is still writing it
+                time.sleep(poll_seconds)
+                continue
+            chunk_index += 1
+            last_chunk_at = time.monotonic()
+            continue
+        if end is None and (stream_dir / "end.json").exists():
+            with open(stream_dir / "end.json") as f:
+                end = json.load(f)
+        if end is not None and chunk_index >= end["chunks"]:
+            return end
+        if transcriber.should_decode():
+            partial = transcriber.decode_partial()
+            logger.info(f"Partial transcript {stream_dir.name}: {partial}")
+            if on_partial is not None:
+                on_partial(partial)
+            continue
+        if time.monotonic() - last_chunk_at > idle_timeout:
+            raise TimeoutError(
+                f"No audio chunk in {stream_dir} for {idle_timeout} seconds"
+            )
+        time.sleep(poll_seconds)
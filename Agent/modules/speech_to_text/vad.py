@@ -0,0 +1,63 @@
+"""
+Energy based voice activity detection before the transcription
+
+The threshold adapts to the noise floor of each utterance, so it works whatever the gain of the microphone,
+whisper then only decodes the speech, and the utterances without speech are not decoded at all,
+where whisper tends to hallucinate a "Thank you." on the noise.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+from utils.audio_features import AUDIO_SAMPLE_RATE
+
+
+def frame_rms(audio_np: np.ndarray, frame_size: int) -> np.ndarray:
+    n_frames = -(-len(audio_np) // frame_size)
+    padded = np.zeros(n_frames * frame_size, dtype=np.float32)
+    padded[: len(audio_np)] = audio_np
+    return np.sqrt(np.mean(padded.reshape(n_frames, frame_size) ** 2, axis=1))
+
+
+def speech_bounds(
+    audio_np: np.ndarray,
+    sample_rate: int = AUDIO_SAMPLE_RATE,
+    frame_ms: int = 30,
+    min_speech_ms: int = 300,
+    padding_ms: int = 200,
+    min_rms: float = 0.01,
+    noise_ratio: float = 3.0,
+) -> Optional[Tuple[int, int]]:
+    """
+    Find the speech in the utterance
+
+    A frame is voiced when its RMS is noise_ratio times the noise floor, the 10th percentile of the frames,
+    but at most half the loudest frame, for the utterances which are speech from start to end.
+
+    Args:
+        audio_np (np.ndarray): The mono float32 waveform
+        sample_rate (int): The sample rate
+        frame_ms (int): The length of the frames the energy is measured on
+        min_speech_ms (int): There is no speech with less voiced audio than this
+        padding_ms (int): Kept before the first and after the last voiced frame
+        min_rms (float): The frames below this are never voiced, -40 dBFS by default
+        noise_ratio (float): How much louder than the noise floor the speech is
+
+    Returns:
+        Optional[Tuple[int, int]]: The start and end samples of the speech, None if there is no speech
+    """
+    if not len(audio_np):
+        return None
+    frame_size = sample_rate * frame_ms // 1000
+    rms = frame_rms(audio_np, frame_size)
+    threshold = max(
+        min_rms, min(noise_ratio * float(np.percentile(rms, 10)), 0.5 * rms.max())
+    )
+    voiced = np.flatnonzero(rms > threshold)
+    if len(voiced) * frame_ms < min_speech_ms:
+        return None
+    padding = sample_rate * padding_ms // 1000
+    start = max(int(voiced[0]) * frame_size - padding, 0)
+    end = min((int(voiced[-1]) + 1) * frame_size + padding, len(audio_np))
+    return start, end
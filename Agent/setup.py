@@ -6,4 +6,8 @@ setup(
     packages=find_packages(),
     description="OpenBenang AI Orchestrator",
     author="AI4WA",
+    extras_require={
+        # the faster_whisper speech2text engine, --stt_backend faster_whisper
+        "faster_whisper": ["faster-whisper"],
+    },
 )
@@ -9,11 +9,12 @@ It will include two process
 
 import argparse
 import multiprocessing
+import subprocess
 import time
 from pathlib import Path
+from typing import List
 
 import boto3
-import os
 import requests
 from watchdog.observers import Observer
 
@@ -133,9 +134,16 @@ class StorageSolution:
         directly run the rsync command
         """
         while True:
-            os.system(
-                "sshpass -p {} rsync -avz {} {}".format(self.dest_password, self.input_source_dir,
-                                                        str(CLIENT_DATA_FOLDER))
+            # list the transferred files, relative to the source folder, which ends with a /
+            result = subprocess.run(
+                "sshpass -p {} rsync -az --out-format=%n {} {}".format(self.dest_password, self.input_source_dir,
+                                                                       str(CLIENT_DATA_FOLDER)),
+                shell=True,
+                capture_output=True,
+                text=True,
+            )
+            self.report_media(
+                [path for path in result.stdout.splitlines() if path and not path.endswith("/")]
             )
             time.sleep(1)
 
@@ -156,21 +164,45 @@ class StorageSolution:
                 files = self.api.list_files(from_time=from_time)
                 # set from time to now for the next sync in timestamp format
                 from_time = time.time()
-                self.download_data(files)
+                self.report_media(self.download_data(files))
             except Exception as e:
                 logger.error(f"Error syncing data: {e}")
                 logger.exception(e)
             time.sleep(1)
 
-    def download_data(self, files):
+    def report_media(self, synced_files: List[str]):
+        """
+        Report the audio, video and frame files the sync step just brought in to the API,
+        tasks waiting for them will be dispatched straight away instead of after the fallback delay
+        Args:
+            synced_files (List[str]): The synced files, relative to the client data folder
+
+        Returns:
+
+        """
+        new_media = [
+            media_path
+            for media_path in synced_files
+            if media_path.startswith(("audio/", "videos/"))
+        ]
+        if not new_media:
+            return
+        try:
+            self.api.report_media(new_media)
+        except Exception as e:
+            # the tasks are dispatched after the fallback delay anyway
+            logger.error(f"Error reporting media: {e}")
+
+    def download_data(self, files) -> List[str]:
         """
         Download the data from the cloud
         Args:
             files:
 
         Returns:
-
+            List[str]: The downloaded files, relative to the client data folder
         """
+        downloaded = []
         audio_files = files.get("audio_files", [])
         video_files = files.get("video_files", [])
         logger.info(
@@ -187,7 +219,8 @@ class StorageSolution:
                 # TODO: do the download here
                 logger.info(f"Downloading {audio_file['audio_file']} to {dest_path}")
                 dest_path.parent.mkdir(parents=True, exist_ok=True)
-                self.download_audio(audio_file["id"], dest_path)
+                if self.download_audio(audio_file["id"], dest_path):
+                    downloaded.append(dest_path.relative_to(CLIENT_DATA_FOLDER).as_posix())
         for video_file in video_files:
             dest_path = (
                     CLIENT_DATA_FOLDER
@@ -199,9 +232,13 @@ class StorageSolution:
                 # TODO: do the download here
                 logger.info(f"Downloading {video_file['video_file']} to {dest_path}")
                 dest_path.parent.mkdir(parents=True, exist_ok=True)
-                self.download_video(video_file["id"], dest_path)
+                downloaded.extend(
+                    path.relative_to(CLIENT_DATA_FOLDER).as_posix()
+                    for path in self.download_video(video_file["id"], dest_path)
+                )
+        return downloaded
 
-    def download_audio(self, audio_file_id, dest_path: Path):
+    def download_audio(self, audio_file_id, dest_path: Path) -> bool:
         """
         Download the audio file
         Args:
@@ -209,12 +246,12 @@ class StorageSolution:
             dest_path (str): the destination
 
         Returns:
-
+            bool: Whether the file was downloaded
         """
         link_json = self.api.download_file_link(audio_file_id, "audio")
         audio_url = link_json.get("audio_url", None)
         if audio_url is None:
-            return
+            return False
 
         try:
             r = requests.get(audio_url, stream=True)
@@ -224,12 +261,14 @@ class StorageSolution:
                     for chunk in r.iter_content(chunk_size=1024):
                         if chunk:
                             f.write(chunk)
+                return True
             else:
                 logger.error(f"Error downloading audio file: {audio_url}, NOT FOUND")
         except Exception as e:
             logger.error(f"Error downloading audio file: {e}")
+        return False
 
-    def download_video(self, video_file_id, dest_path: Path):
+    def download_video(self, video_file_id, dest_path: Path) -> List[Path]:
         """
         Download the video file
         Args:
@@ -237,8 +276,9 @@ class StorageSolution:
             dest_path (str): the destination
 
         Returns:
-
+            List[Path]: The video and frame files downloaded
         """
+        downloaded = []
         link_json = self.api.download_file_link(video_file_id, "video")
         video_url = link_json.get("video_url", None)
         frames = link_json.get("frames", None)
@@ -251,6 +291,7 @@ class StorageSolution:
                         for chunk in r.iter_content(chunk_size=1024):
                             if chunk:
                                 f.write(chunk)
+                    downloaded.append(dest_path)
                 else:
                     logger.error(
                         f"Error downloading video file: {video_url}, NOT FOUND"
@@ -271,8 +312,10 @@ class StorageSolution:
                     for chunk in r.iter_content(chunk_size=1024):
                         if chunk:
                             f.write(chunk)
+                downloaded.append(frame_path)
             except Exception as e:
                 logger.error(f"Error downloading frame file: {e}")
+        return downloaded
 
 
 if __name__ == "__main__":
@@ -1,10 +1,12 @@
 import socket
+from typing import List, Optional, Tuple
 
 import getmac
 import requests
 
 from models.task import Task
 from utils.get_logger import get_logger
+from utils.tracing import TRACEPARENT_HEADER, tracer
 
 from .constants import API_DOMAIN
 
@@ -66,21 +68,53 @@ class API:
         logger.info(f"GET {url} {r.status_code}")
         return r.json()
 
-    def get_task(self):
+    def get_task(self, wait: float = 0):
         """
         Get the task from the API
+        Args:
+            wait (float): Let the API hold the request up to this many seconds until a task is available
+
         Returns:
 
         """
         logger.debug(self.task_name)
         url = f"{self.domain}/queue_task/task/{self.task_name}/"
-        r = requests.get(url, headers={"Authorization": f"Token {self.token}"})
+        r = requests.get(
+            url,
+            # the tasks of this worker are claimed again only if it stops renewing their lease
+            params={"uuid": self.uuid, "wait": wait, "heartbeat": 1},
+            headers={"Authorization": f"Token {self.token}"},
+            timeout=wait + 30,
+        )
         logger.info(f"GET {url} {r.status_code}")
         logger.info(r.text)
         if r.status_code != 200:
             return None
         return r.json()
 
+    def get_tasks(self, limit: int = 1, wait: float = 0) -> Tuple[List[dict], float]:
+        """
+        Lease a batch of tasks from the API within one round trip
+        Args:
+            limit (int): The maximum number of tasks to lease
+            wait (float): Let the API hold the request up to this many seconds until a task is available
+
+        Returns:
+            Tuple[List[dict], float]: The leased tasks, and the lease duration in seconds
+        """
+        url = f"{self.domain}/queue_task/tasks/{self.task_name}/"
+        r = requests.get(
+            url,
+            params={"uuid": self.uuid, "limit": limit, "wait": wait, "heartbeat": 1},
+            headers={"Authorization": f"Token {self.token}"},
+            timeout=wait + 30,
+        )
+        logger.info(f"GET {url} {r.status_code}")
+        if r.status_code != 200:
+            return [], 0
+        data = r.json()
+        return data.get("tasks", []), data.get("lease_seconds", 0)
+
     def post_task_result(
         self,
         task: Task,
@@ -96,10 +130,14 @@ class API:
         url = f"{self.domain}/queue_task/{task.id}/update_result/"
         r = requests.post(
             url,
+            # the API ignores the result if another worker claimed the task since
+            params={"uuid": self.uuid},
             data=task.json(),
             headers={
                 "Authorization": f"Token {self.token}",
                 "Content-Type": "application/json",
+                # the API span saving the result, and the chain step after it, are its children
+                TRACEPARENT_HEADER: tracer.current_traceparent() or "",
             },
         )
         logger.info(f"POST {url} {r.status_code}")
@@ -108,6 +146,50 @@ class API:
             return None
         return r.json()
 
+    def renew_lease(self, task_id: int) -> Optional[float]:
+        """
+        Renew the lease of a task while it runs, the heartbeat of the worker
+        Args:
+            task_id (int): The task ID
+
+        Returns:
+            Optional[float]: The lease duration in seconds, None if the worker does not hold the task anymore
+        """
+        url = f"{self.domain}/queue_task/{task_id}/renew_lease/"
+        r = requests.post(
+            url,
+            params={"uuid": self.uuid},
+            headers={"Authorization": f"Token {self.token}"},
+            timeout=30,
+        )
+        logger.debug(f"POST {url} {r.status_code}")
+        if r.status_code == 409:
+            return None
+        r.raise_for_status()
+        return r.json().get("lease_seconds", 0)
+
+    def report_media(self, files: List[str]):
+        """
+        Report the media files present in the client data folder,
+        so the tasks depending on them can be dispatched
+        Args:
+            files (List[str]): The paths relative to the client data folder
+
+        Returns:
+
+        """
+        url = f"{self.domain}/queue_task/media_ready/"
+        r = requests.post(
+            url,
+            json={"files": files},
+            headers={"Authorization": f"Token {self.token}"},
+            timeout=30,
+        )
+        logger.info(f"POST {url} {r.status_code}")
+        if r.status_code != 200:
+            return None
+        return r.json()
+
     def register_or_update_worker(self):
         """
         Register or update the  worker
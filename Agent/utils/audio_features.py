@@ -0,0 +1,150 @@
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Tuple, Union
+
+import librosa
+import numpy as np
+
+from utils.constants import DATA_DIR
+from utils.get_logger import get_logger
+from utils.lru_cache import LRUCache
+
+logger = get_logger(__name__)
+
+# the Listener records at 16 kHz, which is also what whisper expects
+AUDIO_SAMPLE_RATE = 16000
+AUDIO_FEATURES_CACHE_DIR = DATA_DIR / "cache" / "audio_features"
+
+
+class AudioFeatureStore:
+    """
+    Decode each utterance once, and featurise it once
+
+    The waveform is decoded at the native 16 kHz and kept in memory,
+    so speech2text and emotion detection running in the same process share it.
+    The features (zero crossing rate, MFCC and chroma) are computed in one pass over one STFT
+    and cached on disk keyed by the hash of the audio file, so they are shared between worker processes
+    and survive restarts.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path = AUDIO_FEATURES_CACHE_DIR,
+        sample_rate: int = AUDIO_SAMPLE_RATE,
+        hop_length: int = 512,
+        max_waveforms: int = 32,
+    ):
+        """
+        Args:
+            cache_dir (Path): The folder of the features cached on disk
+            sample_rate (int): The sample rate to decode the audio at
+            hop_length (int): The hop length of the feature frames
+            max_waveforms (int): How many decoded waveforms to keep in memory
+        """
+        self.cache_dir = cache_dir
+        self.sample_rate = sample_rate
+        self.hop_length = hop_length
+        self.waveforms = LRUCache(max_size=max_waveforms)
+        # (path, mtime, size) => hash, so the same file is only hashed once
+        self.hashes: Dict[Tuple[str, int, int], str] = {}
+        self.lock = threading.Lock()
+
+    def audio_hash(self, audio_path: Union[str, Path]) -> str:
+        """
+        The sha1 of the audio file content
+        Args:
+            audio_path (str): The audio file
+
+        Returns:
+            str: The hex digest
+        """
+        audio_path = Path(audio_path)
+        stat = audio_path.stat()
+        key = (audio_path.as_posix(), stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            if key in self.hashes:
+                return self.hashes[key]
+        sha1 = hashlib.sha1()
+        with open(audio_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha1.update(chunk)
+        digest = sha1.hexdigest()
+        with self.lock:
+            self.hashes[key] = digest
+        return digest
+
+    def load_waveform(self, audio_path: Union[str, Path]) -> np.ndarray:
+        """
+        Decode the audio as mono float32 at the store sample rate
+        Args:
+            audio_path (str): The audio file
+
+        Returns:
+            np.ndarray: The waveform
+        """
+        audio_hash = self.audio_hash(audio_path)
+        waveform = self.waveforms.get(audio_hash)
+        if waveform is None:
+            waveform, _ = librosa.load(
+                Path(audio_path).as_posix(), sr=self.sample_rate, mono=True
+            )
+            waveform = waveform.astype(np.float32)
+            self.waveforms.put(audio_hash, waveform)
+        return waveform
+
+    def compute_features(self, waveform: np.ndarray) -> np.ndarray:
+        """
+        Compute the zero crossing rate, MFCC and chroma of the waveform
+
+        The MFCC is computed from the same STFT as the chroma,
+        instead of each feature decoding and transforming the audio again.
+
+        Args:
+            waveform (np.ndarray): The waveform
+
+        Returns:
+            np.ndarray: The features, (frames, 1 + 20 + 12)
+        """
+        zcr = librosa.feature.zero_crossing_rate(waveform, hop_length=self.hop_length)
+        power_spectrogram = (
+            np.abs(librosa.stft(waveform, hop_length=self.hop_length)) ** 2
+        )
+        mel = librosa.feature.melspectrogram(
+            S=power_spectrogram, sr=self.sample_rate, htk=True
+        )
+        mfcc = librosa.feature.mfcc(S=librosa.power_to_db(mel), sr=self.sample_rate)
+        chroma = librosa.feature.chroma_cqt(
+            y=waveform, sr=self.sample_rate, hop_length=self.hop_length
+        )
+        frames = min(zcr.shape[1], mfcc.shape[1], chroma.shape[1])
+        return np.concatenate(
+            [zcr[:, :frames], mfcc[:, :frames], chroma[:, :frames]], axis=0
+        ).T
+
+    def get_features(self, audio_path: Union[str, Path]) -> np.ndarray:
+        """
+        Get the features of the audio, from the disk cache if they were computed before
+        Args:
+            audio_path (str): The audio file
+
+        Returns:
+            np.ndarray: The features, (frames, 33)
+        """
+        cache_file = self.cache_dir / f"{self.audio_hash(audio_path)}.npy"
+        if cache_file.exists():
+            try:
+                return np.load(cache_file)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignore broken audio features cache {cache_file}: {e}")
+        features = self.compute_features(self.load_waveform(audio_path))
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # write then rename, so other processes never read a partial file
+        tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp.npy")
+        np.save(tmp_file, features)
+        os.replace(tmp_file, cache_file)
+        return features
+
+
+audio_feature_store = AudioFeatureStore()
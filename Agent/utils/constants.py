@@ -12,6 +12,10 @@ EMOTION_DETECTION_MODEL_DIR.mkdir(exist_ok=True, parents=True)
 
 API_DOMAIN = "http://localhost:8000"  # default domain
 
+# the storage solutions which land the streamed audio chunks while they are written,
+# with s3 and api they only arrive after the utterance
+STREAMING_STORAGE_SOLUTIONS = ["local", "volume"]
+
 # model types
 HF_LLAMA = "HuggingFace"
 MT_LLAMA = "llama.cpp"
@@ -0,0 +1,65 @@
+import threading
+from typing import List
+
+from utils.api import API
+from utils.get_logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class LeaseHeartbeat:
+    """
+    Renew the lease of the running tasks from a background thread,
+    so a task running longer than the lease is not claimed and run again by another worker
+
+    Used as a context manager around the run of the tasks:
+
+        with LeaseHeartbeat(api, [task.id]) as heartbeat:
+            if heartbeat.lost: skip the task
+    """
+
+    def __init__(self, api: API, task_ids: List[int]):
+        """
+        Args:
+            api (API): The API to renew the lease with
+            task_ids (List[int]): The tasks this worker runs
+        """
+        self.api = api
+        self.task_ids = list(task_ids)
+        # the tasks claimed again by another worker, their result will be ignored by the API
+        self.lost = set()
+        self.interval = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(
+            target=self.run, name="lease-heartbeat", daemon=True
+        )
+
+    def __enter__(self):
+        # renew once before the run, the lease may have expired while the task waited locally
+        self.renew()
+        self.thread.start()
+        return self
+
+    def __exit__(self, context, value, traceback):
+        self.stop_event.set()
+
+    def renew(self):
+        for task_id in self.task_ids:
+            if task_id in self.lost:
+                continue
+            try:
+                lease_seconds = self.api.renew_lease(task_id)
+            except Exception as e:
+                # the next beat tries again, well before the lease expires
+                logger.warning(f"Can not renew the lease of task {task_id}: {e}")
+                continue
+            if lease_seconds is None:
+                logger.warning(f"Task {task_id} is claimed by another worker")
+                self.lost.add(task_id)
+            elif lease_seconds:
+                # three beats within each lease
+                self.interval = lease_seconds / 3
+
+    def run(self):
+        while not self.stop_event.wait(self.interval or 60):
+            self.renew()
@@ -0,0 +1,35 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class LRUCache:
+    """
+    A thread safe least recently used cache with a maximum number of items
+    """
+
+    def __init__(self, max_size: int = 512):
+        self.max_size = max_size
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self.lock:
+            if key not in self.items:
+                return default
+            self.items.move_to_end(key)
+            return self.items[key]
+
+    def put(self, key: Hashable, value: Any):
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self.lock:
+            return key in self.items
+
+    def __len__(self) -> int:
+        return len(self.items)
@@ -0,0 +1,116 @@
+"""
+The Prometheus metrics of the worker, served on the optional --metrics_port
+
+In the worker pool, the supervisor serves the pool metrics on the port,
+and each worker process serves its own metrics on the following ports, one per worker.
+"""
+
+from typing import TYPE_CHECKING
+
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import REGISTRY
+
+from utils.get_logger import get_logger
+
+if TYPE_CHECKING:
+    from utils.worker_pool import WorkerPool
+
+logger = get_logger(__name__)
+
+# from a few milliseconds for the transfers to minutes for the LLMs
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+TASKS_CLAIMED = Counter(
+    "agent_tasks_claimed", "The tasks claimed from the API", ["task_name"]
+)
+TASKS_COMPLETED = Counter("agent_tasks_completed", "The tasks completed", ["task_name"])
+TASKS_FAILED = Counter("agent_tasks_failed", "The tasks failed", ["task_name"])
+TASK_DURATION = Histogram(
+    "agent_task_duration_seconds",
+    "The time to handle a task, from claimed to reported",
+    ["task_name"],
+    buckets=LATENCY_BUCKETS,
+)
+# the blocks timed with time_tracker, track_type is model or transfer
+STEP_LATENCY = Histogram(
+    "agent_step_latency_seconds",
+    "The time of the model and transfer steps of the tasks",
+    ["track_type", "label"],
+    buckets=LATENCY_BUCKETS,
+)
+LAST_HEARTBEAT = Gauge(
+    "agent_worker_last_heartbeat_timestamp_seconds",
+    "When the worker loop last ran, it stops moving when the worker is stuck",
+    ["task_name"],
+)
+
+
+def start_metrics_server(port: int):
+    """
+    Serve the metrics of this process
+    Args:
+        port (int): The HTTP port
+    """
+    start_http_server(port)
+    logger.info(f"Metrics served on port {port}")
+
+
+class WorkerPoolCollector:
+    """
+    Collect the liveness and the counters of the workers from the pool supervisor
+    """
+
+    def __init__(self, pool: "WorkerPool"):
+        self.pool = pool
+
+    def collect(self):
+        alive = GaugeMetricFamily(
+            "agent_pool_worker_up",
+            "Whether the worker process is running",
+            labels=["worker", "task_name"],
+        )
+        restarts = GaugeMetricFamily(
+            "agent_pool_worker_restarts",
+            "The restarts of the worker since it was last healthy",
+            labels=["worker", "task_name"],
+        )
+        completed = CounterMetricFamily(
+            "agent_pool_tasks_completed",
+            "The tasks completed by the worker",
+            labels=["worker", "task_name"],
+        )
+        failed = CounterMetricFamily(
+            "agent_pool_tasks_failed",
+            "The tasks failed by the worker",
+            labels=["worker", "task_name"],
+        )
+        busy = CounterMetricFamily(
+            "agent_pool_busy_seconds",
+            "The seconds the worker spent handling tasks",
+            labels=["worker", "task_name"],
+        )
+        for slot in self.pool.slots:
+            labels = [slot.name, slot.task_name]
+            is_alive = slot.process is not None and slot.process.is_alive()
+            alive.add_metric(labels, int(is_alive))
+            restarts.add_metric(labels, slot.restarts)
+            completed.add_metric(labels, slot.stats.completed.value)
+            failed.add_metric(labels, slot.stats.failed.value)
+            busy.add_metric(labels, slot.stats.busy_seconds.value)
+        yield alive
+        yield restarts
+        yield completed
+        yield failed
+        yield busy
+
+
+def start_pool_metrics_server(pool: "WorkerPool", port: int):
+    """
+    Serve the metrics of the worker pool from the supervisor
+    Args:
+        pool (WorkerPool): The worker pool
+        port (int): The HTTP port
+    """
+    REGISTRY.register(WorkerPoolCollector(pool))
+    start_metrics_server(port)
@@ -0,0 +1,50 @@
+import threading
+from typing import Any, Callable, Dict, Tuple
+
+from utils.get_logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ModelRegistry:
+    """
+    Keep the loaded models for the life of the worker process
+
+    Handlers ask the registry for a model by key with a loader,
+    the loader only runs the first time, later tasks get the model already in memory.
+    """
+
+    def __init__(self):
+        self.models: Dict[str, Any] = {}
+        self.lock = threading.Lock()
+
+    def get(self, key: str, loader: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Get the model, load it if it is not loaded yet
+        Args:
+            key (str): The key of the model
+            loader (Callable): Load and return the model
+
+        Returns:
+            Tuple[Any, bool]: The model, and whether it was already loaded (warm)
+        """
+        with self.lock:
+            if key in self.models:
+                return self.models[key], True
+            logger.info(f"Loading model {key}")
+            model = loader()
+            self.models[key] = model
+            return model, False
+
+    def is_loaded(self, key: str) -> bool:
+        return key in self.models
+
+    def clear(self):
+        """
+        Release all the models, they will be loaded again on the next request
+        """
+        with self.lock:
+            self.models.clear()
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,90 @@
+import threading
+import time
+from queue import Empty, Queue
+from typing import Optional
+
+from utils.api import API
+from utils.get_logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class TaskPrefetcher:
+    """
+    Keep a bounded queue of leased tasks filled from a background thread
+
+    So when the model finishes one task, the next one is already local,
+    and the next batch is fetched while the model is busy.
+    """
+
+    def __init__(
+        self, api: API, size: int = 4, time_sleep: float = 1.5, long_poll: float = 0
+    ):
+        """
+        Args:
+            api (API): The API to lease the tasks from
+            size (int): The maximum number of tasks to hold locally
+            time_sleep (float): The time to sleep when there is no task in the API
+            long_poll (float): Let the API hold the request up to this many seconds, 0 to disable
+        """
+        self.api = api
+        self.size = size
+        self.time_sleep = time_sleep
+        self.long_poll = long_poll
+        # each item is (task, lease deadline in time.monotonic)
+        self.queue = Queue(maxsize=size)
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        """
+        Lease as many tasks as there are free slots in the queue
+        """
+        while not self.stop_event.is_set():
+            free_slots = self.size - self.queue.qsize()
+            if free_slots <= 0:
+                # the model is busy, check again shortly
+                self.stop_event.wait(0.1)
+                continue
+            try:
+                fetched_at = time.monotonic()
+                tasks, lease_seconds = self.api.get_tasks(
+                    limit=free_slots, wait=self.long_poll
+                )
+            except Exception as e:
+                logger.exception(e)
+                self.stop_event.wait(self.time_sleep)
+                continue
+            if not tasks:
+                # the API already held the request when long polling
+                if not self.long_poll:
+                    self.stop_event.wait(self.time_sleep)
+                continue
+            logger.info(f"Prefetched {len(tasks)} tasks")
+            for task in tasks:
+                self.queue.put((task, fetched_at + lease_seconds))
+
+    def get(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """
+        Get the next task whose lease is still valid
+        Args:
+            timeout (float): How long to wait for a task
+
+        Returns:
+            Optional[dict]: The task, None if there is no task within the timeout
+        """
+        while True:
+            try:
+                task, lease_deadline = self.queue.get(timeout=timeout)
+            except Empty:
+                return None
+            if time.monotonic() < lease_deadline:
+                return task
+            # the lease expired while waiting locally, another worker may have claimed it
+            logger.warning(f"Lease of task {task.get('id')} expired, skip it")
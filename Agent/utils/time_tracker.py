@@ -3,6 +3,8 @@ import time
 from contextlib import contextmanager
 
 from models.track_type import TrackType
+from utils.metrics import STEP_LATENCY
+from utils.tracing import tracer
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -22,8 +24,10 @@ def time_tracker(
     """
     # It will be either model or transfer
     start_time = time.time()
-    yield
+    with tracer.span(f"{track_type}.{label}"):
+        yield
     end_time = time.time()
     elapsed_time = end_time - start_time
     profile[f"{track_type}_{label}"] = elapsed_time
+    STEP_LATENCY.labels(track_type, label).observe(elapsed_time)
     logger.info(f"{label} took {elapsed_time} seconds")
@@ -0,0 +1,256 @@
+import json
+import multiprocessing
+import time
+from dataclasses import dataclass, field
+from multiprocessing import cpu_count
+from typing import Callable, Dict, List, Optional
+
+from utils.constants import DATA_DIR
+from utils.get_logger import get_logger
+from utils.metrics import start_pool_metrics_server
+
+logger = get_logger(__name__)
+
+# the exit code of a worker which can not start with its configuration, like a missing API key,
+# it is not restarted, as it would fail the same way
+CONFIG_ERROR_EXIT_CODE = 78
+
+
+def parse_worker_config(config: str) -> Dict[str, int]:
+    """
+    Parse the worker config, like "speech2text=4,quantization_llm=1"
+    A task name without a count gets one worker
+
+    Args:
+        config (str): The worker config
+
+    Returns:
+        Dict[str, int]: The number of workers per task name
+    """
+    workers = {}
+    for item in config.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        task_name, _, count = item.partition("=")
+        count = int(count) if count else 1
+        if count < 0:
+            raise ValueError(f"Invalid worker count for {task_name}: {count}")
+        workers[task_name.strip()] = count
+    return workers
+
+
+class WorkerStats:
+    """
+    Counters shared between the supervisor and one worker process
+    """
+
+    def __init__(self):
+        self.completed = multiprocessing.Value("i", 0)
+        self.failed = multiprocessing.Value("i", 0)
+        # seconds spent handling tasks, the rest is spent waiting for tasks
+        self.busy_seconds = multiprocessing.Value("d", 0.0)
+
+    def record(self, success: bool, duration: float):
+        """
+        Record one handled task
+        Args:
+            success (bool): Whether the task completed
+            duration (float): How long the task took in seconds
+        """
+        counter = self.completed if success else self.failed
+        with counter.get_lock():
+            counter.value += 1
+        with self.busy_seconds.get_lock():
+            self.busy_seconds.value += duration
+
+
+@dataclass
+class WorkerSlot:
+    """
+    One worker of the pool, the process is replaced when it crashes
+    """
+
+    task_name: str
+    index: int
+    stats: WorkerStats = field(default_factory=WorkerStats)
+    process: Optional[multiprocessing.Process] = None
+    started_at: float = 0
+    restarts: int = 0
+    restart_at: float = 0
+    # exited with CONFIG_ERROR_EXIT_CODE, not restarted
+    disabled: bool = False
+    # completed count at the last report, to work out the throughput
+    reported_completed: int = 0
+
+    @property
+    def name(self) -> str:
+        return f"{self.task_name}-{self.index}"
+
+
+class WorkerPool:
+    """
+    Supervise a fixed number of worker processes per task name
+
+    Each worker builds its own orchestrator and models inside its process,
+    so nothing heavy is pickled, and the models stay resident between tasks.
+    Crashed workers are restarted with an exponential backoff,
+    except the ones exiting with CONFIG_ERROR_EXIT_CODE,
+    and the throughput of each worker is logged and written to data/worker_pool.json.
+    """
+
+    def __init__(
+        self,
+        workers: Dict[str, int],
+        worker_target: Callable,
+        worker_kwargs: dict,
+        report_interval: float = 60,
+        max_backoff: float = 60,
+        healthy_after: float = 300,
+        metrics_port: Optional[int] = None,
+    ):
+        """
+        Args:
+            workers (Dict[str, int]): The number of workers per task name
+            worker_target (Callable): Run in each worker process as
+                worker_target(task_name=..., stats=..., **worker_kwargs), it should never return
+            worker_kwargs (dict): The extra keyword arguments for the worker target
+            report_interval (float): How often to report the throughput, in seconds
+            max_backoff (float): The maximum delay before restarting a crashed worker, in seconds
+            healthy_after (float): A worker running this long has its backoff reset, in seconds
+            metrics_port (int): Serve the pool metrics on this port, and the metrics of the n-th worker
+                on metrics_port + n. Default is None, not served
+        """
+        self.worker_target = worker_target
+        self.worker_kwargs = worker_kwargs
+        self.report_interval = report_interval
+        self.max_backoff = max_backoff
+        self.healthy_after = healthy_after
+        self.metrics_port = metrics_port
+        self.slots: List[WorkerSlot] = [
+            WorkerSlot(task_name=task_name, index=index)
+            for task_name, count in workers.items()
+            for index in range(count)
+        ]
+        if len(self.slots) > cpu_count():
+            logger.warning(
+                f"{len(self.slots)} workers configured on {cpu_count()} CPUs, "
+                f"they will compete for the CPU"
+            )
+
+    def start_worker(self, slot: WorkerSlot):
+        kwargs = {
+            "task_name": slot.task_name,
+            "stats": slot.stats,
+            **self.worker_kwargs,
+        }
+        if self.metrics_port is not None:
+            # a restarted worker gets the same port back
+            kwargs["metrics_port"] = self.metrics_port + 1 + self.slots.index(slot)
+        slot.process = multiprocessing.Process(
+            target=self.worker_target,
+            kwargs=kwargs,
+            name=slot.name,
+            daemon=False,
+        )
+        slot.process.start()
+        slot.started_at = time.monotonic()
+        logger.info(f"Worker {slot.name} started, pid {slot.process.pid}")
+
+    def supervise(self):
+        """
+        Restart the workers which exited
+        """
+        now = time.monotonic()
+        for slot in self.slots:
+            if slot.disabled:
+                continue
+            if slot.process is not None and slot.process.is_alive():
+                if now - slot.started_at > self.healthy_after:
+                    slot.restarts = 0
+                continue
+            if (
+                slot.process is not None
+                and slot.process.exitcode == CONFIG_ERROR_EXIT_CODE
+            ):
+                logger.error(
+                    f"Worker {slot.name} can not start with its configuration, not restarted"
+                )
+                slot.process = None
+                slot.disabled = True
+                continue
+            if slot.process is not None:
+                # it just exited, schedule the restart
+                logger.error(
+                    f"Worker {slot.name} exited with code {slot.process.exitcode}"
+                )
+                slot.process = None
+                backoff = min(2**slot.restarts, self.max_backoff)
+                slot.restarts += 1
+                slot.restart_at = now + backoff
+                logger.info(f"Restart worker {slot.name} in {backoff} seconds")
+            if now >= slot.restart_at:
+                self.start_worker(slot)
+
+    def report(self, elapsed: float):
+        """
+        Log the throughput of each worker since the last report,
+        and write the snapshot to data/worker_pool.json
+        Args:
+            elapsed (float): The seconds since the last report
+        """
+        snapshot = []
+        for slot in self.slots:
+            completed = slot.stats.completed.value
+            tasks_per_minute = (completed - slot.reported_completed) * 60 / elapsed
+            slot.reported_completed = completed
+            uptime = time.monotonic() - slot.started_at if slot.process else 0
+            snapshot.append(
+                {
+                    "worker": slot.name,
+                    "pid": slot.process.pid if slot.process else None,
+                    "alive": slot.process is not None and slot.process.is_alive(),
+                    "completed": completed,
+                    "failed": slot.stats.failed.value,
+                    "busy_seconds": round(slot.stats.busy_seconds.value, 3),
+                    "tasks_per_minute": round(tasks_per_minute, 3),
+                    "restarts": slot.restarts,
+                    "disabled": slot.disabled,
+                    "uptime_seconds": round(uptime, 3),
+                }
+            )
+            logger.info(
+                f"Worker {slot.name}: {tasks_per_minute:.2f} tasks/min, "
+                f"{completed} completed, {slot.stats.failed.value} failed"
+            )
+        with open(DATA_DIR / "worker_pool.json", "w") as f:
+            json.dump(snapshot, f, indent=2)
+
+    def stop(self):
+        for slot in self.slots:
+            if slot.process is not None and slot.process.is_alive():
+                slot.process.terminate()
+        for slot in self.slots:
+            if slot.process is not None:
+                slot.process.join()
+
+    def run(self):
+        logger.info(f"Worker pool starting {len(self.slots)} workers")
+        if self.metrics_port is not None:
+            start_pool_metrics_server(self, self.metrics_port)
+        last_report = time.monotonic()
+        try:
+            while True:
+                self.supervise()
+                if all(slot.disabled for slot in self.slots):
+                    logger.error("No worker can start, stopping the worker pool")
+                    break
+                now = time.monotonic()
+                if now - last_report >= self.report_interval:
+                    self.report(now - last_report)
+                    last_report = now
+                time.sleep(1)
+        except KeyboardInterrupt:
+            logger.info("Keyboard Interrupt, stopping the workers")
+        finally:
+            self.stop()
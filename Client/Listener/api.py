@@ -1,11 +1,12 @@
 import json
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from uuid import uuid4
 
 import requests
 
 from constants import API_DOMAIN
+from tracing import TRACEPARENT_HEADER, tracer
 from utils import get_logger, get_mac_address
 
 logger = get_logger("API")
@@ -47,6 +48,7 @@ class API:
         self.mac_address = get_mac_address()
         self.home_id = home_id
         self.track_cluster = track_cluster
+        tracer.configure(service_name="listener")
 
     def set_track_id(self):
         if self.track_cluster is None:
@@ -168,7 +170,12 @@ class API:
         return r.json()
 
     def queue_speech_to_text(
-        self, uid: str, audio_index: str, start_time: datetime, end_time: datetime
+        self,
+        uid: str,
+        audio_index: str,
+        start_time: datetime,
+        end_time: Optional[datetime],
+        streaming: bool = False,
     ) -> str:
         """
         Optional, used to queue the speech to text task
@@ -176,32 +183,58 @@ class API:
             uid (str): uuid of the audio
             audio_index (str): The audio index, which can be used to identify the audio
             start_time (datetime): The start time of the audio
-            end_time (datetime): The end time of the audio
+            end_time (datetime): The end time of the audio, None when it is streamed
+            streaming (bool): The audio is streamed in chunks while it is recorded,
+                the task is queued at the start of the utterance
 
         Returns:
             (str): The track id of the task
 
         """
         track_id = self.set_track_id()
+        parent = None
+        if end_time is not None:
+            # the utterance is the root of the trace of the track, from its first to its last sample
+            parent = tracer.record_span(
+                "listener.utterance",
+                start_time=start_time.timestamp(),
+                end_time=end_time.timestamp(),
+                track_id=track_id,
+                attributes={"uid": uid, "audio_index": audio_index},
+            ).traceparent
         url = f"{self.domain}/queue_task/ai_task/"
+        parameters = {
+            "uid": uid,
+            "home_id": self.home_id,
+            "audio_index": audio_index,
+            "start_time": start_time.isoformat(),
+            "hardware_device_mac_address": self.mac_address,
+        }
+        if end_time is not None:
+            parameters["end_time"] = end_time.isoformat()
+        if streaming:
+            parameters["streaming"] = True
         data = {
             "name": "speech_to_text",
             "task_name": "speech2text",
-            "parameters": json.dumps(
-                {
-                    "uid": uid,
-                    "home_id": self.home_id,
-                    "audio_index": audio_index,
-                    "start_time": start_time.isoformat(),
-                    "end_time": end_time.isoformat(),
-                    "hardware_device_mac_address": self.mac_address,
-                }
-            ),
+            "parameters": json.dumps(parameters),
             "track_id": track_id,
         }
-        r = requests.post(
-            url, data=data, headers={"Authorization": f"Token {self.token}"}, timeout=30
-        )
+        with tracer.span(
+            "listener.queue_speech_to_text",
+            track_id=track_id,
+            parent=parent,
+        ) as span:
+            r = requests.post(
+                url,
+                data=data,
+                headers={
+                    "Authorization": f"Token {self.token}",
+                    TRACEPARENT_HEADER: span.traceparent,
+                },
+                timeout=30,
+            )
+            span.set_attribute("status_code", r.status_code)
         logger.info(f"POST {url} {r.status_code}")
         if r.status_code != 200:
             logger.info(data)
@@ -226,6 +259,21 @@ class API:
         logger.info(data)
         return data.get("storage_solution", "local")
 
+    def get_clusters(self) -> Optional[List[str]]:
+        """
+        Get the names of the clusters from the API, including the ones defined in the database
+        Returns:
+            List[str]: The cluster names, None if the request failed
+        """
+        url = f"{self.domain}/queue_task/clusters/"
+        r = requests.get(
+            url, headers={"Authorization": f"Token {self.token}"}, timeout=30
+        )
+        logger.info(f"GET {url} {r.status_code}")
+        if r.status_code != 200:
+            return None
+        return [cluster["name"] for cluster in r.json()]
+
     def upload_file(
         self,
         source_file: str,
@@ -1,19 +1,42 @@
 import argparse
+import json
+import os
 import uuid
-from datetime import datetime
-from queue import Queue
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from queue import Empty, Queue
 from sys import platform
 from time import sleep
-from typing import Optional
+from typing import List, Optional
 
 import speech_recognition as sr
 
 from api import API
-from constants import DATA_DIR
+from constants import DATA_DIR, STREAMING_STORAGE_SOLUTIONS
 from utils import get_logger, timer
+from vad import speech_bounds
 
 logger = get_logger(__name__)
 
+# the chunks are converted to the rate whisper decodes, so the Agent reads them without resampling
+STREAM_SAMPLE_RATE = 16000
+STREAM_SAMPLE_WIDTH = 2
+
+
+@dataclass
+class StreamingUtterance:
+    """
+    The utterance being streamed, as chunk files under audio/{uid}/stream/{audio_index}/
+    """
+
+    audio_index: int
+    start_time: datetime
+    stream_dir: Path
+    track_id: Optional[str] = None
+    last_chunk_time: Optional[datetime] = None
+    frames: List[bytes] = field(default_factory=list)
+
 
 class AudioAcquire:
     def __init__(
@@ -26,6 +49,10 @@ class AudioAcquire:
         record_timeout: int = 30000,
         sampling_time: float = 0.25,
         track_cluster: Optional[str] = None,
+        streaming: bool = False,
+        chunk_seconds: float = 1.0,
+        vad: bool = True,
+        vad_min_speech_ms: int = 300,
     ):
         """
         The audio acquire class
@@ -39,6 +66,11 @@ class AudioAcquire:
             record_timeout (int): the record timeout
             sampling_time (float): the sampling time in seconds, default is 0.25
             track_cluster (str): the track cluster
+            streaming (bool): ship the audio in chunks while the phrase is recorded,
+                so the speech to text starts before the speaker stops
+            chunk_seconds (float): the length of the streamed chunks in seconds
+            vad (bool): trim the silence around the speech, and drop the phrases without speech
+            vad_min_speech_ms (int): the phrases with less speech than this are dropped
         """
         self.uid = str(uuid.uuid4())
         self.data_dir = DATA_DIR / "audio" / self.uid  # the data dir
@@ -50,6 +82,13 @@ class AudioAcquire:
         )
         # register the device
         self.api.register_device()
+        if streaming:
+            storage_solution = self.api.get_storage_solution()
+            if storage_solution not in STREAMING_STORAGE_SOLUTIONS:
+                raise ValueError(
+                    f"The streaming mode needs the {' or '.join(STREAMING_STORAGE_SOLUTIONS)} "
+                    f"storage solution, the API uses {storage_solution}"
+                )
 
         # the energy threshold for the microphone
         self.energy_threshold = energy_threshold
@@ -59,6 +98,12 @@ class AudioAcquire:
         self.record_timeout = record_timeout
         # sampling time
         self.sampling_time = sampling_time
+        # streaming mode
+        self.streaming = streaming
+        self.chunk_seconds = chunk_seconds
+        # voice activity detection
+        self.vad = vad
+        self.vad_min_speech_ms = vad_min_speech_ms
 
         # the audio index when record starts
         self.audio_index = 0
@@ -98,6 +143,8 @@ class AudioAcquire:
         return source
 
     def run(self):
+        if self.streaming:
+            return self.run_streaming()
         data_queue = Queue()
         sample_time_queue = Queue()
         audio_index_queue = Queue()
@@ -120,6 +167,20 @@ class AudioAcquire:
             Returns:
 
             """
+            if self.vad:
+                raw_data = audio.get_raw_data(convert_width=2)
+                bounds = speech_bounds(
+                    raw_data,
+                    audio.sample_rate,
+                    self.energy_threshold,
+                    min_speech_ms=self.vad_min_speech_ms,
+                )
+                if bounds is None:
+                    logger.info("No speech in the phrase, dropped")
+                    return
+                audio = sr.AudioData(
+                    raw_data[bounds[0] : bounds[1]], audio.sample_rate, 2
+                )
             with timer(logger, f"Recording {self.audio_index}"):
                 data = audio.get_raw_data()
                 wav_data = audio.get_wav_data()
@@ -179,6 +240,177 @@ class AudioAcquire:
             except KeyboardInterrupt:
                 break
 
+    def run_streaming(self):
+        """
+        Record the phrases in chunks of chunk_seconds, and write each chunk as soon as it is recorded
+
+        The speech to text task is queued on the first chunk of the utterance,
+        the Agent decodes the chunks while they arrive.
+        The utterance ends when a chunk is cut short by the silence, or no chunk comes in for a while,
+        then the whole utterance is written as one wav, like in the default mode, for the rest of the cluster,
+        and the end.json marker tells the Agent no more chunks are coming.
+        """
+        chunk_queue = Queue()
+        recorder = sr.Recognizer()
+        recorder.energy_threshold = self.energy_threshold
+        recorder.dynamic_energy_threshold = False
+
+        logger.critical(f"Using microphone {self.source}")
+
+        with self.source:
+            recorder.adjust_for_ambient_noise(self.source)
+
+        def record_callback(_, audio: sr.AudioData) -> None:
+            # the background thread only hands over the chunk, the files are written in the main loop
+            chunk_queue.put((audio, datetime.now()))
+
+        recorder.listen_in_background(
+            self.source, record_callback, phrase_time_limit=self.chunk_seconds
+        )
+        # the recorder stops a phrase after pause_threshold seconds of silence
+        end_of_speech_seconds = self.chunk_seconds + recorder.pause_threshold
+        utterance = None
+        logger.info("Listening for audio, streaming...")
+
+        while True:
+            try:
+                try:
+                    audio, sample_time = chunk_queue.get(timeout=self.sampling_time)
+                except Empty:
+                    if (
+                        utterance is not None
+                        and (datetime.now() - utterance.last_chunk_time).total_seconds()
+                        > end_of_speech_seconds
+                    ):
+                        self.finish_utterance(utterance)
+                        utterance = None
+                    continue
+
+                frames = audio.get_raw_data(
+                    convert_rate=STREAM_SAMPLE_RATE, convert_width=STREAM_SAMPLE_WIDTH
+                )
+                duration = len(frames) / (STREAM_SAMPLE_RATE * STREAM_SAMPLE_WIDTH)
+                if utterance is None and self.vad:
+                    # only start an utterance, and queue its task, on a chunk with speech
+                    bounds = speech_bounds(
+                        frames,
+                        STREAM_SAMPLE_RATE,
+                        self.energy_threshold,
+                        min_speech_ms=self.vad_min_speech_ms,
+                    )
+                    if bounds is None:
+                        logger.info("No speech in the chunk, dropped")
+                        continue
+                    # without the silence before the speech
+                    frames = frames[bounds[0] :]
+                if utterance is None:
+                    utterance = self.start_utterance(
+                        sample_time
+                        - timedelta(
+                            seconds=len(frames)
+                            / (STREAM_SAMPLE_RATE * STREAM_SAMPLE_WIDTH)
+                        )
+                    )
+                self.write_chunk(utterance, frames, sample_time)
+                if duration < self.chunk_seconds * 0.9:
+                    logger.info("no more sound, end of the utterance")
+                    self.finish_utterance(utterance)
+                    utterance = None
+            except KeyboardInterrupt:
+                if utterance is not None:
+                    self.finish_utterance(utterance)
+                break
+
+    def start_utterance(self, start_time: datetime) -> StreamingUtterance:
+        """
+        Queue the speech to text task of a new utterance
+
+        Args:
+            start_time (datetime): the time of the first sample
+
+        Returns:
+            StreamingUtterance: the utterance
+        """
+        utterance = StreamingUtterance(
+            audio_index=self.audio_index,
+            start_time=start_time,
+            stream_dir=self.data_dir / "stream" / str(self.audio_index),
+        )
+        self.audio_index += 1
+        utterance.stream_dir.mkdir(parents=True, exist_ok=True)
+        utterance.track_id = self.api.queue_speech_to_text(
+            self.uid,
+            audio_index=str(utterance.audio_index),
+            start_time=start_time,
+            end_time=None,
+            streaming=True,
+        )
+        return utterance
+
+    def write_chunk(
+        self, utterance: StreamingUtterance, frames: bytes, sample_time: datetime
+    ):
+        """
+        Write the chunk as {chunk_index:04d}.wav in the stream folder of the utterance
+
+        Args:
+            utterance (StreamingUtterance): the utterance
+            frames (bytes): the 16 kHz 16 bits PCM frames
+            sample_time (datetime): when the chunk was recorded
+        """
+        chunk_index = len(utterance.frames)
+        with timer(logger, f"Recording {utterance.audio_index}.{chunk_index}"):
+            wav_data = sr.AudioData(
+                frames, STREAM_SAMPLE_RATE, STREAM_SAMPLE_WIDTH
+            ).get_wav_data()
+            self.write_file(utterance.stream_dir / f"{chunk_index:04d}.wav", wav_data)
+        utterance.frames.append(frames)
+        utterance.last_chunk_time = sample_time
+
+    def finish_utterance(self, utterance: StreamingUtterance):
+        """
+        Write the whole utterance, post it, and mark the end of the stream
+
+        Args:
+            utterance (StreamingUtterance): the utterance
+        """
+        end_time = utterance.last_chunk_time
+        audio_file = f"{utterance.audio_index}-{end_time.strftime('%Y%m%d%H%M%S')}.wav"
+        wav_data = sr.AudioData(
+            b"".join(utterance.frames), STREAM_SAMPLE_RATE, STREAM_SAMPLE_WIDTH
+        ).get_wav_data()
+        self.write_file(self.data_dir / audio_file, wav_data)
+        # the audio is posted before the end marker, it is there when the transcript completes
+        self.api.post_audio(
+            self.uid,
+            utterance.audio_index,
+            audio_file,
+            utterance.start_time,
+            end_time,
+            track_id=utterance.track_id,
+        )
+        self.write_file(
+            utterance.stream_dir / "end.json",
+            json.dumps(
+                {"chunks": len(utterance.frames), "end_time": end_time.isoformat()}
+            ).encode(),
+        )
+
+    @staticmethod
+    def write_file(path: Path, data: bytes):
+        """
+        Write the file under a temporary name then rename it,
+        so the storage sync never ships a half written file
+
+        Args:
+            path (Path): the file
+            data (bytes): the content
+        """
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, "wb") as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+
 
 def main():
     """
@@ -218,6 +450,30 @@ def main():
         help="The track cluster to be used",
         type=str,
     )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Ship the audio in chunks while it is recorded, "
+        "the speech to text starts before the speaker stops",
+    )
+    parser.add_argument(
+        "--disable_vad",
+        action="store_true",
+        help="Ship the phrases as recorded, "
+        "without trimming the silence or dropping the phrases without speech",
+    )
+    parser.add_argument(
+        "--vad_min_speech_ms",
+        default=300,
+        help="The phrases with less speech than this, in milliseconds, are dropped",
+        type=int,
+    )
+    parser.add_argument(
+        "--chunk_seconds",
+        default=1.0,
+        help="The length of the streamed audio chunks in seconds",
+        type=float,
+    )
 
     args = parser.parse_args()
 
@@ -229,6 +485,10 @@ def main():
         default_microphone=args.default_microphone,
         record_timeout=args.record_timeout,
         track_cluster=args.track_cluster,
+        streaming=args.streaming,
+        chunk_seconds=args.chunk_seconds,
+        vad=not args.disable_vad,
+        vad_min_speech_ms=args.vad_min_speech_ms,
     )
     audio_acquire.run()
 
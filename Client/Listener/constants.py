@@ -16,6 +16,9 @@ STORAGE_SOLUTION_VOLUME = "volume"
 STORAGE_SOLUTION_S3 = "s3"
 STORAGE_SOLUTION_LOCAL = "local"
 STORAGE_SOLUTION_API = "api"
+# the Agent reads the streamed audio chunks as they are written only with these,
+# the s3 and api ones upload and download the files later
+STREAMING_STORAGE_SOLUTIONS = [STORAGE_SOLUTION_LOCAL, STORAGE_SOLUTION_VOLUME]
 
 
 S3_BUCKET = "openomni"
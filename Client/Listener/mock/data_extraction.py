@@ -15,17 +15,6 @@ from utils import get_logger
 logger = get_logger(__name__)
 
 
-CLUSTERS = [
-    "CLUSTER_Q_ETE_CONVERSATION",
-    "CLUSTER_HF_ETE_CONVERSATION",
-    "CLUSTER_GPT_4O_ETE_CONVERSATION",
-    "CLUSTER_GPT_4O_TEXT_ETE_CONVERSATION",
-    "CLUSTER_Q_NO_EMOTION_ETE_CONVERSATION",
-    "CLUSTER_GPT_35_ETE_CONVERSATION",
-    "CLUSTER_GPT_35_RAG_ETE_CONVERSATION",
-]
-
-
 class DataMock:
     """
     We will first extract the audio and video from the video file.
@@ -259,7 +248,10 @@ if __name__ == "__main__":
     if args.track_cluster is not None:
         track_clusters = [args.track_cluster]
     else:
-        track_clusters = CLUSTERS
+        # all the clusters the API knows, including the ones defined in the database
+        track_clusters = API(domain=args.api_domain, token=args.token).get_clusters()
+        if track_clusters is None:
+            raise ValueError("Can not get the clusters from the API")
     for track_cluster in track_clusters:
         mock = DataMock(
             api_domain=args.api_domain,
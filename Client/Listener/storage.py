@@ -87,24 +87,29 @@ class S3SyncHandler(FileSystemEventHandler):
 
         elif event.event_type in ("created", "modified", "moved", "deleted"):
             # print(f"Event type: {event.event_type} - Path: {event.src_path}")
-            # only process .avi and .wav files
+            # the streamed audio chunks are written under a temporary name, then moved in place
+            src_path = (
+                event.dest_path if event.event_type == "moved" else event.src_path
+            )
+            # only process .avi and .wav files, and the end markers of the audio streams
 
-            if event.src_path.split("/")[-1].split(".")[-1] not in [
+            if src_path.split("/")[-1].split(".")[-1] not in [
                 "mp4",
                 "wav",
                 "mp3",
                 "jpg",
                 "jpeg",
                 "png",
+                "json",
             ]:
                 return None
             try:
                 self.s3_client.upload_file(
-                    event.src_path,
+                    src_path,
                     S3_BUCKET,
-                    f"Listener/{event.src_path.split(DATA_DIR.as_posix())[1].strip('/')}",
+                    f"Listener/{src_path.split(DATA_DIR.as_posix())[1].strip('/')}",
                 )
-                logger.info(f"Uploaded file to s3: {event.src_path}")
+                logger.info(f"Uploaded file to s3: {src_path}")
                 # logger.info(f"Listener/{event.src_path.split(DATA_DIR.as_posix())[1].strip('/')}")
             except Exception as e:
                 logger.error(f"Error uploading file to s3: {e}")
@@ -126,23 +131,28 @@ class APISyncHandler(FileSystemEventHandler):
 
         elif event.event_type in ("created", "modified", "moved", "deleted"):
             # print(f"Event type: {event.event_type} - Path: {event.src_path}")
-            # only process .avi and .wav files
+            # the streamed audio chunks are written under a temporary name, then moved in place
+            src_path = (
+                event.dest_path if event.event_type == "moved" else event.src_path
+            )
+            # only process .avi and .wav files, and the end markers of the audio streams
 
-            if event.src_path.split("/")[-1].split(".")[-1] not in [
+            if src_path.split("/")[-1].split(".")[-1] not in [
                 "mp4",
                 "wav",
                 "mp3",
                 "jpg",
                 "jpeg",
                 "png",
+                "json",
             ]:
                 return None
             try:
                 self.api.upload_file(
-                    event.src_path,
-                    f"Listener/{event.src_path.split(DATA_DIR.as_posix())[1].strip('/')}",
+                    src_path,
+                    f"Listener/{src_path.split(DATA_DIR.as_posix())[1].strip('/')}",
                 )
-                logger.info(f"Uploaded file to server: {event.src_path}")
+                logger.info(f"Uploaded file to server: {src_path}")
             except Exception as e:
                 logger.error(f"Error uploading file to s3: {e}")
 
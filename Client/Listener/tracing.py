@@ -0,0 +1,371 @@
+"""
+Lightweight tracing spans of a conversation track, in the OpenTelemetry data model
+
+The trace ID is the uid of the track ID, T-{cluster_name}-{uid},
+so the spans of the Client, the API and the Agent for one track land in the same trace.
+The parent span is passed along as a W3C traceparent, in the HTTP headers and on the tasks.
+
+The finished spans are exported in a background thread, as JSON lines to a local file,
+and/or as OTLP/HTTP JSON to a collector, TRACE_EXPORT_PATH and TRACE_OTLP_ENDPOINT in the environment.
+Each service names itself with tracer.configure when it starts.
+
+The API, the Agent and the Listener are built apart, so each one ships a copy of this module,
+Agent/utils/tracing.py and Client/Listener/tracing.py.
+This one is the source: edit it only here, then run python scripts/vendor_tracing.py,
+the CI fails with --check when a copy differs.
+So it only imports the standard library and requests.
+"""
+
+import atexit
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT_HEADER = "traceparent"
+HEX_32 = re.compile(r"^[0-9a-f]{32}$")
+
+
+def trace_id_from_track_id(track_id: Optional[str]) -> str:
+    """
+    The trace ID of the track, a random one if the track ID has no uid
+
+    Args:
+        track_id (str): The track ID, T-{cluster_name}-{uid}
+
+    Returns:
+        str: The 32 hex characters trace ID
+    """
+    uid = track_id.rsplit("-", 1)[-1].lower() if track_id else ""
+    if HEX_32.match(uid):
+        return uid
+    return os.urandom(16).hex()
+
+
+def parse_traceparent(traceparent: Optional[str]) -> Optional[Tuple[str, str]]:
+    """
+    Parse the W3C traceparent, 00-{trace_id}-{span_id}-{flags}
+
+    Args:
+        traceparent (str): The traceparent
+
+    Returns:
+        Optional[Tuple[str, str]]: The trace ID and the parent span ID, None if it is not valid
+    """
+    parts = traceparent.strip().split("-") if traceparent else []
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str]
+    start_time_ns: int
+    end_time_ns: Optional[int] = None
+    attributes: Dict = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def to_dict(self, service_name: str) -> dict:
+        return {
+            "service": service_name,
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "start_time_unix_nano": self.start_time_ns,
+            "end_time_unix_nano": self.end_time_ns,
+            "duration_ms": round((self.end_time_ns - self.start_time_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+    def to_otlp(self) -> dict:
+        attributes = []
+        for key, value in self.attributes.items():
+            if isinstance(value, bool):
+                attributes.append({"key": key, "value": {"boolValue": value}})
+            elif isinstance(value, int):
+                attributes.append({"key": key, "value": {"intValue": str(value)}})
+            elif isinstance(value, float):
+                attributes.append({"key": key, "value": {"doubleValue": value}})
+            else:
+                attributes.append({"key": key, "value": {"stringValue": str(value)}})
+        otlp = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            # internal
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_time_ns),
+            "endTimeUnixNano": str(self.end_time_ns),
+            "attributes": attributes,
+            # 1 is ok, 2 is error
+            "status": (
+                {"code": 2, "message": self.error} if self.error else {"code": 1}
+            ),
+        }
+        if self.parent_span_id:
+            otlp["parentSpanId"] = self.parent_span_id
+        return otlp
+
+
+class SpanExporter:
+    """
+    Queue the finished spans, and write them in batches from a background thread
+    """
+
+    def __init__(
+        self,
+        service_name: str,
+        export_path: Optional[str] = None,
+        otlp_endpoint: Optional[str] = None,
+        flush_seconds: float = 2,
+        max_queue: int = 10000,
+    ):
+        """
+        Args:
+            service_name (str): The service.name of the spans
+            export_path (str): The JSON lines file, not written if None
+            otlp_endpoint (str): The OTLP/HTTP collector, like http://localhost:4318, not sent if None
+            flush_seconds (float): How often the spans are written
+            max_queue (int): The spans beyond this are dropped, when the export can not keep up
+        """
+        self.service_name = service_name
+        self.export_path = export_path
+        self.otlp_endpoint = otlp_endpoint.rstrip("/") if otlp_endpoint else None
+        self.flush_seconds = flush_seconds
+        self.max_queue = max_queue
+        self.spans: List[Span] = []
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.export_path or self.otlp_endpoint)
+
+    def export(self, span: Span):
+        if not self.enabled:
+            return
+        with self.lock:
+            if len(self.spans) >= self.max_queue:
+                return
+            self.spans.append(span)
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self.run, name="span-exporter", daemon=True
+                )
+                self.thread.start()
+                atexit.register(self.flush)
+
+    def run(self):
+        while True:
+            self.wakeup.wait(self.flush_seconds)
+            self.wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            spans, self.spans = self.spans, []
+        if not spans:
+            return
+        try:
+            if self.export_path:
+                with open(self.export_path, "a") as f:
+                    for span in spans:
+                        f.write(
+                            json.dumps(span.to_dict(self.service_name), default=str)
+                            + "\n"
+                        )
+            if self.otlp_endpoint:
+                requests.post(
+                    f"{self.otlp_endpoint}/v1/traces",
+                    json=self.to_otlp(spans),
+                    timeout=5,
+                )
+        except Exception as e:  # noqa
+            # tracing never breaks the caller
+            logger.warning(f"Can not export {len(spans)} spans: {e}")
+
+    def to_otlp(self, spans: List[Span]) -> dict:
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": {"stringValue": self.service_name},
+                            }
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "openomni"},
+                            "spans": [span.to_otlp() for span in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+
+
+class Tracer:
+    """
+    Create the spans, the current span of each thread is the parent of the spans it opens
+    """
+
+    def __init__(self, exporter: SpanExporter):
+        self.exporter = exporter
+        self.local = threading.local()
+
+    def configure(
+        self,
+        service_name: str,
+        export_path: Optional[str] = None,
+        otlp_endpoint: Optional[str] = None,
+    ):
+        """
+        Name the service of the spans, and override the export from the environment
+
+        Args:
+            service_name (str): The service.name of the spans, like api or agent
+            export_path (str): The JSON lines file, the environment one if None
+            otlp_endpoint (str): The OTLP/HTTP collector, the environment one if None
+        """
+        self.exporter.service_name = service_name
+        if export_path:
+            self.exporter.export_path = export_path
+        if otlp_endpoint:
+            self.exporter.otlp_endpoint = otlp_endpoint.rstrip("/")
+
+    def current_span(self) -> Optional[Span]:
+        stack = getattr(self.local, "stack", None)
+        return stack[-1] if stack else None
+
+    def current_traceparent(self) -> Optional[str]:
+        span = self.current_span()
+        return span.traceparent if span else None
+
+    def new_span(
+        self,
+        name: str,
+        track_id: Optional[str] = None,
+        parent: Optional[str] = None,
+        attributes: Optional[dict] = None,
+        start_time_ns: Optional[int] = None,
+    ) -> Span:
+        """
+        Create a span, the child of the parent traceparent, otherwise of the current span,
+        otherwise a root span in the trace of the track
+        """
+        parsed = parse_traceparent(parent)
+        current = self.current_span()
+        if parsed is not None:
+            trace_id, parent_span_id = parsed
+        elif current is not None:
+            trace_id, parent_span_id = current.trace_id, current.span_id
+        else:
+            trace_id, parent_span_id = trace_id_from_track_id(track_id), None
+        span = Span(
+            name=name,
+            trace_id=trace_id,
+            span_id=os.urandom(8).hex(),
+            parent_span_id=parent_span_id,
+            start_time_ns=start_time_ns or time.time_ns(),
+            attributes=dict(attributes or {}),
+        )
+        if track_id:
+            span.attributes["track_id"] = track_id
+        return span
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        track_id: Optional[str] = None,
+        parent: Optional[str] = None,
+        attributes: Optional[dict] = None,
+    ):
+        """
+        Time the block as a span, and make it the current span of the thread
+
+        Args:
+            name (str): The span name
+            track_id (str): The track ID, for the trace ID of a root span
+            parent (str): The traceparent of the parent span, the current span if None
+            attributes (dict): The span attributes
+        """
+        span = self.new_span(name, track_id, parent, attributes)
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        self.local.stack.append(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self.local.stack.pop()
+            span.end_time_ns = time.time_ns()
+            self.exporter.export(span)
+
+    def record_span(
+        self,
+        name: str,
+        start_time: float,
+        end_time: float,
+        track_id: Optional[str] = None,
+        parent: Optional[str] = None,
+        attributes: Optional[dict] = None,
+    ) -> Span:
+        """
+        Record a span which already happened, like the time a task waited in the queue
+
+        Args:
+            name (str): The span name
+            start_time (float): The start, in seconds since the epoch
+            end_time (float): The end, in seconds since the epoch
+            track_id (str): The track ID, for the trace ID of a root span
+            parent (str): The traceparent of the parent span, the current span if None
+            attributes (dict): The span attributes
+
+        Returns:
+            Span: The span
+        """
+        span = self.new_span(
+            name, track_id, parent, attributes, start_time_ns=int(start_time * 1e9)
+        )
+        span.end_time_ns = int(end_time * 1e9)
+        self.exporter.export(span)
+        return span
+
+
+# like data/traces.jsonl and http://localhost:4318, not exported if not set
+tracer = Tracer(
+    SpanExporter(
+        service_name="openomni",
+        export_path=os.environ.get("TRACE_EXPORT_PATH") or None,
+        otlp_endpoint=os.environ.get("TRACE_OTLP_ENDPOINT") or None,
+    )
+)
@@ -0,0 +1,65 @@
+"""
+Energy based voice activity detection of the recorded phrases
+
+speech_recognition starts and stops a phrase on the energy of the microphone,
+so the phrases carry the silence before and after the speech, and sometimes only noise, like a door or a cough.
+The phrase is trimmed to its voiced frames, and dropped if there is too little speech in it,
+so no audio is shipped and no task is queued for it.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+def frame_rms(samples: np.ndarray, frame_size: int) -> np.ndarray:
+    """
+    The RMS of each frame, on the same scale as the energy_threshold of speech_recognition
+
+    Args:
+        samples (np.ndarray): The 16 bits samples
+        frame_size (int): The samples per frame
+
+    Returns:
+        np.ndarray: The RMS of each frame, the last partial frame is padded with zeros
+    """
+    n_frames = -(-len(samples) // frame_size)
+    padded = np.zeros(n_frames * frame_size, dtype=np.float64)
+    padded[: len(samples)] = samples
+    return np.sqrt(np.mean(padded.reshape(n_frames, frame_size) ** 2, axis=1))
+
+
+def speech_bounds(
+    frames: bytes,
+    sample_rate: int,
+    energy_threshold: float,
+    frame_ms: int = 30,
+    min_speech_ms: int = 300,
+    padding_ms: int = 200,
+) -> Optional[Tuple[int, int]]:
+    """
+    Find the speech in the phrase
+
+    Args:
+        frames (bytes): The 16 bits mono PCM frames
+        sample_rate (int): The sample rate
+        energy_threshold (float): The RMS above which a frame is voiced
+        frame_ms (int): The length of the frames the energy is measured on
+        min_speech_ms (int): The phrase is dropped with less voiced audio than this
+        padding_ms (int): Kept before the first and after the last voiced frame, for the soft consonants
+
+    Returns:
+        Optional[Tuple[int, int]]: The start and end byte offsets of the speech, None if there is no speech
+    """
+    samples = np.frombuffer(frames, dtype=np.int16)
+    if not len(samples):
+        return None
+    frame_size = sample_rate * frame_ms // 1000
+    voiced = np.flatnonzero(frame_rms(samples, frame_size) > energy_threshold)
+    if len(voiced) * frame_ms < min_speech_ms:
+        return None
+    padding = sample_rate * padding_ms // 1000
+    start = max(voiced[0] * frame_size - padding, 0)
+    end = min((voiced[-1] + 1) * frame_size + padding, len(samples))
+    # 2 bytes per sample
+    return int(start) * 2, int(end) * 2
@@ -59,16 +59,19 @@ class API:
         logger.info(url)
         logger.info(f"POST {url} {r.status_code}")
 
-    def get_spoken_speech(self):
+    def get_spoken_speech(self, wait: float = 0):
         """
         Call the API to get the speech to play
+        Args:
+            wait (float): let the API hold the request up to this many seconds until a speech is ready
+
         Returns:
 
         """
-        url = f"{self.domain}/hardware/speech/?home_id={self.home_id}"
+        url = f"{self.domain}/hardware/speech/?home_id={self.home_id}&wait={wait}"
         logger.info(url)
         r = requests.get(
-            url, headers={"Authorization": f"Token {self.token}"}, timeout=30
+            url, headers={"Authorization": f"Token {self.token}"}, timeout=wait + 30
         )
 
         logger.info(f"get {url} {r.status_code}")
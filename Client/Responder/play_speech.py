@@ -91,6 +91,12 @@ if __name__ == "__main__":
         type=str,
         default=None,
     )
+    parser.add_argument(
+        "--long_poll",
+        help="Let the API hold each request up to this many seconds until a speech is ready, 0 to poll every second",
+        type=float,
+        default=0,
+    )
     args = parser.parse_args()
 
     # Initialize the API
@@ -101,10 +107,12 @@ if __name__ == "__main__":
     )
     while True:
         # Convert text to speech and play
-        speech_content = api.get_spoken_speech()
+        speech_content = api.get_spoken_speech(wait=args.long_poll)
 
         if len(speech_content) == 0:
-            time.sleep(1)
+            # the API already held the request when long polling
+            if not args.long_poll:
+                time.sleep(1)
             logger.info("No speech content")
             continue
 
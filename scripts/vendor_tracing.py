@@ -0,0 +1,41 @@
+"""
+Copy the tracing module of the API to the Agent and the Listener
+
+    python scripts/vendor_tracing.py          # update the copies
+    python scripts/vendor_tracing.py --check  # fail if a copy differs
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SOURCE = ROOT / "API" / "authenticate" / "utils" / "tracing.py"
+COPIES = [
+    ROOT / "Agent" / "utils" / "tracing.py",
+    ROOT / "Client" / "Listener" / "tracing.py",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--check", action="store_true", help="Fail if a copy differs, do not write"
+    )
+    args = parser.parse_args()
+
+    source = SOURCE.read_bytes()
+    stale = [
+        copy for copy in COPIES if not copy.exists() or copy.read_bytes() != source
+    ]
+    if args.check:
+        for copy in stale:
+            print(f"{copy.relative_to(ROOT)} differs from {SOURCE.relative_to(ROOT)}")
+        sys.exit(1 if stale else 0)
+    for copy in stale:
+        copy.write_bytes(source)
+        print(f"Updated {copy.relative_to(ROOT)}")
+
+
+if __name__ == "__main__":
+    main()